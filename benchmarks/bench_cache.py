@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Load/save benchmark of the weather cache file: versioned cache format vs. pickle.
+
+WeatherHandler used to pickle the weather data into OAWeather.dat; it now
+writes the checksummed, versioned format of cachefile.py.  This script
+times dumps()/loads() of both for a reduced weather dict (what the plugin
+caches) and for a full provider-sized payload, the cache format plain (the
+default) and zlib-compressed, and reports the encoded sizes.  The data is synthetic but shaped like the MSN responses.
+
+Usage: python3 benchmarks/bench_cache.py [--runs 200]
+"""
+
+import argparse
+import os
+import pickle
+import sys
+import tempfile
+import timeit
+
+import enigma2stubs
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def reducedData():
+    current = dict(("field%02d" % idx, "value %d" % idx) for idx in range(40))
+    current.update({"temp": "21", "feelsLike": "20", "humidity": "64", "windSpeed": "12",
+                    "yahooCode": "30", "text": u"Teilweise bewölkt", "observationTime": "2024-05-01T12:00:00"})
+    forecast = {}
+    for idx in range(6):
+        forecast[idx] = {"yahooCode": "32", "meteoCode": "B", "minTemp": "%d" % (8 + idx), "maxTemp": "%d" % (19 + idx),
+                         "precipitation": "%d" % (idx * 10), "dayText": "Mittwoch", "day": "Mi", "shortDay": "Mi",
+                         "date": "2024-05-0%d" % (idx + 1), "text": u"Regenschauer möglich",
+                         "daySummary0": "Sunny morning with a few clouds later on", "daySummary1": "Winds NW 10 km/h",
+                         "nightSummary0": "Clear", "nightSummary1": "Winds calm"}
+    return {"name": "Frankfurt am Main, DE", "longitude": "8.68417", "latitude": "50.11552", "tempunit": "°C",
+            "windunit": "km/h", "precunit": "%", "source": "MSN", "current": current, "forecast": forecast}
+
+
+def fullData():
+    hours = [{"valid": "2024-05-01T%02d:00:00" % (idx % 24), "temp": 12.5 + idx % 7, "feels": 11.0, "dewPt": 6.2,
+              "rh": 71, "pvdrCap": "Partly cloudy", "pvdrIcon": "d2000", "precip": 10, "windSpd": 13.3, "windDir": 240,
+              "baro": 1013.2, "uv": 3, "vis": 24.1, "cloudCover": 40, "summary": "Partly cloudy with a light breeze"}
+             for idx in range(240)]
+    days = [{"daily": {"tempLo": 8.1, "tempHi": 19.4, "pvdrCap": "Showers", "pvdrIcon": "d2100",
+                       "day": {"precip": 40, "summaries": ["Showers in the afternoon", "Winds W 15 km/h"]},
+                       "night": {"precip": 10, "summaries": ["Mostly clear", "Winds calm"]}},
+             "hourly": hours[idx * 24:(idx + 1) * 24], "almanac": {"sunrise": "05:58", "sunset": "20:41"}}
+            for idx in range(10)]
+    return {"units": {"temperature": "°C", "speed": "km/h"},
+            "responses": [{"source": {"location": {"Name": "Frankfurt"}},
+                           "weather": [{"current": hours[0], "forecast": {"days": days},
+                                        "nowcasting": {"summary": "No rain for the next 2 hours"}}]}]}
+
+
+def bench(label, data, runs, cachefile):
+    plain = cachefile.dumps(data)
+    blob = cachefile.dumps(data, 6)
+    pickled = pickle.dumps(data, -1)
+    assert cachefile.loads(plain) == data and cachefile.loads(blob) == data, "round trip mismatch"
+    results = [
+        ("pickle", lambda: pickle.dumps(data, -1), lambda: pickle.loads(pickled), len(pickled)),
+        ("cache plain", lambda: cachefile.dumps(data), lambda: cachefile.loads(plain), len(plain)),
+        ("cache zlib", lambda: cachefile.dumps(data, 6), lambda: cachefile.loads(blob), len(blob)),
+    ]
+    print("%s:" % label)
+    for name, save, load, size in results:
+        saveTime = min(timeit.repeat(save, number=runs, repeat=3)) / runs * 1e6
+        loadTime = min(timeit.repeat(load, number=runs, repeat=3)) / runs * 1e6
+        print("  %-12s save %8.1f us   load %8.1f us   %7d bytes" % (name, saveTime, loadTime, size))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=200, help="calls per timing")
+    args = parser.parse_args()
+    enigma2stubs.install(os.path.join(os.path.dirname(HERE), "usr/lib/enigma2/python"), tempfile.mkdtemp(prefix="oaw-bench-"))
+    from Plugins.Extensions.OAWeather import cachefile
+    bench("reduced weather dict", reducedData(), args.runs, cachefile)
+    bench("full provider payload", fullData(), max(1, args.runs // 10), cachefile)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
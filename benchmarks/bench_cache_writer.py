@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fetch-callback latency with and without the background cache writer.
+
+refreshWeatherDataCallback used to encode and fsync the cache file itself
+before handing the data to the main thread; it now passes the data to
+cachefile.CacheWriter, whose thread writes the newest state at most once
+per interval.  This script runs a sequence of simulated refresh callbacks
+in both ways against a real file and reports the callback latency and the
+number of physical writes.
+
+Usage: python3 benchmarks/bench_cache_writer.py [--refreshes 50] [--interval 0.05] [--gap 0.005]
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import enigma2stubs
+from bench_cache import reducedData
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run(label, callback, refreshes, gap):
+    latencies = []
+    for idx in range(refreshes):
+        data = reducedData()
+        data["current"]["temp"] = str(idx)
+        start = time.perf_counter()
+        callback(data)
+        latencies.append((time.perf_counter() - start) * 1e6)
+        time.sleep(gap)  # the fetch thread waits for the next refresh
+    return label, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--refreshes", type=int, default=50, help="simulated refresh callbacks")
+    parser.add_argument("--interval", type=float, default=0.05, help="writer cadence in seconds")
+    parser.add_argument("--gap", type=float, default=0.005, help="seconds between refreshes")
+    args = parser.parse_args()
+    workdir = tempfile.mkdtemp(prefix="oaw-bench-")
+    try:
+        enigma2stubs.install(os.path.join(os.path.dirname(HERE), "usr/lib/enigma2/python"), workdir)
+        from Plugins.Extensions.OAWeather import cachefile
+        path = os.path.join(workdir, "OAWeather.dat")
+
+        writes = [0]
+
+        def synchronous(data):
+            cachefile.writeCache(path, data)
+            writes[0] += 1
+
+        writer = cachefile.CacheWriter(path, args.interval)
+        results = [run("synchronous", synchronous, args.refreshes, args.gap)]
+        syncWrites = writes[0]
+        results.append(run("cache writer", writer.save, args.refreshes, args.gap))
+        writer.flush()
+        assert cachefile.readCache(path)["current"]["temp"] == str(args.refreshes - 1), "last state not on disk"
+        for (label, latencies), count in zip(results, (syncWrites, writer.writes)):
+            print("%-13s median %8.1f us   p95 %8.1f us   max %8.1f us   %3d writes for %d refreshes" %
+                  (label, percentile(latencies, 0.5), percentile(latencies, 0.95), max(latencies), count, args.refreshes))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Idle-CPU benchmark: screens waiting for weather data by polling vs. by subscription.
+
+The OAWeatherPlugin screen used to start a 1 second checkDataTimer that
+polled weatherhandler.getValid() until the fetch had finished; the screens
+now register with WeatherHandler.subscribe()/whenValid() and sleep until the
+main thread hands the result over.
+
+Both ways run against the real WeatherHandler, OAWeatherPlugin and
+OAWeatherDetailview on the Enigma2 stand-ins of enigma2stubs.py. A small
+main loop drives the eTimers and the callFromThread() calls like the
+Enigma2 main loop does, and only the provider request is replaced by a
+thread that sleeps for --fetch seconds. For each way the script reports
+how often the main loop woke up and how much CPU time passed while the
+screens waited for the fetch.
+
+  polling      the screen's own subscription is detached and the baseline
+               checkDataUpdate() runs on a --poll ms eTimer
+  subscribed   the screen as it is, plus a detail view waiting on whenValid()
+
+Usage: python3 benchmarks/bench_idle_wait.py [--fetch 3.0] [--poll 1000]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import types
+from threading import Condition
+
+import enigma2stubs
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+LOCATION = ("Berlin, DE", 13.41, 52.52)
+
+
+class MainLoop(object):
+    """Runs due eTimers and calls posted from other threads, sleeps otherwise"""
+
+    def __init__(self):
+        self.condition = Condition()
+        self.timers = []
+        self.posted = []
+        self.wakeups = 0
+
+    def post(self, function, *args, **kwargs):
+        with self.condition:
+            self.posted.append((function, args, kwargs))
+            self.condition.notify()
+
+    def runUntil(self, done, timeout):
+        end = time.monotonic() + timeout
+        while not done():
+            now = time.monotonic()
+            if now >= end:
+                raise RuntimeError("no data after %.1f s" % timeout)
+            with self.condition:
+                deadline = min([timer.deadline for timer in self.timers if timer.active] + [end])
+                if not self.posted and deadline > now:
+                    self.condition.wait(deadline - now)
+                posted, self.posted = self.posted, []
+            self.wakeups += 1
+            for function, args, kwargs in posted:
+                function(*args, **kwargs)
+            now = time.monotonic()
+            for timer in [timer for timer in self.timers if timer.active and timer.deadline <= now]:
+                timer.fire()
+
+
+LOOP = MainLoop()
+
+
+class eTimer(enigma2stubs.eTimer):
+    def __init__(self):
+        enigma2stubs.eTimer.__init__(self)
+        self.deadline = 0.0
+        self.interval = 0.0
+        self.singleShot = False
+        LOOP.timers.append(self)
+
+    def start(self, msecs, singleShot=False):
+        self.interval = msecs / 1000.0
+        self.singleShot = singleShot
+        self.deadline = time.monotonic() + self.interval
+        self.active = True
+
+    def fire(self):
+        if self.singleShot:
+            self.active = False
+        else:
+            self.deadline += self.interval
+        for function in self.callback:
+            function()
+
+
+def checkDataUpdate(screen, timer, weatherhandler, _):
+    """OAWeatherPlugin.checkDataUpdate() as it was before the subscriptions"""
+    if weatherhandler.getValid() == 0:
+        screen.data = weatherhandler.getData()
+        screen.getWeatherDataCallback()
+        timer.stop()
+    elif weatherhandler.getValid() == 2:
+        screen.error(_("Weather data unavailable"))
+        timer.stop()
+
+
+def run(label, plugin, fetch, poll):
+    handler = plugin.weatherhandler
+    data = {"current": {"temp": "12"}, "forecast": {day: {"minTemp": "5", "maxTemp": "15", "text": "Sunny"} for day in range(6)},
+            "tempunit": "°C"}
+
+    def runFetch(fetch_, client, order, kwargs):  # the provider request, in the fetch thread
+        time.sleep(fetch)
+        result = types.SimpleNamespace(ok=True, mode=order[0], data=data, error=None, info={}, duration=fetch)
+        handler.refreshWeatherDataCallback(result, fetch_)
+
+    handler.runFetch = runFetch
+    session = types.SimpleNamespace(instantiateDialog=lambda screen, *args: None)
+    screen = plugin.OAWeatherPlugin(session)
+    parsed = []
+    if label == "polling":
+        handler.unsubscribe(screen.weatherDataUpdated)
+        timer = eTimer()
+        timer.callback.append(lambda: checkDataUpdate(screen, timer, handler, plugin._))
+    else:
+        view = plugin.OAWeatherDetailview(session, LOCATION)
+        view.parseData = lambda: parsed.append(True)
+
+    cpu, wall, wakeups = time.process_time(), time.monotonic(), LOOP.wakeups
+    handler.reset(LOCATION)
+    screen.layoutFinished()
+    if label == "polling":
+        timer.start(poll)
+    else:
+        view.layoutFinished()
+    LOOP.runUntil(lambda: screen.data is data and (label == "polling" or parsed), fetch + 30)
+    cpu, wall, wakeups = time.process_time() - cpu, time.monotonic() - wall, LOOP.wakeups - wakeups
+    screen.close()
+    if label != "polling":
+        view.close()
+    print("%-11s wall %6.3f s   cpu %7.2f ms   main loop wake-ups %6d" % (label, wall, cpu * 1e3, wakeups))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--fetch", type=float, default=3.0, help="seconds the simulated provider request takes")
+    parser.add_argument("--poll", type=int, default=1000, help="checkDataTimer interval in ms, 1000 on the receiver")
+    args = parser.parse_args()
+    workdir = tempfile.mkdtemp(prefix="oaw-bench-")
+    try:
+        enigma2stubs.install(os.path.join(os.path.dirname(HERE), "usr/lib/enigma2/python"), workdir)
+        sys.modules["enigma"].eTimer = eTimer
+        sys.modules["twisted.internet.reactor"].callFromThread = LOOP.post
+        from Plugins.Extensions.OAWeather import plugin
+        plugin.config.plugins.OAWeather.enabled.value = True
+        plugin.config.plugins.OAWeather.cachedata.value = 0
+        plugin.config.plugins.OAWeather.history.value = False
+        plugin.weatherhelper.favoriteList = [LOCATION]
+        plugin.config.plugins.OAWeather.weatherlocation.value = LOCATION
+        plugin.weatherhandler.WI  # import the provider module outside of the timings
+        for label in ("polling", "subscribed"):
+            run(label, plugin, args.fetch, args.poll)
+        plugin.weatherhelper.flushFavorites()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Import-time benchmark for the OAWeather plugin module.
+
+Enigma2 imports every plugin.py while the GUI starts, so everything done at
+module level there delays the first picture.  This script imports
+Plugins.Extensions.OAWeather.plugin in fresh interpreters started with
+'python -X importtime' against stubbed Enigma2 modules (enigma2stubs.py)
+and reports the median cumulative import time of the plugin, optionally
+next to the same figure for an older revision of the tree.
+
+Usage: python3 benchmarks/bench_import.py [--runs 15] [--baseline HEAD~1]
+"""
+
+import argparse
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(HERE)
+TREE = "usr/lib/enigma2/python"
+MODULE = "Plugins.Extensions.OAWeather.plugin"
+
+SNIPPET = """
+import sys
+sys.path.insert(0, %r)
+import enigma2stubs
+enigma2stubs.install(%r, %r)
+import %s
+"""
+
+LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s*(\S+)")
+
+
+def measure(treepath, rootdir):
+    """Cumulative import time of the plugin module in microseconds"""
+    code = SNIPPET % (HERE, treepath, rootdir, MODULE)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True)
+    if result.returncode:
+        raise SystemExit("import failed:\n%s" % result.stderr[-2000:])
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match and match.group(3) == MODULE:
+            return int(match.group(2))
+    raise SystemExit("no import time reported for %s" % MODULE)
+
+
+def median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2.0
+
+
+def checkout(revision, target):
+    """Extract the python tree of 'revision' into 'target'"""
+    archive = subprocess.Popen(["git", "-C", REPO, "archive", revision, TREE], stdout=subprocess.PIPE)
+    subprocess.check_call(["tar", "-x", "-C", target], stdin=archive.stdout)
+    if archive.wait():
+        raise SystemExit("git archive %s failed" % revision)
+    return os.path.join(target, TREE)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=15, help="interpreters started per tree")
+    parser.add_argument("--baseline", metavar="REV", help="git revision to compare the working tree with")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="oaw-bench-")
+    try:
+        trees = [("working tree", os.path.join(REPO, TREE))]
+        if args.baseline:
+            os.mkdir(os.path.join(workdir, "baseline"))
+            trees.insert(0, (args.baseline, checkout(args.baseline, os.path.join(workdir, "baseline"))))
+        results = []
+        for label, treepath in trees:
+            rootdir = os.path.join(workdir, "root-%d" % len(results))
+            measure(treepath, rootdir)  # warm up, writes the .pyc files
+            times = [measure(treepath, rootdir) for run in range(args.runs)]
+            results.append(median(times))
+            print("%-14s median %8.1f ms  (min %.1f, max %.1f, %d runs)" %
+                  (label, results[-1] / 1000.0, min(times) / 1000.0, max(times) / 1000.0, args.runs))
+        if len(results) == 2 and results[1]:
+            print("speed-up       %8.2fx" % (results[0] / float(results[1])))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compile time of all bundled catalogs: msgfmt per language vs po_compiler.
+
+The translation scripts used to run one msgfmt process per language; they
+now parse and write every .mo file in their own process with po_compiler.
+This script compiles a copy of all bundled .po files in three ways and
+reports the wall time of each round:
+
+  msgfmt       one 'msgfmt' process per language (skipped if not on PATH)
+  subprocess   one 'python po_compiler.py' per language, the spawn cost alone
+  in-process   po_compiler.compile_catalogs() over all languages
+
+Every .mo written in-process is loaded with gettext and compared with the
+committed one, which checks the string tables, and every message is looked
+up through the hash table the way GNU gettext does, which checks the hash
+table (Python's gettext never reads it).
+
+Usage: python3 benchmarks/bench_po_compile.py [--rounds 5]
+"""
+
+import argparse
+import gettext
+import glob
+import os
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(HERE)
+LOCALE = os.path.join(REPO, "usr/lib/enigma2/python/Plugins/Extensions/OAWeather/locale")
+
+sys.path.insert(0, REPO)
+import po_compiler  # noqa: E402
+
+
+def copyCatalogs(workdir):
+    po_files = []
+    for source in sorted(glob.glob(os.path.join(LOCALE, "*", "LC_MESSAGES", "*.po"))):
+        target = os.path.join(workdir, os.path.relpath(source, LOCALE))
+        os.makedirs(os.path.dirname(target))
+        shutil.copy(source, target)
+        po_files.append(target)
+    return po_files
+
+
+def runEach(command, po_files):
+    for po_file in po_files:
+        subprocess.run(command(po_file), check=True, stdout=subprocess.DEVNULL)
+
+
+def hashLookup(blob, key):
+    """Number of the message 'key' (msgid, up to the first NUL) in the .mo 'blob' by its hash table, None if missing"""
+    count, originals, translations, hashsize, hashtable = struct.unpack_from("<5I", blob, 8)
+    hashed = po_compiler.hashpjw(key)
+    index = hashed % hashsize
+    step = 1 + hashed % (hashsize - 2)
+    for _ in range(hashsize):
+        entry = struct.unpack_from("<I", blob, hashtable + index * 4)[0]
+        if not entry:
+            return None
+        length, offset = struct.unpack_from("<II", blob, originals + (entry - 1) * 8)
+        if blob[offset:offset + length].split(b"\0")[0] == key:
+            return entry - 1
+        index = (index + step) % hashsize
+    return None
+
+
+def verifyHashTable(mo_file):
+    with open(mo_file, "rb") as fd:
+        blob = fd.read()
+    count, originals = struct.unpack_from("<2I", blob, 8)
+    for number in range(count):
+        length, offset = struct.unpack_from("<II", blob, originals + number * 8)
+        key = blob[offset:offset + length].split(b"\0")[0]
+        assert hashLookup(blob, key) == number, "%s: %r not found through the hash table" % (mo_file, key)
+
+
+def verify(po_files, workdir):
+    for po_file in po_files:
+        mo_file = po_file[:-3] + ".mo"
+        verifyHashTable(mo_file)
+        with open(mo_file, "rb") as fd:
+            ours = gettext.GNUTranslations(fd)._catalog
+        with open(os.path.join(LOCALE, os.path.relpath(mo_file, workdir)), "rb") as fd:
+            reference = gettext.GNUTranslations(fd)._catalog
+        for catalog in (ours, reference):  # older msgfmt kept the build date in the header
+            catalog[""] = "".join(line for line in catalog.get("", "").splitlines(True) if not line.startswith("POT-Creation-Date:"))
+        assert ours == reference, "%s differs from the committed .mo" % mo_file
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=5, help="timed rounds per method, the best is reported")
+    args = parser.parse_args()
+    workdir = tempfile.mkdtemp(prefix="oaw-bench-")
+    try:
+        po_files = copyCatalogs(workdir)
+        methods = []
+        if shutil.which("msgfmt"):
+            methods.append(("msgfmt", lambda: runEach(lambda po_file: ["msgfmt", "-o", po_file[:-3] + ".mo", po_file], po_files)))
+        else:
+            print("msgfmt not found on PATH, skipping it")
+        script = os.path.join(REPO, "po_compiler.py")
+        methods.append(("subprocess", lambda: runEach(lambda po_file: [sys.executable, script, po_file], po_files)))
+        methods.append(("in-process", lambda: po_compiler.compile_catalogs(po_files)))
+
+        print("%d catalogs, best of %d rounds" % (len(po_files), args.rounds))
+        results = []
+        for label, method in methods:
+            timings = []
+            for _ in range(args.rounds):
+                start = time.perf_counter()
+                method()
+                timings.append(time.perf_counter() - start)
+            results.append((label, min(timings)))
+        verify(po_files, workdir)
+        fastest = results[-1][1]
+        for label, best in results:
+            print("%-11s %9.1f ms   %7.2f ms per language   %6.1fx" % (label, best * 1e3, best * 1e3 / len(po_files), best / fastest))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
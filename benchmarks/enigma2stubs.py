@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""
+Minimal stand-ins for the Enigma2 runtime so the plugin modules can be
+imported and exercised by the benchmarks on a development machine.
+
+Only what the OAWeather modules touch at import time and in the measured
+code paths is provided; none of this is used on a receiver.
+
+    import enigma2stubs
+    enigma2stubs.install("/path/to/usr/lib/enigma2/python", "/tmp/oaw-root")
+"""
+
+import os
+import sys
+import threading
+import types
+
+
+class Node(object):
+    pass
+
+
+class ConfigElement(object):
+    def __init__(self, default=None, *args, **kwargs):
+        self.default = default
+        self.value = default
+        self.notifiers = []
+
+    def save(self):
+        pass
+
+    def addNotifier(self, notifier, initial_call=True, immediate_feedback=True):
+        self.notifiers.append(notifier)
+        if initial_call:
+            notifier(self)
+
+
+class ConfigSelection(ConfigElement):
+    def __init__(self, default=None, choices=None):
+        ConfigElement.__init__(self, default)
+        self.choices = [choice[0] if isinstance(choice, tuple) else choice for choice in choices or []]
+
+    def setChoices(self, choices, default=None):
+        self.choices = [choice[0] if isinstance(choice, tuple) else choice for choice in choices]
+
+
+class ConfigSelectionNumber(ConfigElement):
+    def __init__(self, minimum, maximum, step, default=0, wraparound=False):
+        ConfigElement.__init__(self, default)
+
+
+class ConfigSubsection(Node):
+    def save(self):
+        pass
+
+
+class eTimer(object):
+    def __init__(self):
+        self.callback = []
+        self.timeout = []
+        self.active = False
+
+    def start(self, msecs, singleShot=False):
+        self.active = True
+
+    def stop(self):
+        self.active = False
+
+    def isActive(self):
+        return self.active
+
+
+class Deferred(object):
+    def __init__(self):
+        self.called = False
+        self.result = None
+        self.ok = True
+        self.callbacks = []
+
+    def addCallbacks(self, callback, errback=None):
+        self.callbacks.append((callback, errback))
+        self.run()
+        return self
+
+    def addCallback(self, callback):
+        return self.addCallbacks(callback)
+
+    def callback(self, result):
+        self.called, self.result, self.ok = True, result, True
+        self.run()
+
+    def errback(self, failure):
+        self.called, self.result, self.ok = True, failure, False
+        self.run()
+
+    def run(self):
+        while self.called and self.callbacks:
+            callback, errback = self.callbacks.pop(0)
+            handler = callback if self.ok else errback
+            if handler:
+                self.result, self.ok = handler(self.result), True
+
+
+def succeed(result):
+    deferred = Deferred()
+    deferred.callback(result)
+    return deferred
+
+
+def fail(failure):
+    deferred = Deferred()
+    deferred.errback(failure)
+    return deferred
+
+
+class Dummy(object):
+    """Base of the placeholders for GUI classes which are only referenced, never used"""
+    TYPE_YESNO, TYPE_INFO, TYPE_WARNING, TYPE_ERROR = range(4)
+    WHERE_SESSIONSTART, WHERE_PLUGINMENU = range(2)
+    CHANGED_DEFAULT, CHANGED_ALL, CHANGED_CLEAR = range(3)
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+
+def placeholder(name):
+    """A distinct class per name, the plugin derives from several of them at once"""
+    return type(name, (Dummy,), {})
+
+
+class Screen(Dummy):
+    """Screen base holding its widgets by name, the layout is never built"""
+
+    def __init__(self, session, *args, **kwargs):
+        self.session = session
+        self.widgets = {}
+        self.onLayoutFinish = []
+        self.onShown = []
+        self.onClose = []
+
+    def __setitem__(self, name, widget):
+        self.widgets[name] = widget
+
+    def __getitem__(self, name):
+        return self.widgets[name]
+
+    def layoutFinished(self):
+        for function in self.onLayoutFinish:
+            function()
+
+    def close(self, *result):
+        for function in self.onClose:
+            function()
+
+
+class Widget(Dummy):
+    """Text and pixmap widgets, only their state is kept"""
+
+    def __init__(self, text="", *args, **kwargs):
+        self.text = text
+        self.visible = True
+        self.style = None
+        self.instance = types.SimpleNamespace(setPixmapFromFile=lambda path: None)
+
+    def setText(self, text):
+        self.text = text
+
+    def getText(self):
+        return self.text
+
+    def show(self):
+        self.visible = True
+
+    def hide(self):
+        self.visible = False
+
+
+def module(name, **attributes):
+    mod = sys.modules.get(name) or types.ModuleType(name)
+    mod.__dict__.update(attributes)
+    sys.modules[name] = mod
+    return mod
+
+
+def package(name, treepath):
+    """Stub package whose real submodules are still found in the source tree"""
+    return module(name, __path__=[os.path.join(treepath, *name.split("."))])
+
+
+def install(treepath, rootdir):
+    """Register the stub modules, 'treepath' is usr/lib/enigma2/python of the tree to load"""
+    for directory in ("etc/enigma2", "media/hdd", "skins/WeatherIconSets"):
+        path = os.path.join(rootdir, directory)
+        if not os.path.isdir(path):
+            os.makedirs(path)
+    scopes = {
+        "SCOPE_CONFIG": os.path.join(rootdir, "etc/enigma2/"),
+        "SCOPE_HDD": os.path.join(rootdir, "media/hdd/"),
+        "SCOPE_PLUGINS": os.path.join(treepath, "Plugins/"),
+        "SCOPE_SKINS": os.path.join(rootdir, "skins/"),
+        "SCOPE_SKIN": os.path.join(rootdir, "skins/"),
+    }
+
+    def resolveFilename(scope, base=""):
+        return os.path.join(scope, base)
+
+    for name in ("Components", "Components.Converter", "Components.Renderer", "Components.Sources",
+                 "Plugins", "Plugins.Extensions", "Screens", "Tools"):
+        package(name, treepath)
+    module("Tools.Directories", resolveFilename=resolveFilename, **scopes)
+    module("Tools.LoadPixmap", LoadPixmap=lambda cached=False, path=None: ("pixmap", path))
+
+    size = types.SimpleNamespace(width=lambda: 1280, height=lambda: 720)
+    module("enigma", eTimer=eTimer, getDesktop=lambda screen: types.SimpleNamespace(size=lambda: size),
+           ePixmap=placeholder("ePixmap"), BT_SCALE=1, BT_KEEP_ASPECT_RATIO=2, BT_HALIGN_CENTER=4, BT_VALIGN_CENTER=8)
+    module("keymapparser", readKeymap=lambda filename: None)
+
+    module("twisted")
+    module("twisted.internet")
+    module("twisted.internet.defer", Deferred=Deferred, fail=fail, succeed=succeed)
+    module("twisted.internet.reactor",
+           callInThread=lambda function, *args, **kwargs: threading.Thread(target=function, args=args, kwargs=kwargs).start(),
+           callFromThread=lambda function, *args, **kwargs: function(*args, **kwargs),
+           callLater=lambda delay, function, *args, **kwargs: None)
+
+    config = Node()
+    config.plugins = Node()
+    config.misc = Node()
+    config.misc.firstrun = ConfigElement(False)
+    config.misc.standbyCounter = ConfigElement(0)
+    config.osd = Node()
+    config.osd.language = ConfigElement("en_EN")
+    config.save = lambda: None
+    module("Components.config", config=config, configfile=types.SimpleNamespace(save=lambda: None),
+           ConfigSubsection=ConfigSubsection, ConfigYesNo=ConfigElement, ConfigText=ConfigElement,
+           ConfigSelection=ConfigSelection, ConfigSelectionNumber=ConfigSelectionNumber,
+           ConfigInteger=ConfigElement, getConfigListEntry=lambda *args: args)
+    module("Components.Language", language=types.SimpleNamespace(getLanguage=lambda: "en_EN", addCallback=lambda callback: None))
+    module("Components.Element", cached=lambda function: function)
+    module("Components.ActionMap", ActionMap=placeholder("ActionMap"), HelpableActionMap=placeholder("HelpableActionMap"))
+    module("Components.ChoiceList", ChoiceEntryComponent=lambda key=None, text=None: (text, key))
+    module("Components.ConfigList", ConfigListScreen=placeholder("ConfigListScreen"))
+    module("Components.Label", Label=type("Label", (Widget,), {}))
+    module("Components.MenuList", MenuList=placeholder("MenuList"))
+    module("Components.Pixmap", Pixmap=type("Pixmap", (Widget,), {}))
+    module("Components.Sources.List", List=type("List", (Widget,), {}))
+    module("Components.Sources.StaticText", StaticText=type("StaticText", (Widget,), {}))
+    module("Components.Sources.Source", Source=placeholder("Source"))
+    module("Components.Converter.Converter", Converter=placeholder("Converter"))
+    module("Components.Renderer.Renderer", Renderer=placeholder("Renderer"))
+    module("Screens.Screen", Screen=Screen)
+    for name in ("ChoiceBox", "MessageBox", "Setup", "VirtualKeyBoard"):
+        module("Screens." + name, **{name: placeholder(name)})
+    module("Screens.Standby", inStandby=None)
+    module("Plugins.Plugin", PluginDescriptor=placeholder("PluginDescriptor"))
+    sys.path.insert(0, treepath)
@@ -0,0 +1,314 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+In-process replacement for msgfmt: parses .po catalogs and writes GNU .mo
+files without spawning a process per language.
+
+The parser validates the syntax in the same pass and reports the problems
+the way msgfmt does ("file:line: message"); a catalog with errors is not
+written. Like msgfmt, fuzzy and untranslated messages are left out of the
+.mo, the fuzzy flag of the header entry is ignored, obsolete (#~) entries
+are skipped and the POT-Creation-Date is dropped from the header.
+
+Python 2 and 3 compatible, used by update_all_plugins.py and the
+update_translations.py of the plugins.
+
+Usage: python po_compiler.py [--check] file.po|locale_dir ...
+"""
+
+import os
+import re
+import sys
+from struct import pack
+
+MO_MAGIC = 0x950412de
+MO_REVISION = 0
+CONTEXT_SEPARATOR = "\x04"
+KEYWORD = re.compile(r'^(msgctxt|msgid_plural|msgid|msgstr)(?:\[(\d+)\])?\s*(.*)$')
+STRING = re.compile(r'^"((?:[^"\\]|\\.)*)"\s*$')
+ESCAPE = re.compile(r'\\(x[0-9a-fA-F]{1,2}|[0-7]{1,3}|.)')
+ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "a": "\a", "b": "\b", "f": "\f",
+           "v": "\v", "\\": "\\", '"': '"', "'": "'", "?": "?"}
+CHARSET = re.compile(br'charset=([A-Za-z0-9._-]+)')
+
+try:
+    unichr
+except NameError:  # Python 3
+    unichr = chr
+
+
+class Message(object):
+    __slots__ = ("context", "msgid", "plural", "strings", "fuzzy", "line")
+
+    def __init__(self, line, fuzzy):
+        self.context = None
+        self.msgid = None
+        self.plural = None
+        self.strings = {}
+        self.fuzzy = fuzzy
+        self.line = line
+
+    def getKey(self):
+        return self.msgid if self.context is None else self.context + CONTEXT_SEPARATOR + self.msgid
+
+
+def unquote(text, lineno, errors, filename):
+    match = STRING.match(text)
+    if not match:
+        errors.append("%s:%d: invalid string %s" % (filename, lineno, text.strip()[:40]))
+        return ""
+
+    def replace(escape):
+        code = escape.group(1)
+        if code in ESCAPES:
+            return ESCAPES[code]
+        if code[0] == "x":
+            return unichr(int(code[1:], 16))
+        if code[0] in "01234567":
+            return unichr(int(code, 8))
+        errors.append("%s:%d: invalid control sequence \\%s" % (filename, lineno, code))
+        return code
+    return ESCAPE.sub(replace, match.group(1))
+
+
+def getCharset(data):
+    """Charset named in the header of the raw catalog 'data', UTF-8 if none or the template placeholder"""
+    match = CHARSET.search(data)
+    charset = match.group(1).decode("ascii") if match else "UTF-8"
+    return "UTF-8" if charset.upper() == "CHARSET" else charset
+
+
+def parse(data, filename="<po>"):
+    """Parse the raw bytes of a .po file
+
+    Returns (messages, charset, errors) where 'messages' maps the .mo key
+    (context, msgid and plural joined the gettext way) to the translation
+    of every message that goes into the .mo file."""
+    errors = []
+    charset = getCharset(data)
+    try:
+        text = data.decode(charset)
+    except (LookupError, UnicodeDecodeError) as err:
+        return {}, charset, ["%s: cannot decode as %s: %s" % (filename, charset, err)]
+    if text.startswith(u"\ufeff"):  # byte order mark
+        text = text[1:]
+
+    messages = {}
+    seen = set()
+    state = {"entry": None, "field": None, "fuzzy": False}
+
+    def finish():
+        entry = state["entry"]
+        state["entry"] = state["field"] = None
+        state["fuzzy"] = False
+        if entry is None:
+            return
+        if entry.msgid is None:
+            errors.append("%s:%d: missing 'msgid' section" % (filename, entry.line))
+            return
+        if not entry.strings:
+            errors.append("%s:%d: missing 'msgstr' section" % (filename, entry.line))
+            return
+        if entry.plural is not None and sorted(entry.strings) != list(range(len(entry.strings))):
+            errors.append("%s:%d: plural forms of 'msgstr' are not numbered 0..%d" % (filename, entry.line, len(entry.strings) - 1))
+            return
+        key = entry.getKey()
+        if key in seen:
+            errors.append("%s:%d: duplicate message definition" % (filename, entry.line))
+            return
+        seen.add(key)
+        strings = [entry.strings[index] for index in sorted(entry.strings)]
+        if not strings[0] or (entry.fuzzy and key):  # untranslated or fuzzy, the header counts even if fuzzy
+            return
+        if not key:  # like current msgfmt, keep the build date out for reproducible files
+            strings[0] = "".join(field for field in strings[0].splitlines(True) if not field.startswith("POT-Creation-Date:"))
+        if entry.plural is not None:
+            key = key + "\0" + entry.plural
+        messages[key] = "\0".join(strings)
+
+    for lineno, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("#"):
+            if state["entry"] is not None and state["entry"].strings:
+                finish()
+            if line.startswith("#,") and "fuzzy" in [flag.strip() for flag in line[2:].split(",")]:
+                state["fuzzy"] = True
+            continue
+        if line.startswith('"'):
+            field = state["field"]
+            if field is None:
+                errors.append("%s:%d: string without keyword" % (filename, lineno))
+                continue
+            value = unquote(line, lineno, errors, filename)
+            entry = state["entry"]
+            if field == "msgctxt":
+                entry.context += value
+            elif field == "msgid":
+                entry.msgid += value
+            elif field == "msgid_plural":
+                entry.plural += value
+            else:
+                entry.strings[field] += value
+            continue
+        match = KEYWORD.match(line)
+        if not match:
+            errors.append("%s:%d: keyword %s unknown" % (filename, lineno, line.split()[0][:40]))
+            state["field"] = None
+            continue
+        keyword, index, rest = match.groups()
+        value = unquote(rest, lineno, errors, filename)
+        entry = state["entry"]
+        if keyword in ("msgctxt", "msgid"):
+            if entry is not None and entry.strings:
+                finish()
+            elif entry is not None and not (keyword == "msgid" and entry.msgid is None):
+                errors.append("%s:%d: missing 'msgstr' section" % (filename, entry.line))
+                state["entry"] = None
+            entry = state["entry"] or Message(lineno, state["fuzzy"])
+            state["entry"] = entry
+            if keyword == "msgctxt":
+                entry.context = value
+            else:
+                entry.msgid = value
+            state["field"] = keyword
+        elif entry is None or entry.msgid is None:
+            errors.append("%s:%d: '%s' without 'msgid'" % (filename, lineno, keyword))
+            state["field"] = None
+        elif keyword == "msgid_plural":
+            if entry.plural is not None or entry.strings:
+                errors.append("%s:%d: misplaced 'msgid_plural'" % (filename, lineno))
+            entry.plural = value
+            state["field"] = keyword
+        else:
+            if index is None and entry.plural is not None:
+                errors.append("%s:%d: 'msgid_plural' needs 'msgstr[n]'" % (filename, lineno))
+                index = len(entry.strings)
+            elif index is not None and entry.plural is None:
+                errors.append("%s:%d: 'msgstr[%s]' without 'msgid_plural'" % (filename, lineno, index))
+            index = int(index or 0)
+            if index in entry.strings:
+                errors.append("%s:%d: duplicate 'msgstr[%d]'" % (filename, lineno, index))
+            entry.strings[index] = value
+            state["field"] = index
+    finish()
+    return messages, charset, errors
+
+
+def hashpjw(data):
+    """Hash of a .mo key up to its first NUL, as in GNU gettext"""
+    value = 0
+    for byte in bytearray(data):
+        if not byte:
+            break
+        value = ((value << 4) + byte) & 0xffffffff
+        high = value & 0xf0000000
+        if high:
+            value ^= high >> 24
+            value ^= high
+    return value
+
+
+def nextPrime(number):
+    number |= 1
+    while any(number % divisor == 0 for divisor in range(3, int(number ** 0.5) + 1, 2)):
+        number += 2
+    return number
+
+
+def generate(messages, charset="UTF-8"):
+    """Bytes of the .mo file for 'messages' (key -> translation), with hash table"""
+    items = sorted((key.encode(charset), value.encode(charset)) for key, value in messages.items())
+    count = len(items)
+    hashsize = max(nextPrime(count * 4 // 3), 3)
+    originals = 28
+    translations = originals + count * 8
+    hashtable = translations + count * 8
+    offset = hashtable + hashsize * 4
+
+    table = [0] * hashsize
+    for number, (key, value) in enumerate(items):
+        hashed = hashpjw(key)
+        index = hashed % hashsize
+        step = 1 + hashed % (hashsize - 2)
+        while table[index]:
+            index = (index + step) % hashsize
+        table[index] = number + 1
+
+    descriptors = []
+    strings = []
+    for column in (0, 1):
+        for item in items:
+            descriptors.append(pack("<II", len(item[column]), offset))
+            strings.append(item[column] + b"\0")
+            offset += len(item[column]) + 1
+    header = pack("<7I", MO_MAGIC, MO_REVISION, count, originals, translations, hashsize, hashtable)
+    return b"".join([header] + descriptors + [pack("<%dI" % hashsize, *table)] + strings)
+
+
+def check_file(po_file):
+    """Syntax errors of 'po_file', empty if it compiles"""
+    with open(po_file, "rb") as fd:
+        return parse(fd.read(), po_file)[2]
+
+
+def compile_file(po_file, mo_file=None):
+    """Compile 'po_file' to 'mo_file' (default: next to it)
+
+    Returns (number of messages written, errors); nothing is written if the
+    catalog has errors."""
+    if mo_file is None:
+        mo_file = os.path.splitext(po_file)[0] + ".mo"
+    try:
+        with open(po_file, "rb") as fd:
+            messages, charset, errors = parse(fd.read(), po_file)
+        if errors:
+            return 0, errors
+        data = generate(messages, charset)
+        temp_file = "%s.%d.tmp" % (mo_file, os.getpid())
+        with open(temp_file, "wb") as fd:
+            fd.write(data)
+        os.rename(temp_file, mo_file)
+    except (IOError, OSError, LookupError, UnicodeError) as err:
+        return 0, ["%s: %s" % (po_file, err)]
+    return len(messages), []
+
+
+def compile_catalogs(po_files):
+    """Compile all 'po_files' in this process, returns [(po_file, messages, errors)]"""
+    return [(po_file,) + compile_file(po_file) for po_file in po_files]
+
+
+def find_po_files(path):
+    if os.path.isfile(path):
+        return [path]
+    po_files = []
+    for root, dirs, files in os.walk(path):
+        po_files.extend(os.path.join(root, name) for name in files if name.endswith(".po"))
+    return sorted(po_files)
+
+
+def main(argv=None):
+    args = sys.argv[1:] if argv is None else argv
+    check = "--check" in args
+    paths = [arg for arg in args if arg != "--check"]
+    if not paths:
+        print(__doc__.strip().splitlines()[-1])
+        return 2
+    po_files = [po_file for path in paths for po_file in find_po_files(path)]
+    failed = 0
+    for po_file in po_files:
+        if check:
+            errors = check_file(po_file)
+        else:
+            count, errors = compile_file(po_file)
+        for error in errors:
+            print(error)
+        failed += bool(errors)
+    print("%d catalog(s) %s, %d with errors" % (len(po_files), "checked" if check else "compiled", failed))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,26 +9,65 @@ import os
 import re
 import sys
 import json
+import hashlib
+import argparse
+import fnmatch
 import subprocess
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 
+from po_compiler import compile_file
 
-def find_all_plugins(root_dir: str = ".") -> List[Dict]:
+MANIFEST_NAME = ".translation_manifest.json"
+SKIP_DIRS = {".git", "__pycache__"}
+
+
+class RepositoryIndex:
+    """
+    Everything the updater needs from the repository, collected in ONE walk:
+    directories, Python files and setup*.xml files.
+    """
+
+    def __init__(self, root_dir: str = "."):
+        self.dirs: List[Path] = []
+        self.py_files: List[Path] = []
+        self.xml_files: List[Path] = []
+        for current, dirnames, filenames in os.walk(root_dir):
+            dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS)
+            current_path = Path(current)
+            self.dirs.extend(current_path / d for d in dirnames)
+            for filename in filenames:
+                if filename.endswith(".py"):
+                    self.py_files.append(current_path / filename)
+                elif fnmatch.fnmatch(filename, "setup*.xml"):
+                    self.xml_files.append(current_path / filename)
+
+    @staticmethod
+    def below(files: List[Path], directory: Path) -> List[Path]:
+        prefix = str(directory).rstrip(os.sep) + os.sep
+        return [f for f in files if str(f).startswith(prefix)]
+
+    def py_files_below(self, directory: Path) -> List[Path]:
+        return self.below(self.py_files, directory)
+
+    def xml_files_below(self, directory: Path) -> List[Path]:
+        return self.below(self.xml_files, directory)
+
+
+def find_all_plugins(root_dir: str = ".",
+                     index: Optional[RepositoryIndex] = None) -> List[Dict]:
     """
     Find ALL plugins in the repository by searching for locale directories.
     Returns list of plugins with their info.
     """
     plugins = []
-    root_path = Path(root_dir)
 
     print("🔍 Scanning repository for plugins...")
+    index = index or RepositoryIndex(root_dir)
 
     # Search for all locale directories
-    for locale_dir in root_path.rglob("*"):
-        if not locale_dir.is_dir():
-            continue
-
+    for locale_dir in index.dirs:
         dir_name = locale_dir.name.lower()
 
         # Check if this is a locale directory
@@ -43,18 +82,18 @@ def find_all_plugins(root_dir: str = ".") -> List[Dict]:
                 plugin_dir = plugin_dir.parent
 
             # Verify it's a plugin (has Python files or setup.xml)
-            has_py = any(plugin_dir.rglob("*.py"))
-            has_xml = any(plugin_dir.rglob("setup*.xml"))
+            py_files = index.py_files_below(plugin_dir)
+            xml_files = index.xml_files_below(plugin_dir)
 
-            if has_py or has_xml:
+            if py_files or xml_files:
                 plugin_info = {
                     'plugin_dir': str(plugin_dir),
                     'plugin_name': plugin_dir.name,
                     'locale_dir': str(locale_dir),
-                    'has_py': has_py,
-                    'has_xml': has_xml,
-                    'py_files': len(list(plugin_dir.rglob("*.py"))),
-                    'xml_files': len(list(plugin_dir.rglob("setup*.xml")))
+                    'has_py': bool(py_files),
+                    'has_xml': bool(xml_files),
+                    'py_files': len(py_files),
+                    'xml_files': len(xml_files)
                 }
 
                 # Avoid duplicates
@@ -63,26 +102,31 @@ def find_all_plugins(root_dir: str = ".") -> List[Dict]:
                     plugins.append(plugin_info)
 
     # Also find plugins without locale directories (create them)
-    for potential_plugin in root_path.rglob("plugin.py"):
+    for potential_plugin in index.py_files:
+        if potential_plugin.name != "plugin.py":
+            continue
         plugin_dir = potential_plugin.parent
         plugin_name = plugin_dir.name
 
         # Check if already in list
         if not any(p['plugin_dir'] == str(plugin_dir) for p in plugins):
+            xml_files = index.xml_files_below(plugin_dir)
             plugins.append({
                 'plugin_dir': str(plugin_dir),
                 'plugin_name': plugin_name,
                 'locale_dir': str(plugin_dir / "locale"),  # Will create
                 'has_py': True,
-                'has_xml': any(plugin_dir.rglob("setup*.xml")),
-                'py_files': len(list(plugin_dir.rglob("*.py"))),
-                'xml_files': len(list(plugin_dir.rglob("setup*.xml")))
+                'has_xml': bool(xml_files),
+                'py_files': len(index.py_files_below(plugin_dir)),
+                'xml_files': len(xml_files)
             })
 
     return plugins
 
 
-def process_single_plugin(plugin_info: Dict) -> Dict:
+def process_single_plugin(plugin_info: Dict, jobs: int = 1,
+                          force: bool = False,
+                          index: Optional[RepositoryIndex] = None) -> Dict:
     """
     Process translations for a single plugin.
     This function contains the logic from your universal script.
@@ -93,6 +137,7 @@ def process_single_plugin(plugin_info: Dict) -> Dict:
         'new_strings': 0,
         'updated_po': 0,
         'compiled_mo': 0,
+        'skipped': 0,
         'errors': []
     }
 
@@ -110,17 +155,14 @@ def process_single_plugin(plugin_info: Dict) -> Dict:
         locale_dir.mkdir(parents=True, exist_ok=True)
 
     try:
-        # 1. Change to plugin directory
-        original_cwd = os.getcwd()
-        os.chdir(plugin_dir)
-
-        # 2. Extract strings from XML
+        # 1. Extract strings from XML
         xml_strings = extract_from_xml(plugin_dir)
 
-        # 3. Extract strings from Python
-        py_strings = extract_from_python(plugin_dir)
+        # 2. Extract strings from Python
+        py_files = index.py_files_below(plugin_dir) if index else None
+        py_strings = extract_from_python(plugin_dir, py_files)
 
-        # 4. Update POT file
+        # 3. Update POT file
         pot_file = locale_dir / f"{plugin_info['plugin_name']}.pot"
         results['new_strings'] = update_pot_file(
             xml_strings,
@@ -129,14 +171,12 @@ def process_single_plugin(plugin_info: Dict) -> Dict:
             locale_dir,
             plugin_info['plugin_name'])
 
-        # 5. Update PO files
-        results['updated_po'] = update_po_files(pot_file, locale_dir)
-
-        # 6. Compile MO files
-        results['compiled_mo'] = compile_mo_files(locale_dir)
-
-        # 7. Return to original directory
-        os.chdir(original_cwd)
+        # 4. Update PO files and compile MO files, in parallel and only
+        # for languages whose PO or the POT changed since the last run
+        (results['updated_po'], results['compiled_mo'],
+         results['skipped'], errors) = build_languages(
+            pot_file, locale_dir, jobs, force)
+        results['errors'].extend(errors)
 
         results['success'] = True
 
@@ -185,9 +225,11 @@ def extract_from_xml(plugin_dir: Path) -> List[str]:
     return sorted(strings)
 
 
-def extract_from_python(plugin_dir: Path) -> List[str]:
+def extract_from_python(plugin_dir: Path,
+                        py_files: Optional[List[Path]] = None) -> List[str]:
     """Extract strings from Python files using xgettext"""
-    py_files = list(plugin_dir.rglob("*.py"))
+    if py_files is None:
+        py_files = list(plugin_dir.rglob("*.py"))
 
     if not py_files:
         return []
@@ -203,10 +245,10 @@ def extract_from_python(plugin_dir: Path) -> List[str]:
             '--no-wrap',
             '-L', 'Python',
             '--from-code=UTF-8',
-            '-o', str(temp_pot),
+            '-o', str(temp_pot.resolve()),  # xgettext runs in plugin_dir
         ] + rel_paths[:20]  # Limit to 20 files to avoid command line limits
 
-        subprocess.run(cmd, capture_output=True, text=True)
+        subprocess.run(cmd, capture_output=True, text=True, cwd=str(plugin_dir))
 
         if temp_pot.exists():
             with open(temp_pot, 'r', encoding='utf-8', errors='ignore') as f:
@@ -276,69 +318,119 @@ msgstr ""
     return len(new_strings)
 
 
-def update_po_files(pot_file: Path, locale_dir: Path) -> int:
-    """Update all PO files with msgmerge"""
-    if not pot_file.exists():
-        return 0
+def file_hash(path: Path) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
 
-    po_files = list(locale_dir.rglob("*.po"))
 
-    if not po_files:
-        return 0
+def load_manifest(locale_dir: Path) -> Dict:
+    try:
+        with open(locale_dir / MANIFEST_NAME, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
 
-    updated = 0
-    for po_file in po_files:
-        try:
-            cmd = [
-                'msgmerge',
-                '--update',
-                '--backup=none',
-                '--no-wrap',
-                str(po_file),
-                str(pot_file)
-            ]
 
-            result = subprocess.run(cmd, capture_output=True, text=True)
+def save_manifest(locale_dir: Path, manifest: Dict) -> None:
+    temp_file = locale_dir / (MANIFEST_NAME + ".tmp")
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(str(temp_file), str(locale_dir / MANIFEST_NAME))
 
-            if result.returncode == 0:
-                updated += 1
 
-        except Exception:
-            pass
+def build_language(po_file: str, pot_file: str) -> Tuple[str, bool, str]:
+    """
+    msgmerge for ONE language, runs in a worker process.
+    Returns (po_file, merged, error).
+    """
+    try:
+        result = subprocess.run(
+            ['msgmerge', '--update', '--backup=none', '--no-wrap',
+             po_file, pot_file],
+            capture_output=True, text=True)
+    except OSError as e:
+        return po_file, False, str(e)
+    return po_file, result.returncode == 0, result.stderr.strip()[:200]
 
-    return updated
 
+def build_languages(pot_file: Path, locale_dir: Path, jobs: int = 1,
+                    force: bool = False) -> Tuple[int, int, int, List[str]]:
+    """
+    Merge and compile all PO files below 'locale_dir'.
 
-def compile_mo_files(locale_dir: Path) -> int:
-    """Compile PO files to MO files"""
-    po_files = list(locale_dir.rglob("*.po"))
+    Languages whose PO content and POT are unchanged since the last run
+    (hashes in the manifest) and whose MO exists are skipped. With
+    jobs > 1 msgmerge runs in a process pool; the MO files are written
+    by po_compiler in this process, which also reports syntax errors.
+    Returns (updated PO, compiled MO, skipped, errors).
+    """
+    if not pot_file.exists():
+        return 0, 0, 0, []
 
+    po_files = sorted(locale_dir.rglob("*.po"))
     if not po_files:
-        return 0
+        return 0, 0, 0, []
 
-    compiled = 0
-    for po_file in po_files:
-        try:
-            mo_file = po_file.with_suffix('.mo')
-            cmd = ['msgfmt', '-o', str(mo_file), str(po_file)]
-            subprocess.run(cmd, capture_output=True, text=True)
-
-            if mo_file.exists():
-                compiled += 1
+    pot_hash = file_hash(pot_file)
+    manifest = {} if force else load_manifest(locale_dir)
+    entries = manifest.get('languages', {}) if manifest.get('pot') == pot_hash else {}
 
-        except Exception:
-            pass
+    todo = []
+    skipped = 0
+    for po_file in po_files:
+        key = str(po_file.relative_to(locale_dir))
+        if (entries.get(key) == file_hash(po_file)
+                and po_file.with_suffix('.mo').exists()):
+            skipped += 1
+        else:
+            todo.append(str(po_file))
+
+    if jobs > 1 and len(todo) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            merges = list(pool.map(build_language, todo,
+                                   [str(pot_file)] * len(todo)))
+    else:
+        merges = [build_language(po_file, str(pot_file)) for po_file in todo]
+
+    # The merged catalogs are checked and compiled here, in one process
+    updated = compiled = 0
+    errors = []
+    for po_file, merged, error in merges:
+        key = str(Path(po_file).relative_to(locale_dir))
+        messages, syntax_errors = compile_file(po_file)
+        updated += merged
+        compiled += not syntax_errors
+        if merged and not syntax_errors:
+            entries[key] = file_hash(Path(po_file))
+        else:
+            entries.pop(key, None)
+            errors.append(f"{key}: {error or syntax_errors[0]}")
+            errors.extend(syntax_errors[1:])
 
-    return compiled
+    save_manifest(locale_dir, {'pot': pot_hash, 'languages': entries})
+    print(f"🌍 {len(todo)} language(s) built with {max(1, min(jobs, len(todo)))} "
+          f"process(es), {skipped} unchanged")
+    return updated, compiled, skipped, errors
 
 
-def main():
+def main(argv: Optional[List[str]] = None):
     """Main function - Process ALL plugins"""
+    parser = argparse.ArgumentParser(
+        description="Update the translations of all plugins in the repository")
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=os.cpu_count() or 1,
+        help="processes for msgmerge (1 = serial)")
+    parser.add_argument(
+        "--force", action="store_true",
+        help="rebuild all languages, ignore the manifest")
+    args = parser.parse_args(argv)
+
     print("UNIVERSAL PLUGIN TRANSLATION UPDATER")
     print("=" * 60)
 
-    # Find all plugins
-    plugins = find_all_plugins()
+    # Find all plugins with a single walk over the repository
+    index = RepositoryIndex(".")
+    plugins = find_all_plugins(index=index)
 
     if not plugins:
         print("No plugins found in repository")
@@ -358,7 +450,7 @@ def main():
     successful = 0
 
     for plugin in plugins:
-        result = process_single_plugin(plugin)
+        result = process_single_plugin(plugin, args.jobs, args.force, index)
         all_results.append(result)
 
         if result['success']:
@@ -367,9 +459,10 @@ def main():
         else:
             status = "FAILED"
 
-        print("{} {}: {} new strings, {} PO updated, {} MO compiled".format(
+        print("{} {}: {} new strings, {} PO updated, {} MO compiled, {} unchanged".format(
             status, result['plugin_name'],
-            result['new_strings'], result['updated_po'], result['compiled_mo']
+            result['new_strings'], result['updated_po'], result['compiled_mo'],
+            result['skipped']
         ))
 
     # Generate report
@@ -18,12 +18,13 @@
 # reasons.
 
 from __future__ import print_function
-from os.path import join, exists, isfile
+from os.path import join
 from traceback import print_exc
 
 from Components.Converter.Converter import Converter
 from Components.config import config
 from Components.Element import cached
+from Plugins.Extensions.OAWeather.iconcache import iconcache
 
 
 class OAWeather(Converter, object):
@@ -41,19 +42,32 @@ class OAWeather(Converter, object):
         "day4": DAY4,
         "day5": DAY5
     }
+    HISTORY = {  # mode: (Source getter, default hours)
+        "temperature_trend": ("getTemperatureTrend", 3),
+        "pressure_trend": ("getPressureTrend", 3),
+        "humidity_trend": ("getHumidityTrend", 3),
+        "windspeed_trend": ("getWindSpeedTrend", 3),
+        "temperature_range": ("getTemperatureRange", 24),
+        "pressure_range": ("getPressureRange", 24),
+        "humidity_range": ("getHumidityRange", 24),
+        "windspeed_range": ("getWindSpeedRange", 24)
+    }
 
     def __init__(self, type):
         self.enabledebug = config.plugins.OAWeather.debug.value
         Converter.__init__(self, type)
         self.debug("__init__ type:%s" % type)
         self.index = None
+        self.hours = None
         self.mode = None
         self.path = None
         self.logo = None
         self.extension = "png"
         value = type.split(",")
         self.mode = value[0]
-        if len(value) > 1:
+        if self.mode in self.HISTORY:  # e.g. "pressure_trend,24": change over the last 24 hours
+            self.hours = int(value[1]) if len(value) > 1 and value[1].strip().isdigit() else self.HISTORY[self.mode][1]
+        elif len(value) > 1:
             self.index = self.getIndex(value[1].strip())
             if len(value) > 2 and self.mode in ("weathericon", "yahoocode"):
                 self.path = value[2].strip()
@@ -208,6 +222,8 @@ class OAWeather(Converter, object):
                     return self.source.getMoonDistance()
                 elif self.mode == "moonphaseicon":
                     return self.source.getMoonPixFilename()
+                elif self.mode in self.HISTORY:
+                    return getattr(self.source, self.HISTORY[self.mode][0])(self.hours)
                 else:
                     return self.source.getVal(self.mode)
             except Exception as err:
@@ -236,22 +252,20 @@ class OAWeather(Converter, object):
     def getIconFilename(self):
         if self.mode == "logo":
             try:
-                path = join(
-                    self.source.pluginpath,
-                    "Images",
+                path = iconcache.getFile(
+                    join(self.source.pluginpath, "Images"),
                     "%s_weather_logo.png" %
                     self.source.logo)
-                if isfile(path):
+                if path:
                     return path
             except Exception:
                 return ""
         if self.mode == "moonphaseicon":
             try:
-                path = join(
-                    self.source.pluginpath,
-                    "Images/moonphases/",
+                path = iconcache.getFile(
+                    join(self.source.pluginpath, "Images", "moonphases"),
                     self.source.getMoonPixFilename())
-                if isfile(path):
+                if path:
                     return path
             except Exception:
                 return ""
@@ -265,12 +279,13 @@ class OAWeather(Converter, object):
             path = self.source.iconpath
             if self.path:
                 path = self.path
-            if path and exists(path):
+            if path:
                 code = self.source.getYahooCode(self.index)
                 if code:
-                    path = join(path, "%s.%s" % (code, self.extension))
-                    if isfile(path):
-                        return path
+                    iconfile = iconcache.getFile(
+                        path, "%s.%s" % (code, self.extension))
+                    if iconfile:
+                        return iconfile
             self.debug(
                 "getIconFilename not found mode:%s index:%s self.path:%s path:%s" %
                 (self.mode, self.index, self.path, path))
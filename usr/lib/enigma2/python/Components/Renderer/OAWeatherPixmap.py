@@ -17,6 +17,7 @@
 from Components.Renderer.Renderer import Renderer
 from enigma import ePixmap, BT_SCALE, BT_KEEP_ASPECT_RATIO, BT_HALIGN_CENTER, BT_VALIGN_CENTER
 from os.path import join
+from Plugins.Extensions.OAWeather.iconcache import iconcache
 
 
 class OAWeatherPixmap(Renderer):
@@ -43,5 +44,9 @@ class OAWeatherPixmap(Renderer):
             else:
                 self.instance.show()
                 if self.iconFileName != pngname:
-                    self.instance.setPixmapFromFile(pngname)
+                    pixmap = iconcache.getPixmap(pngname)
+                    if pixmap:
+                        self.instance.setPixmap(pixmap)
+                    else:
+                        self.instance.setPixmapFromFile(pngname)
                     self.iconFileName = pngname
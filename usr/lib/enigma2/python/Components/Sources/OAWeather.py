@@ -64,6 +64,8 @@ class OAWeather(Source):
 
     services = {"MSN": "msn", "OpenMeteo": "omw", "openweather": "owm"}
 
+    TRENDARROWS = ("↑", "↓", "→")  # rising, falling, steady
+
     def __init__(self):
         Source.__init__(self)
         self.enabledebug = config.plugins.OAWeather.debug.value
@@ -79,8 +81,7 @@ class OAWeather(Source):
         self.precipitationtext = "Precipitation"
         self.humiditytext = "Humidity"
         self.feelsliketext = "Feels like"
-        self.logo = self.services.get(
-            config.plugins.OAWeather.weatherservice.value, "msn")
+        self.logo = self.services.get(weatherhandler.getProviderService(), "msn")
         self.pluginpath = None
         self.iconpath = None
 
@@ -92,8 +93,7 @@ class OAWeather(Source):
         self.debug("callbackUpdate: %s" % str(data))
         self.data = data or {}
         if hasattr(config.plugins, 'OAWeather'):
-            self.logo = self.services.get(
-                config.plugins.OAWeather.weatherservice.value, "msn")
+            self.logo = self.services.get(weatherhandler.getProviderService(), "msn")
         self.pressunit = self.getVal("pressunit")
         self.tempunit = self.getVal("tempunit")
         self.windunit = self.getVal("windunit")
@@ -305,6 +305,56 @@ class OAWeather(Source):
         return "%s / %s %s" % (self.getKeyforDay("minTemp", day),
                                self.getKeyforDay("maxTemp", day), self.tempunit)
 
+    def getTrendText(self, field, hours, unit, digits=0, scale=1.0):
+        """Change of a field of the observation history over the last 'hours', like '↑ +2 °C'"""
+        trend = weatherhandler.getTrend(field, hours)
+        if trend is None:
+            return self.na
+        trend = round(trend / scale, digits)
+        arrow = ""
+        if config.plugins.OAWeather.trendarrows.value:
+            arrow = "%s " % self.TRENDARROWS[0 if trend > 0 else 1 if trend < 0 else 2]
+        return "%s%+.*f %s" % (arrow, digits, trend, unit)
+
+    def getRangeText(self, field, hours, unit, digits=0, scale=1.0):
+        """Lowest and highest value of a field of the observation history over the last 'hours'"""
+        minmax = weatherhandler.getMinMax(field, hours)
+        if minmax is None:
+            return self.na
+        return "%.*f / %.*f %s" % (digits, minmax[0] / scale, digits, minmax[1] / scale, unit)
+
+    def getWindScale(self):
+        """Divisor and unit of the wind speed as configured for display"""
+        if self.windunit == "km/h" and config.plugins.OAWeather.windspeedMetricUnit.value == "m/s":
+            return 3.6, "m/s"
+        return 1.0, self.windunit
+
+    def getTemperatureTrend(self, hours=3):
+        return self.getTrendText("temp", hours, self.tempunit, 1)
+
+    def getPressureTrend(self, hours=3):
+        return self.getTrendText("pressure", hours, self.pressunit, 2 if self.pressunit == "inHg" else 1)
+
+    def getHumidityTrend(self, hours=3):
+        return self.getTrendText("humidity", hours, "%")
+
+    def getWindSpeedTrend(self, hours=3):
+        scale, windunit = self.getWindScale()
+        return self.getTrendText("windSpeed", hours, windunit, 1, scale)
+
+    def getTemperatureRange(self, hours=24):
+        return self.getRangeText("temp", hours, self.tempunit)
+
+    def getPressureRange(self, hours=24):
+        return self.getRangeText("pressure", hours, self.pressunit, 2 if self.pressunit == "inHg" else 0)
+
+    def getHumidityRange(self, hours=24):
+        return self.getRangeText("humidity", hours, "%")
+
+    def getWindSpeedRange(self, hours=24):
+        scale, windunit = self.getWindScale()
+        return self.getRangeText("windSpeed", hours, windunit, 1, scale)
+
     def getMaxFeelsLike(self, day):
         return "%s %s" % (self.getKeyforDay(
             "maxFeelsLike", day), self.tempunit)
@@ -323,32 +373,31 @@ class OAWeather(Source):
 
     def getMinWindSpeed(self, day):
         minwindspeed, windunit = self.getKeyforDay(
-            "maxWindSpeed", day), self.windunit
+            "minWindSpeed", day), self.windunit
         if windunit == "km/h" and config.plugins.OAWeather.windspeedMetricUnit.value == "m/s":
             minwindspeed, windunit = str(
                 round(int(minwindspeed) / 3.6, 1)), "m/s"
         return "%s %s" % (minwindspeed, windunit)
 
     def getDomWindDir(self, day):
-        return "%s %s" % (self.getKeyforDay("domWindDir", day), self.tempunit)
+        return "%s °" % self.getKeyforDay("domWindDir", day)
 
     def getDomWindDirSign(self, day):
-        val = self.getCurrentVal("domWindDirSign")
-        return ("%s °" % val) if val else self.na
+        return self.getKeyforDay("domWindDirSign", day, "")
 
     def getDomWindDirName(self, day):
-        skydirection = self.getKeyforDay("domWindDirSign", day)
+        skydirection = self.getKeyforDay("domWindDirSign", day, "")
         if skydirection:
-            skydirection = skydirection.split(" ")
-            return self.skydirs.get(skydirection[1], skydirection[1])
+            skydirection = skydirection.split(" ")[-1]
+            return self.skydirs.get(skydirection, skydirection)
         else:
             return self.na
 
     def getDomWindDirArrow(self, day):
-        return self.getKeyforDay("domWindDirSign", day).split(" ")[0]
+        return self.getKeyforDay("domWindDirSign", day, " ").split(" ")[0]
 
     def getDomWindDirShort(self, day):
-        return self.getKeyforDay("windDirSign", day).split(" ")[1]
+        return self.getKeyforDay("domWindDirSign", day, "").split(" ")[-1]
 
     def getMaxWindGusts(self, day):
         maxWindGusts, windunit = self.getKeyforDay(
@@ -479,6 +528,11 @@ class OAWeather(Source):
             self.debug("getKeyforDay key:%s day:%s / val:%s" % (key, day, val))
             return val
 
+    def doSuspend(self, suspend):
+        # all downstream widgets hidden -> let the handler stretch its refreshes
+        weatherhandler.policy.setConsumer(self, not suspend)
+
     def destroy(self):
         weatherhandler.onUpdate.remove(self.callbackUpdate)
+        weatherhandler.removeConsumer(self)
         Source.destroy(self)
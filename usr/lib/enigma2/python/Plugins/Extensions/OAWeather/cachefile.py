@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2023 jbleyel, Mr.Servo
+#
+# OAWeather is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# OAWeather is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with OAWeather.  If not, see <https://www.gnu.org/licenses/>.
+
+from atexit import register
+from json import dumps as jsondumps, loads as jsonloads
+from logging import getLogger
+from os import chmod, fsync, getuid, remove, rename, stat
+from os.path import isfile
+from struct import Struct, error as StructError
+from threading import Condition, Lock, Thread
+from time import time
+from zlib import compress, crc32, decompress, error as ZlibError
+
+logger = getLogger("OAWeather")
+
+# File layout: header + payload, all numbers big-endian
+#   magic "OAWC" | schema version (H) | flags (H) | payload length (I) | CRC32 of the payload (I)
+# The payload is UTF-8 JSON, zlib-compressed when FLAG_ZLIB is set. The cache
+# is small and local, so it is written uncompressed by default: zlib costs
+# more time on every save and load than it saves in reading fewer bytes.
+MAGIC = b"OAWC"
+VERSION = 1
+FLAG_ZLIB = 1
+HEADER = Struct(">4sHHII")
+KEYEDDICT = "\x00items"  # marks a dict with non-string keys, stored as [[key, value], ...]
+KEYEDTEXT = jsondumps(KEYEDDICT)  # the marker as it appears in the payload
+STRINGTYPES = (str, type(u""))  # unicode is a separate type in Python 2
+
+
+class CacheError(ValueError):
+    pass
+
+
+def encodeValue(value):
+    """Copy of 'value' which JSON can hold without losing int dict keys"""
+    if isinstance(value, dict):
+        if all(isinstance(key, STRINGTYPES) for key in value):
+            return dict((key, encodeValue(item)) for key, item in value.items())
+        for key in value:
+            if not (key is None or isinstance(key, STRINGTYPES + (int, float))):
+                raise CacheError("unsupported dict key %r" % (key,))
+        return {KEYEDDICT: [[key, encodeValue(item)] for key, item in value.items()]}
+    if isinstance(value, (list, tuple)):
+        return [encodeValue(item) for item in value]
+    return value
+
+
+def decodeDict(value):
+    if KEYEDDICT in value and len(value) == 1:
+        return dict((key, item) for key, item in value[KEYEDDICT])
+    return value
+
+
+def dumps(data, level=0):
+    """Serialize 'data' into the cache format, zlib-compressed at 'level' if it is not 0"""
+    payload = jsondumps(encodeValue(data), separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    flags = 0
+    if level:
+        payload = compress(payload, level)
+        flags |= FLAG_ZLIB
+    return HEADER.pack(MAGIC, VERSION, flags, len(payload), crc32(payload) & 0xffffffff) + payload
+
+
+def loads(blob):
+    """Parse the cache format, raises CacheError for foreign, damaged or newer data"""
+    try:
+        magic, version, flags, length, checksum = HEADER.unpack_from(blob)
+    except StructError:
+        raise CacheError("file too short")
+    if magic != MAGIC:
+        raise CacheError("not an OAWeather cache file")
+    if version > VERSION:
+        raise CacheError("cache schema %d is newer than %d" % (version, VERSION))
+    payload = blob[HEADER.size:]
+    if len(payload) != length or crc32(payload) & 0xffffffff != checksum:
+        raise CacheError("checksum mismatch")
+    try:
+        if flags & FLAG_ZLIB:
+            payload = decompress(payload)
+        text = payload.decode("utf-8")
+        data = jsonloads(text, object_hook=decodeDict) if KEYEDTEXT in text else jsonloads(text)
+    except (ZlibError, ValueError) as err:
+        raise CacheError("payload damaged: %s" % err)
+    return migrate(data, version)
+
+
+def migrate(data, version):
+    """Bring data of an older schema 'version' up to VERSION"""
+    # version 0 is the unversioned pickle written by earlier releases, its
+    # contents are the same dictionaries as in version 1
+    return data
+
+
+def isPickle(blob):
+    return blob[:1] == b"\x80"  # pickle protocol 2 and later
+
+
+def loadLegacy(path, blob):
+    """Read an old pickle cache, but only when nobody else could have written it"""
+    info = stat(path)
+    if info.st_uid != getuid() or info.st_mode & 0o022:
+        raise CacheError("refusing to unpickle %s, it is writable by other users" % path)
+    import pickle
+    try:
+        return migrate(pickle.loads(blob), 0)
+    except Exception as err:
+        raise CacheError("old cache not readable: %s" % err)
+
+
+def writeCache(path, data):
+    """Write 'data' atomically to 'path' in the cache format"""
+    blob = dumps(data)
+    tempfile = "%s.tmp" % path
+    try:
+        with open(tempfile, "wb") as fd:
+            fd.write(blob)
+            fd.flush()
+            fsync(fd.fileno())
+        rename(tempfile, path)
+        chmod(path, 0o644)
+    except (IOError, OSError):
+        if isfile(tempfile):
+            remove(tempfile)
+        raise
+    return len(blob)
+
+
+def readCache(path):
+    """Return the data stored in 'path', an old pickle cache is converted in place"""
+    with open(path, "rb") as fd:
+        blob = fd.read()
+    if blob[:len(MAGIC)] != MAGIC and isPickle(blob):
+        data = loadLegacy(path, blob)
+        try:
+            writeCache(path, data)
+            logger.info("Cache file %s converted to schema %d" % (path, VERSION))
+        except (CacheError, IOError, OSError) as err:
+            logger.warning("Cache file %s not converted: %s" % (path, err))
+        return data
+    return loads(blob)
+
+
+class CacheWriter(object):
+    """Write the newest cache data from a background thread
+
+    save() only stores the data and marks it dirty, the writer thread puts
+    it on disk at most once per 'interval' seconds, so a burst of refreshes
+    costs one write. flush() writes pending data at once, at shutdown it is
+    called automatically."""
+
+    def __init__(self, path, interval=60):
+        self.path = path
+        self.interval = interval
+        self.condition = Condition()
+        self.writeLock = Lock()
+        self.data = None
+        self.dirty = False
+        self.urgent = False
+        self.lastWrite = 0
+        self.requests = 0
+        self.writes = 0
+        self.generation = 0  # bumped by remove(), data taken before is not written any more
+        self.thread = None
+        register(self.flush)
+
+    def setInterval(self, configElement):
+        with self.condition:
+            self.interval = int(configElement.value)
+            self.condition.notify()
+
+    def save(self, data):
+        with self.condition:
+            self.data = data
+            self.dirty = True
+            self.requests += 1
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = Thread(target=self.run, name="OAWeatherCache")
+                self.thread.daemon = True
+                self.thread.start()
+            self.condition.notify()
+
+    def take(self):
+        """Return the pending data and its generation and clear the dirty flag, call with the condition held"""
+        data, self.data, self.dirty, self.urgent = self.data, None, False, False
+        return data, self.generation
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.dirty:
+                    self.condition.wait()
+                delay = self.lastWrite + self.interval - time()
+                if delay > 0 and not self.urgent:
+                    self.condition.wait(delay)
+                    continue
+                data, generation = self.take()
+            self.write(data, generation)
+
+    def write(self, data, generation):
+        with self.writeLock:
+            if generation != self.generation:  # removed after the data was taken
+                return
+            try:
+                writeCache(self.path, data)
+                self.writes += 1
+                logger.debug("Cache written, %d of %d save requests coalesced" % (self.requests - self.writes, self.requests))
+            except Exception as err:
+                logger.warning("Cache write error: %s" % err)
+            self.lastWrite = time()
+
+    def flush(self, wait=True):
+        """Write pending data now, in the caller's thread or, with wait=False, by the writer thread"""
+        with self.condition:
+            if not self.dirty:
+                return
+            if not wait:
+                self.urgent = True
+                self.condition.notify()
+                return
+            data, generation = self.take()
+        self.write(data, generation)
+
+    def load(self):
+        """Newest cache data, pending data takes precedence over the file"""
+        with self.condition:
+            if self.dirty:
+                return self.data
+        return readCache(self.path)
+
+    def remove(self):
+        """Drop pending data and delete the cache file"""
+        with self.condition:
+            self.take()
+            self.generation += 1
+        with self.writeLock:
+            if isfile(self.path):
+                remove(self.path)
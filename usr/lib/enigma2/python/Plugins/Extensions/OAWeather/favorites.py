@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2023 jbleyel, Mr.Servo
+#
+# OAWeather is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# OAWeather is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with OAWeather.  If not, see <https://www.gnu.org/licenses/>.
+
+from atexit import register
+from logging import getLogger
+from math import asin, cos, radians, sin, sqrt
+
+from enigma import eTimer
+
+logger = getLogger("OAWeather")
+
+EARTH_RADIUS = 6371.0  # km
+DUPLICATE_DISTANCE = 2.2  # km, locations closer than this are the same place
+CELLSIZE = 0.05  # degrees of the grid cells
+MAXRINGS = 40  # nearest() stops early only within this many rings, the grid is too distorted beyond
+
+
+def getDistance(lon1, lat1, lon2, lat2):
+    """Great-circle distance in km"""
+    lon1, lat1, lon2, lat2 = map(radians, (lon1, lat1, lon2, lat2))
+    a = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * asin(min(1.0, sqrt(a)))
+
+
+class FavoriteIndex(object):
+    """Lookup structures for a favorites list of (name, lon, lat) tuples
+
+    A grid of CELLSIZE degrees gives duplicate and nearest-location queries
+    without scanning the list, exact tuples and lower-case names map to the
+    list positions. 'version' is the change counter of the indexed list, the
+    owner bumps it on every change so that the index gets rebuilt."""
+
+    def __init__(self, favorites=None):
+        self.rebuild(favorites or [])
+
+    def rebuild(self, favorites, version=0):
+        self.source = favorites
+        self.version = version
+        self.size = 0
+        self.cells = {}
+        self.positions = {}
+        self.names = {}
+        for location in favorites:
+            self.add(location)
+
+    def isCurrent(self, favorites, version):
+        return self.source is favorites and self.version == version
+
+    def getCell(self, lon, lat):
+        return int((lon + 180.0) // CELLSIZE), int((lat + 90.0) // CELLSIZE)
+
+    def add(self, location):
+        """Index 'location' as the next list position"""
+        self.insert(self.size, location)
+        self.size += 1
+
+    def insert(self, position, location):
+        try:
+            name, lon, lat = location[0], float(location[1]), float(location[2])
+        except (IndexError, TypeError, ValueError):
+            return
+        self.cells.setdefault(self.getCell(lon, lat), []).append(position)
+        self.positions.setdefault(tuple(location), position)
+        self.names.setdefault(str(name).strip().lower(), []).append(position)
+
+    def replace(self, position, location):
+        """Replace the entry at 'position' in the indexed list and reindex it"""
+        self.source[position] = location
+        self.rebuild(self.source, self.version)
+
+    def indexOf(self, location):
+        """Position of exactly this location or -1"""
+        try:
+            return self.positions.get(tuple(location), -1)
+        except TypeError:
+            return -1
+
+    def findByName(self, name):
+        """Positions of all favorites with this name (case-insensitive)"""
+        return list(self.names.get(str(name).strip().lower(), []))
+
+    def getCandidates(self, lon, lat, rings):
+        """Positions in the cells up to 'rings' cells away from (lon, lat), ring by ring"""
+        cx, cy = self.getCell(lon, lat)
+        yield 0, list(self.cells.get((cx, cy), []))
+        for ring in range(1, rings + 1):
+            positions = []
+            for x in range(cx - ring, cx + ring + 1):  # top and bottom row of the ring
+                positions.extend(self.cells.get((x, cy - ring), []))
+                positions.extend(self.cells.get((x, cy + ring), []))
+            for y in range(cy - ring + 1, cy + ring):  # left and right column without the corners
+                positions.extend(self.cells.get((cx - ring, y), []))
+                positions.extend(self.cells.get((cx + ring, y), []))
+            yield ring, positions
+
+    def getPopulatedRings(self, lon, lat):
+        """Positions of all occupied cells grouped by ring around (lon, lat), nearest ring first"""
+        cx, cy = self.getCell(lon, lat)
+        rings = {}
+        for (x, y), positions in self.cells.items():
+            rings.setdefault(max(abs(x - cx), abs(y - cy)), []).extend(positions)
+        return sorted(rings.items())
+
+    def getRings(self, lat, distance):
+        """Number of cell rings needed to cover 'distance' km around latitude 'lat'"""
+        degrees = distance / 111.2
+        scale = cos(radians(min(abs(lat), 89.0)))
+        return int(degrees / CELLSIZE / scale) + 1
+
+    def findDuplicate(self, location, distance=DUPLICATE_DISTANCE):
+        """Position of a favorite closer than 'distance' km to 'location' or -1"""
+        try:
+            lon, lat = float(location[1]), float(location[2])
+        except (IndexError, TypeError, ValueError):
+            return -1
+        best, bestDistance = -1, distance
+        for ring, positions in self.getCandidates(lon, lat, self.getRings(lat, distance)):
+            for position in positions:
+                fav = self.source[position]
+                dist = getDistance(lon, lat, float(fav[1]), float(fav[2]))
+                if dist <= bestDistance:
+                    best, bestDistance = position, dist
+        return best
+
+    def nearest(self, lon, lat):
+        """Return (position, distance in km) of the nearest favorite, (-1, None) if there is none"""
+        best, bestDistance = -1, None
+        lon, lat = float(lon), float(lat)
+        for ring, positions in self.getPopulatedRings(lon, lat):
+            # everything in this and further rings is at least 'ring - 1' cells away
+            if best >= 0 and ring - 1 >= self.getRings(lat, bestDistance) and ring <= MAXRINGS:
+                break
+            for position in positions:
+                fav = self.source[position]
+                dist = getDistance(lon, lat, float(fav[1]), float(fav[2]))
+                if bestDistance is None or dist < bestDistance:
+                    best, bestDistance = position, dist
+        return best, bestDistance
+
+
+class WriteBehind(object):
+    """Coalesce save requests into one physical write per DELAY window
+
+    save() only keeps a snapshot and (re)starts the timer, the 'writer'
+    callable gets the latest snapshot when the window ends, on flush() and
+    when the interpreter exits."""
+    DELAY = 3000  # ms
+
+    def __init__(self, writer, name="data"):
+        self.writer = writer
+        self.name = name
+        self.snapshot = None
+        self.requests = 0
+        self.writes = 0
+        self.timer = eTimer()
+        self.timer.callback.append(self.flush)
+        register(self.flush)
+
+    def save(self, data):
+        self.snapshot = list(data)
+        self.requests += 1
+        self.timer.start(self.DELAY, True)
+
+    def flush(self):
+        self.timer.stop()
+        if self.snapshot is None:
+            return True
+        snapshot, self.snapshot = self.snapshot, None
+        result = self.writer(snapshot)
+        self.writes += 1
+        logger.info("%s written, %d of %d save requests coalesced" %
+                    (self.name, self.getAvoided(), self.requests))
+        return result
+
+    def getAvoided(self):
+        """Number of physical writes saved by coalescing so far"""
+        return self.requests - self.writes - (1 if self.snapshot is not None else 0)
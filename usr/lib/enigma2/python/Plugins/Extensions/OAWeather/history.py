@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2023 jbleyel, Mr.Servo
+#
+# OAWeather is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# OAWeather is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with OAWeather.  If not, see <https://www.gnu.org/licenses/>.
+
+from collections import OrderedDict, namedtuple
+from logging import getLogger
+from mmap import mmap
+from os import remove
+from os.path import getsize, isfile
+from struct import Struct
+from threading import Lock
+from time import time
+
+logger = getLogger("OAWeather")
+
+# File layout: header + CAPACITY fixed-size records, all numbers little-endian
+#   header: magic "OAWH" | version (H) | record size (H) | capacity (I) | records ever appended (Q)
+#   record: unix time (I) | temp * 10 (h) | pressure in hPa * 10 (H) | humidity (B) | wind speed * 10 (H) | yahoo code (B) | imperial (B)
+# The record of append number n lives in slot n % capacity, so the file never
+# grows and an append writes one record and the counter. Pressure is kept in
+# hPa whatever the provider's unit, 0.1 inHg would be too coarse for trends.
+MAGIC = b"OAWH"
+VERSION = 2
+HEADER = Struct("<4sHHIQ")
+RECORD = Struct("<IhHBHBB")
+CAPACITY = 2016  # one week at the shortest spacing
+SPACING = 300  # seconds, a newer observation within this time replaces the last record
+FIELDS = ("temp", "pressure", "humidity", "windSpeed", "code")
+MISSING = (-32768, 0xffff, 0xff, 0xffff, 0xff)  # per field, stored when the provider has no value
+LIMITS = ((-32767, 32767), (0, 0xfffe), (0, 0xfe), (0, 0xfffe), (0, 0xfe))
+SCALES = (10, 10, 1, 10, 1)
+PRESSUREUNITS = {"inHg": 33.8639, "mmHg": 1.33322}  # hPa per unit, everything else is taken as hPa
+
+Observation = namedtuple("Observation", ("time",) + FIELDS + ("imperial",))
+
+
+def toNumber(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class HistoryFile(object):
+    """Ring file of the observations at one location, read through a memory map"""
+
+    def __init__(self, path, capacity=CAPACITY):
+        self.path = path
+        self.capacity = capacity
+        self.lock = Lock()
+        size = HEADER.size + capacity * RECORD.size
+        if not isfile(path) or getsize(path) != size or not self.isValid():
+            with open(path, "wb") as fd:
+                fd.write(HEADER.pack(MAGIC, VERSION, RECORD.size, capacity, 0))
+                fd.truncate(size)
+        self.fd = open(path, "r+b")
+        self.map = mmap(self.fd.fileno(), size)
+        self.appended = HEADER.unpack_from(self.map)[4]
+
+    def isValid(self):
+        with open(self.path, "rb") as fd:
+            header = fd.read(HEADER.size)
+        if len(header) < HEADER.size:
+            return False
+        magic, version, recordsize, capacity, appended = HEADER.unpack(header)
+        return magic == MAGIC and version == VERSION and recordsize == RECORD.size and capacity == self.capacity
+
+    def __len__(self):
+        return min(self.appended, self.capacity)
+
+    def getOffset(self, index):
+        """File offset of the 'index'th of the kept records, 0 is the oldest"""
+        return HEADER.size + (self.appended - len(self) + index) % self.capacity * RECORD.size
+
+    def getTime(self, index):
+        return RECORD.unpack_from(self.map, self.getOffset(index))[0]
+
+    def append(self, observed, values, imperial=False):
+        """Store the FIELDS 'values' observed at unix time 'observed', None for unknown ones"""
+        packed = [int(observed)]
+        for value, missing, limits, scale in zip(values, MISSING, LIMITS, SCALES):
+            value = None if value is None else int(round(value * scale))
+            packed.append(value if value is not None and limits[0] <= value <= limits[1] else missing)
+        packed.append(1 if imperial else 0)
+        with self.lock:
+            if len(self):
+                last = self.getTime(len(self) - 1)
+                if observed < last:
+                    return False  # clock went back, keep the series ordered
+                if observed - last < SPACING:
+                    self.appended -= 1  # replace the last record
+            RECORD.pack_into(self.map, HEADER.size + self.appended % self.capacity * RECORD.size, *packed)
+            self.appended += 1
+            HEADER.pack_into(self.map, 0, MAGIC, VERSION, RECORD.size, self.capacity, self.appended)
+        return True
+
+    def unpack(self, index):
+        record = RECORD.unpack_from(self.map, self.getOffset(index))
+        values = [None if value == missing else float(value) / scale if scale > 1 else value
+                  for value, missing, scale in zip(record[1:6], MISSING, SCALES)]
+        return Observation(record[0], *(values + [bool(record[6])]))
+
+    def find(self, since):
+        """Index of the first kept record observed at or after 'since'"""
+        low, high = 0, len(self)
+        while low < high:
+            middle = (low + high) // 2
+            if self.getTime(middle) < since:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def getRange(self, since, until=None):
+        """Observations from 'since' up to 'until' (unix times), oldest first"""
+        with self.lock:
+            result = []
+            for index in range(self.find(since), len(self)):
+                observation = self.unpack(index)
+                if until is not None and observation.time > until:
+                    break
+                result.append(observation)
+            return result
+
+    def close(self):
+        with self.lock:
+            if self.map:
+                self.map.flush()
+                self.map.close()
+                self.fd.close()
+                self.map = None
+
+
+class HistoryStore(object):
+    """Observation history of all locations, one HistoryFile each
+
+    'getPath' maps a file name to its full path in the plugin's storage
+    directory. Only the MAXOPEN most recently used files stay mapped."""
+    MAXOPEN = 4
+
+    def __init__(self, getPath):
+        self.getPath = getPath
+        self.lock = Lock()
+        self.files = OrderedDict()
+
+    def getFilename(self, location):
+        return "OAWeather_history_%.2f_%.2f.bin" % (float(location[1]), float(location[2]))
+
+    def getFile(self, location):
+        filename = self.getFilename(location)
+        with self.lock:
+            history = self.files.pop(filename, None)
+            if history is None:
+                history = HistoryFile(self.getPath(filename))
+                while len(self.files) >= self.MAXOPEN:
+                    self.files.popitem(last=False)[1].close()
+            self.files[filename] = history
+            return history
+
+    def record(self, location, data, observed=None):
+        """Add the current conditions of the reduced weather 'data' to the history of 'location'"""
+        current = data.get("current", {})
+        values = [toNumber(current.get(key)) for key in ("temp", "pressure", "humidity", "windSpeed", "yahooCode")]
+        if values[0] is None:
+            return False
+        if values[1] is not None:
+            values[1] *= PRESSUREUNITS.get(data.get("pressunit"), 1.0)
+        try:
+            return self.getFile(location).append(observed or time(), values, data.get("tempunit", "").endswith("F"))
+        except (IOError, OSError, ValueError) as err:
+            logger.warning("History of %s not written: %s" % (location[0], err))
+            return False
+
+    def getSeries(self, location, field, hours, imperial=False, pressunit="hPa"):
+        """(time, value) pairs of 'field' over the last 'hours', oldest first
+
+        Values of the other unit system are left out, except the pressure
+        which is converted to 'pressunit'."""
+        try:
+            observations = self.getFile(location).getRange(time() - hours * 3600)
+        except (IOError, OSError, ValueError) as err:
+            logger.warning("History of %s not readable: %s" % (location[0], err))
+            return []
+        if field == "pressure":
+            factor = PRESSUREUNITS.get(pressunit, 1.0)
+            return [(observation.time, observation.pressure / factor) for observation in observations
+                    if observation.pressure is not None]
+        return [(observation.time, getattr(observation, field)) for observation in observations
+                if observation.imperial == imperial and getattr(observation, field) is not None]
+
+    def getTrend(self, location, field, hours, imperial=False, pressunit="hPa"):
+        """Change of 'field' over the last 'hours', None without two observations"""
+        series = self.getSeries(location, field, hours, imperial, pressunit)
+        return series[-1][1] - series[0][1] if len(series) > 1 else None
+
+    def getMinMax(self, location, field, hours, imperial=False, pressunit="hPa"):
+        """(lowest, highest) value of 'field' over the last 'hours', None without observations"""
+        values = [value for observed, value in self.getSeries(location, field, hours, imperial, pressunit)]
+        return (min(values), max(values)) if values else None
+
+    def remove(self, location):
+        filename = self.getFilename(location)
+        with self.lock:
+            history = self.files.pop(filename, None)
+            if history:
+                history.close()
+            path = self.getPath(filename)
+            if isfile(path):
+                remove(path)
+
+    def close(self):
+        with self.lock:
+            for history in self.files.values():
+                history.close()
+            self.files.clear()
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2023 jbleyel, Mr.Servo
+#
+# OAWeather is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# OAWeather is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with OAWeather.  If not, see <https://www.gnu.org/licenses/>.
+
+from collections import OrderedDict
+from os import listdir
+from os.path import dirname, basename, join
+from threading import Lock
+
+from Tools.LoadPixmap import LoadPixmap
+
+
+class IconCache(object):
+    """Process-wide cache of icon directory listings and decoded pixmaps
+
+    Each directory is listed once, afterwards lookups are plain set tests.
+    Decoded pixmaps are kept in a small LRU so the screens, the converter and
+    the renderer share them without touching the filesystem again."""
+
+    def __init__(self, maxPixmaps=160):
+        self.maxPixmaps = maxPixmaps
+        self.lock = Lock()
+        self.directories = {}
+        self.pixmaps = OrderedDict()
+
+    def getFilenames(self, directory):
+        filenames = self.directories.get(directory)
+        if filenames is None:
+            try:
+                filenames = frozenset(listdir(directory))
+            except OSError:
+                filenames = frozenset()
+            with self.lock:
+                self.directories[directory] = filenames
+        return filenames
+
+    def hasFile(self, directory, filename):
+        return filename in self.getFilenames(directory)
+
+    def getFile(self, directory, filename):
+        """Return the full path of 'filename' in 'directory' or "" if it is missing"""
+        return join(directory, filename) if directory and filename in self.getFilenames(directory) else ""
+
+    def getPixmap(self, path):
+        """Return the decoded pixmap for 'path' or None if there is no such icon"""
+        with self.lock:
+            if path in self.pixmaps:
+                pixmap = self.pixmaps.pop(path)
+                self.pixmaps[path] = pixmap  # most recently used goes last
+                return pixmap
+        if not path or basename(path) not in self.getFilenames(dirname(path)):
+            return None
+        pixmap = LoadPixmap(cached=True, path=path)
+        with self.lock:
+            self.pixmaps[path] = pixmap
+            while len(self.pixmaps) > self.maxPixmaps:
+                self.pixmaps.popitem(last=False)
+        return pixmap
+
+    def invalidate(self, configElement=None):
+        """Forget all listings and pixmaps, e.g. after the iconset has changed"""
+        with self.lock:
+            self.directories = {}
+            self.pixmaps = OrderedDict()
+
+
+iconcache = IconCache()
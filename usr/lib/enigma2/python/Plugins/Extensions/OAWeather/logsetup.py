@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2023 jbleyel, Mr.Servo
+#
+# OAWeather is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# OAWeather is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with OAWeather.  If not, see <https://www.gnu.org/licenses/>.
+
+import logging
+from atexit import register
+from threading import Lock, Thread
+try:
+    from queue import Empty, Full, Queue
+except ImportError:  # Python 2
+    from Queue import Empty, Full, Queue
+
+LOGFILE = "/tmp/OAWeather.log"
+MAXBYTES = 256 * 1024  # per file, /tmp is RAM on most receivers
+BACKUPCOUNT = 1
+QUEUESIZE = 1000  # records waiting for the writer thread
+FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+
+class AsyncHandler(logging.Handler):
+    """Hand records over to a writer thread which feeds the real handlers
+
+    emit() never blocks: when the bounded queue is full the record is
+    dropped and counted, the writer reports the number of lost records as
+    soon as it has caught up again."""
+    oaweather = True  # marks the handler installed by setupLogging()
+
+    def __init__(self, handlers, queuesize=QUEUESIZE):
+        logging.Handler.__init__(self)
+        self.handlers = handlers
+        self.queue = Queue(queuesize)
+        self.counterLock = Lock()
+        self.queued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.reported = 0
+        self.thread = Thread(target=self.run, name="OAWeatherLog")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def prepare(self, record):
+        """Resolve everything that must not be touched from another thread later"""
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def emit(self, record):
+        try:
+            self.queue.put_nowait(self.prepare(record))
+            with self.counterLock:
+                self.queued += 1
+        except Full:
+            with self.counterLock:
+                self.dropped += 1
+        except Exception:
+            self.handleError(record)
+
+    def run(self):
+        while True:
+            record = self.queue.get()
+            if record is None:
+                break
+            self.write(record)
+            if self.dropped > self.reported and self.queue.empty():
+                dropped, self.reported = self.dropped - self.reported, self.dropped
+                self.write(logging.makeLogRecord({
+                    "name": record.name, "levelno": logging.WARNING, "levelname": "WARNING",
+                    "msg": "%d log records dropped, the log queue was full" % dropped}))
+
+    def write(self, record):
+        for handler in self.handlers:
+            if record.levelno >= handler.level:
+                try:
+                    handler.handle(record)
+                except Exception:
+                    self.failed += 1
+        self.written += 1
+
+    def getStatistics(self):
+        """Counters of the records seen by this handler"""
+        with self.counterLock:
+            return {
+                "queued": self.queued,
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "pending": self.queue.qsize()
+            }
+
+    def stop(self, timeout=2.0):
+        """Write what is still queued and end the writer thread"""
+        if self.thread.is_alive():
+            try:
+                self.queue.put(None, timeout=timeout)
+            except Full:
+                pass
+            self.thread.join(timeout)
+        while True:  # anything the thread did not get to
+            try:
+                record = self.queue.get_nowait()
+            except Empty:
+                break
+            if record is not None:
+                self.write(record)
+        for handler in self.handlers:
+            handler.flush()
+
+    def close(self):
+        self.stop()
+        for handler in self.handlers:
+            handler.close()
+        logging.Handler.close(self)
+
+
+def getHandler(logger):
+    for handler in logger.handlers:
+        if getattr(handler, "oaweather", False):
+            return handler
+    return None
+
+
+def setupLogging(name, debug=False, logfile=LOGFILE, console=True):
+    """Configure the plugin logger once, later calls only adjust the level
+
+    The marker lives on the logger (kept by the logging module across plugin
+    reloads), so a reload does not add a second set of handlers."""
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.DEBUG if debug else logging.INFO)
+    handler = getHandler(logger)
+    if handler:
+        return handler
+    from logging.handlers import RotatingFileHandler  # only needed once logging is set up
+    formatter = logging.Formatter(FORMAT)
+    targets = []
+    try:
+        target = RotatingFileHandler(logfile, maxBytes=MAXBYTES, backupCount=BACKUPCOUNT)
+        target.setFormatter(formatter)
+        targets.append(target)
+    except (IOError, OSError) as err:
+        print("[%s] log file %s not usable: %s" % (name, logfile, err))
+    if console:
+        target = logging.StreamHandler()
+        target.setFormatter(formatter)
+        targets.append(target)
+    handler = AsyncHandler(targets)
+    logger.addHandler(handler)
+    register(handler.stop)
+    logger.info("%s logging initialized" % name)
+    return handler
+
+
+def getLogStatistics(name):
+    """Counters of the plugin log handler, empty when logging is not set up"""
+    handler = getHandler(logging.getLogger(name))
+    return handler.getStatistics() if handler else {}
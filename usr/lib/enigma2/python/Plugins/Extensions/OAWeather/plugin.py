@@ -27,16 +27,15 @@ from __future__ import print_function
 
 import json
 import logging
-import pickle
 import sys
 from datetime import datetime, timedelta
 from time import time
-from xml.etree.ElementTree import parse, tostring
 
-from os import fsync, listdir, remove, chmod, rename  # , stat
-from os.path import exists, expanduser, getmtime, isfile, join
+from os import fsync, listdir, chmod, rename  # , stat
+from os.path import basename, exists, expanduser, getmtime, isfile, join
 
-from twisted.internet.reactor import callInThread
+from twisted.internet.defer import Deferred, fail, succeed
+from twisted.internet.reactor import callFromThread, callInThread
 
 from keymapparser import readKeymap
 
@@ -69,8 +68,6 @@ from Screens.Setup import Setup
 from Screens.VirtualKeyBoard import VirtualKeyBoard
 
 from Tools.Directories import SCOPE_CONFIG, SCOPE_HDD, SCOPE_PLUGINS, resolveFilename
-from Tools.LoadPixmap import LoadPixmap
-from Tools.Weatherinfo import Weatherinfo
 
 
 if sys.version_info[0] >= 3:
@@ -79,16 +76,30 @@ else:
     from Tools.Directories import SCOPE_SKIN
 
 from . import __version__, _
+from .cachefile import CacheWriter
+from .favorites import DUPLICATE_DISTANCE, FavoriteIndex, WriteBehind, getDistance
+from .history import HistoryStore
+from .iconcache import iconcache
+from .logsetup import setupLogging
+from .providers import CHAIN, ProviderChain, getService
+from .storage import StorageDirectory
 
 screenwidth = getDesktop(0).size()
 
 MODULE_NAME = "OAWeather"
-CACHEFILE = resolveFilename(SCOPE_CONFIG, "OAWeather.dat")
-OAWEATHER_FAV = resolveFilename(SCOPE_CONFIG, "oaweather_fav.json")
 PLUGINPATH = join(resolveFilename(SCOPE_PLUGINS), 'Extensions/OAWeather')
 logger = logging.getLogger(MODULE_NAME)
 
 config.plugins.OAWeather = ConfigSubsection()
+config.plugins.OAWeather.storagePath = ConfigText(default="")
+storage = StorageDirectory([
+    resolveFilename(SCOPE_CONFIG),
+    resolveFilename(SCOPE_HDD),
+    "/tmp/",
+    expanduser("~/")
+], config.plugins.OAWeather.storagePath)
+CACHEFILE = storage.getPath("OAWeather.dat")
+OAWEATHER_FAV = storage.getPath("oaweather_fav.json")
 config.plugins.OAWeather.enabled = ConfigYesNo(default=False)
 ICONSETS = [("", _("Default"))]
 
@@ -104,14 +115,32 @@ if exists(ICONSETROOT):
 
 config.plugins.OAWeather.iconset = ConfigSelection(
     default="", choices=ICONSETS)
+config.plugins.OAWeather.iconset.addNotifier(
+    iconcache.invalidate, initial_call=False)  # rescan icons of the new set
 config.plugins.OAWeather.nighticons = ConfigYesNo(default=True)
 config.plugins.OAWeather.cachedata = ConfigSelection(default=0, choices=[(
     0, _("Disabled"))] + [(x, _("%d Minutes") % x) for x in (30, 60, 120)])
+config.plugins.OAWeather.cacheWriteInterval = ConfigSelection(default=60, choices=[(
+    0, _("Immediately"))] + [(x, _("%d Minutes") % (x // 60)) for x in (60, 300, 900)])
+config.plugins.OAWeather.history = ConfigYesNo(default=True)  # keep a week of observations for trends
 config.plugins.OAWeather.refreshInterval = ConfigSelectionNumber(
     0, 1440, 30, default=120, wraparound=True)
+config.plugins.OAWeather.standbyRefresh = ConfigSelection(
+    default="pause",
+    choices=[
+        ("pause",
+         _("Pause")),
+        ("reduced",
+         _("Reduced")),
+        ("normal",
+         _("Normal"))])
 config.plugins.OAWeather.apikey = ConfigText(default="", fixed_size=False)
+config.plugins.OAWeather.failover = ConfigYesNo(default=True)  # fall back to other providers
+config.plugins.OAWeather.hedging = ConfigYesNo(default=False)  # ask a second provider when the first is late
+config.plugins.OAWeather.gateway = ConfigText(default="", fixed_size=False)  # host[:port] of a WeatherGateway
 
 GEODATA = ("Frankfurt am Main, DE", "8.68417,50.11552")
+LOCATIONDEFAULT = ("Frankfurt am Main, DE", 8.68417, 50.11552)
 config.plugins.OAWeather.weathercity = ConfigText(
     default=GEODATA[0], visible_width=250, fixed_size=False)
 config.plugins.OAWeather.owm_geocode = ConfigText(default=GEODATA[1])
@@ -141,25 +170,135 @@ config.plugins.OAWeather.weatherservice = ConfigSelection(
 config.plugins.OAWeather.debug = ConfigYesNo(default=False)
 
 
-def setup_logging():
-    log_file = "/tmp/OAWeather.log"
-    log_level = logging.DEBUG if config.plugins.OAWeather.debug.value else logging.INFO
+def setup_logging(configElement=None):
+    """Install the plugin log handlers once, afterwards only follow the debug setting"""
+    setupLogging(MODULE_NAME, debug=config.plugins.OAWeather.debug.value)
+
+
+config.plugins.OAWeather.debug.addNotifier(setup_logging, initial_call=False)  # set up in sessionstart()
+
+
+class LazyInstance(object):
+    """Module level object that is only built on first use
+
+    Attribute reads and assignments go to the instance, which 'factory'
+    creates on the first of them. Other modules can import the name at
+    startup without paying for the construction."""
+
+    def __init__(self, factory):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_instance", None)
+
+    def _getInstance(self):
+        instance = object.__getattribute__(self, "_instance")
+        if instance is None:
+            instance = object.__getattribute__(self, "_factory")()
+            object.__setattr__(self, "_instance", instance)
+        return instance
+
+    def __getattr__(self, name):
+        return getattr(self._getInstance(), name)
 
-    logger.setLevel(log_level)
-    handler = logging.FileHandler(log_file)
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
+    def __setattr__(self, name, value):
+        setattr(self._getInstance(), name, value)
 
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
 
-    logger.info("OAWeather logging initialized")
+class LocationSearch(object):
+    """Asynchronous city search for the setup and favorites screens
+
+    Queries are debounced and superseded queries are dropped. The full name
+    and the first-word fallback are looked up concurrently, but the fallback
+    results are only shown when the full name finds nothing."""
+    DEBOUNCE = 500  # ms
+
+    def __init__(self, session, callback):
+        self.session = session
+        self.callback = callback
+        self.generation = 0
+        self.query = None
+        self.answers = []
+        self.choiceBox = None
+        self.debounceTimer = eTimer()
+        self.debounceTimer.callback.append(self.startSearch)
+
+    def search(self, cityname):
+        self.cancel()
+        self.query = cityname
+        self.debounceTimer.start(self.DEBOUNCE, True)
+
+    def cancel(self):
+        self.debounceTimer.stop()
+        self.generation += 1  # late answers of running queries get ignored
+        self.answers = []
+
+    def startSearch(self, cityname=None):
+        if cityname:
+            self.cancel()
+            self.query = cityname
+        service = config.plugins.OAWeather.weatherservice.value
+        apikey = config.plugins.OAWeather.apikey.value
+        scheme = config.osd.language.value.replace('_', '-').lower()
+        from Tools.Weatherinfo import SEARCH_BUDGET, Deadline, Weatherinfo
+        WI = Weatherinfo(service, apikey)
+        if WI.error:
+            self.searchFailed(WI.error)
+            return
+        queries = [self.query]
+        city, country = WI.separateCityCountry(self.query)
+        firstword = city.split(" ")[0]
+        if firstword != city:
+            queries.append(firstword if country is None else "%s,%s" % (firstword, country))
+        self.answers = [None] * len(queries)
+        deadline = Deadline(SEARCH_BUDGET)  # shared by the queries of this search
+        for index, query in enumerate(queries):
+            callInThread(self.runQuery, self.generation, index, service, apikey, query, scheme, deadline)
+
+    def runQuery(self, generation, index, service, apikey, query, scheme, deadline):
+        from Tools.Weatherinfo import Weatherinfo
+        WI = Weatherinfo(service, apikey)
+        try:
+            citylist = WI.getCitylist(query, scheme, fallback=False, deadline=deadline)
+        except Exception as e:
+            citylist, WI.error = None, str(e)
+        callFromThread(self.queryFinished, generation, index, citylist or [], WI.error)
+
+    def queryFinished(self, generation, index, citylist, error):
+        if generation != self.generation or self.choiceBox is not None:  # superseded, cancelled or shown
+            return
+        if error:
+            logger.info("Search query failed: " + str(error))
+        items = []
+        for item in citylist:
+            try:
+                item = (item[0], float(item[1]), float(item[2]))
+            except (TypeError, ValueError):
+                continue
+            if item not in items:
+                items.append(item)
+        self.answers[index] = items
+        for answer in self.answers:  # the first non-empty answer in query order wins
+            if answer is None:
+                return  # a preferred query is still running
+            if answer:
+                self.choiceBox = self.session.openWithCallback(
+                    self.choiceClosed, ChoiceBox, title=_("Select location"),
+                    list=[self.getChoice(item) for item in answer])
+                return
+        self.searchFailed(_("No locations found"))
 
+    def getChoice(self, item):
+        return ("{} [lon={:.3f}, lat={:.3f}]".format(item[0], item[1], item[2]), item)
 
-setup_logging()
+    def choiceClosed(self, result):
+        self.choiceBox = None
+        self.cancel()
+        WeatherHelper._safeCallback(self.callback, result)
+
+    def searchFailed(self, error):
+        logger.error("Search error: " + str(error))
+        self.cancel()
+        WeatherHelper._safeCallback(self.callback, None)
+        self.session.open(MessageBox, str(error), MessageBox.TYPE_ERROR)
 
 
 class WeatherHelper:
@@ -167,8 +306,12 @@ class WeatherHelper:
         self.version = __version__
         self.favoritefile = self.get_writable_path(OAWEATHER_FAV)
         logger.info("Using favorite file: " + str(self.favoritefile))
-        self.locationDefault = ("Frankfurt am Main, DE", 8.68417, 50.11552)
+        self.locationDefault = LOCATIONDEFAULT
         self.favoriteList = []
+        self.favoriteIndex = FavoriteIndex()
+        self.favoritesVersion = 0  # bumped on every change of favoriteList
+        self.favoriteWriter = WriteBehind(self.writeFavorites, "Favorites")
+        self.skinTemplates = {}
 
         try:
             self.readFavoriteList()
@@ -187,41 +330,8 @@ class WeatherHelper:
 
     @staticmethod
     def searchLocation(city_name, callback, session):
-        """Static method to search locations safely"""
-        try:
-            # Get the active weather service
-            service = config.plugins.OAWeather.weatherservice.value
-            apikey = config.plugins.OAWeather.apikey.value
-
-            # Initialize weather info
-            WI = Weatherinfo(service, apikey)
-            if WI.error:
-                raise Exception(WI.error)
-
-            # Get city list
-            geodatalist = WI.getCitylist(
-                city_name,
-                config.osd.language.value.replace('_', '-').lower()
-            )
-
-            if not geodatalist:
-                raise Exception(_("No locations found"))
-
-            # Prepare results
-            results = [(item[0], float(item[1]), float(item[2]))
-                       for item in geodatalist]
-
-            # Show selection screen
-            session.openWithCallback(
-                lambda result: WeatherHelper._safeCallback(
-                    callback, result), ChoiceBox, title=_("Select location"), list=[
-                    ("{} [lon={:.3f}, lat={:.3f}]".format(
-                        item[0], item[1], item[2]), item) for item in results])
-
-        except Exception as e:
-            logger.error("Search error: " + str(e))
-            WeatherHelper._safeCallback(callback, None)
-            session.open(MessageBox, str(e), MessageBox.TYPE_ERROR)
+        """Search locations in the background and let the user choose one"""
+        LocationSearch(session, callback).startSearch(city_name)
 
     @staticmethod
     def _safeCallback(callback, result):
@@ -243,7 +353,7 @@ class WeatherHelper:
                     lon, lat = map(float, current_geocode.split(","))
                     location = (current_city, lon, lat)
 
-                    if location not in self.favoriteList:
+                    if self.findFavorite(location) < 0:
                         self.addFavorite(location)
 
                     if hasattr(config.plugins.OAWeather, 'weatherlocation'):
@@ -260,37 +370,24 @@ class WeatherHelper:
             logger.error("Error in syncWithConfig: %s" % str(e))
 
     def get_writable_path(self, filename):
-        paths_to_try = [
-            resolveFilename(SCOPE_CONFIG, filename),
-            resolveFilename(SCOPE_HDD, filename),
-            "/tmp/" + filename,
-            expanduser("~/" + filename)
-        ]
-
-        for path in paths_to_try:
-            try:
-                testfile = path + ".test"
-                with open(testfile, "w") as f:
-                    f.write("test")
-                remove(testfile)
-                logger.info("Writable path found: " + str(path))
-                return path
-            except Exception as e:
-                logger.warning(
-                    "Path not writable: " +
-                    str(path) +
-                    " - " +
-                    str(e))
-
-        fallback = "/tmp/" + str(filename)
-        logger.warning("Using fallback path: " + str(fallback))
-        return fallback
+        return storage.getPath(basename(filename))
 
     def saveFavorites(self):
-        """Improved version but with the same name for compatibility"""
+        """Queue the favorites for writing, saves within a few seconds are written once
+
+        Every change of favoriteList is saved, so this also marks the favorite index stale."""
+        self.favoritesVersion += 1
+        self.favoriteWriter.save(self.favoriteList)
+        return True
+
+    def flushFavorites(self):
+        """Write queued favorites now"""
+        return self.favoriteWriter.flush()
+
+    def writeFavorites(self, favoriteList):
         try:
             logger.info("Saving %d favorites to %s" %
-                        (len(self.favoriteList), self.favoritefile))
+                        (len(favoriteList), self.favoritefile))
 
             temp_file = "%s.tmp" % self.favoritefile
 
@@ -303,7 +400,7 @@ class WeatherHelper:
                 return False
 
             try:
-                json.dump(self.favoriteList, f, indent=2, ensure_ascii=False)
+                json.dump(favoriteList, f, separators=(",", ":"), ensure_ascii=False)
                 f.flush()
                 fsync(f.fileno())
             finally:
@@ -331,9 +428,9 @@ class WeatherHelper:
                 f = codecs.open(fallback, "w", "utf-8")
                 try:
                     json.dump(
-                        self.favoriteList,
+                        favoriteList,
                         f,
-                        indent=2,
+                        separators=(",", ":"),
                         ensure_ascii=False)
                 finally:
                     f.close()
@@ -450,6 +547,7 @@ class WeatherHelper:
                 # Handle JSONDecodeError in Python 3 or fallback in Python 2
                 try:
                     # Try with pickle (old format)
+                    import pickle
                     with open(self.favoritefile, "rb") as file:
                         self.favoriteList = pickle.load(file)
 
@@ -478,16 +576,18 @@ class WeatherHelper:
     def addFavorite(self, location):
         name, lon, lat = location
         normalized = (str(name).strip(), float(lon), float(lat))
-        for i, fav in enumerate(self.favoriteList):
-            if not self.isDifferentLocation(normalized, fav):
-                if len(normalized[0]) > len(fav[0]):
-                    self.favoriteList[i] = normalized
-                    logger.info("Updated favorite: " + str(name))
-                    self.saveFavorites()
-                return False
+        index = self.getFavoriteIndex()
+        i = index.findDuplicate(normalized)
+        if i >= 0:
+            if len(normalized[0]) > len(self.favoriteList[i][0]):
+                index.replace(i, normalized)
+                logger.info("Updated favorite: " + str(name))
+                self.saveFavorites()
+            return False
 
         logger.info("Adding new favorite: " + str(name))
         self.favoriteList.append(normalized)
+        self.favoritesVersion += 1
         # Update config if this is the current location
         if config.plugins.OAWeather.weatherlocation.value == normalized:
             config.plugins.OAWeather.weathercity.value = name
@@ -508,8 +608,7 @@ class WeatherHelper:
                 favorite, tuple) and len(favorite) > 1 else favorite
 
             # Add to favorites if not already present
-            if not any(not self.isDifferentLocation(location, fav)
-                       for fav in self.favoriteList):
+            if self.getFavoriteIndex().findDuplicate(location) < 0:
                 self.addFavorite(location)
 
             # Update config
@@ -522,11 +621,8 @@ class WeatherHelper:
 
             logger.info("Location set to: " + str(location[0]))
 
-            # Refresh weather data
-            if callback:
-                callInThread(weatherhandler.reset, location, callback)
-            else:
-                callInThread(weatherhandler.reset, location)
+            # Refresh weather data, screens pick it up via weatherhandler.subscribe()
+            weatherhandler.reset(location, callback)
 
         except Exception as e:
             logger.error("Error handling favorite selection: " + str(e))
@@ -537,14 +633,26 @@ class WeatherHelper:
             config.plugins.OAWeather.weatherlocation.value = favorite[1]
             config.plugins.OAWeather.weatherlocation.save()
             weatherhelper.addFavorite(favorite[1])
-            callInThread(
-                weatherhandler.reset,
-                favorite[1],
-                self.configFinished)
+            weatherhandler.reset(favorite[1], self.configFinished)
 
     def setFavoriteList(self, favoriteList):
         self.favoriteList = favoriteList
 
+    def getFavoriteIndex(self):
+        """Index of favoriteList, rebuilt whenever the list was replaced or changed"""
+        if not self.favoriteIndex.isCurrent(self.favoriteList, self.favoritesVersion):
+            self.favoriteIndex.rebuild(self.favoriteList, self.favoritesVersion)
+        return self.favoriteIndex
+
+    def findFavorite(self, location):
+        """Position of exactly this location in favoriteList or -1"""
+        return self.getFavoriteIndex().indexOf(location)
+
+    def nearestFavorite(self, lon, lat):
+        """Return (favorite, distance in km) of the favorite nearest to lon/lat, (None, None) if there is none"""
+        position, distance = self.getFavoriteIndex().nearest(lon, lat)
+        return (self.favoriteList[position], distance) if position >= 0 else (None, None)
+
     def reduceCityname(self, weathercity):
         components = list(dict.fromkeys(weathercity.split(', ')))
         len_components = len(components)
@@ -563,8 +671,7 @@ class WeatherHelper:
         try:
             x, lon1, lat1 = geodata1
             x, lon2, lat2 = geodata2
-            distance = ((lon1 - lon2)**2 + (lat1 - lat2)**2)**0.5
-            return distance > 0.02
+            return getDistance(lon1, lat1, lon2, lat2) > DUPLICATE_DISTANCE
         except BaseException:
             return True
 
@@ -584,31 +691,52 @@ class WeatherHelper:
             config.plugins.OAWeather.weathercity.save()
 
     def loadSkin(self, skinName=""):
+        """Return the skin text of 'skinName'"""
+        for skinfile in self.getSkinFiles():
+            skintext = self.getSkinTemplates(skinfile).get(skinName)
+            if skintext:
+                return skintext
+        return ""
+
+    def getSkinFiles(self):
+        return [join(PLUGINPATH, "skin.xml")]  # skinfhd.xml is not in sync with skin.xml, see OAWeatherPlugin
+
+    def getSkinTemplates(self, skinfile):
+        """Parse 'skinfile' once into substituted screen texts, again only if its mtime changes"""
+        try:
+            mtime = getmtime(skinfile)
+        except OSError:
+            return {}
+        cached = self.skinTemplates.get(skinfile)
+        if cached and cached[0] == mtime:
+            return cached[1]
         params = {"picpath": join(PLUGINPATH, "Images")}
-        skintext = ""
-
-        xml = parse(join(PLUGINPATH, "skin.xml")).getroot()
-
+        templates = {}
+        from xml.etree.ElementTree import parse, tostring
+        try:
+            xml = parse(skinfile).getroot()
+        except Exception as e:
+            logger.error("Skin parse error in %s: %s" % (skinfile, str(e)))
+            return {}
         for screen in xml.findall('screen'):
-            if screen.get("name") == skinName:
-                raw = tostring(screen)
-
-                # Python 2/3 compatibility: decode only if bytes
-                if isinstance(raw, bytes):
-                    skintext = raw.decode("utf-8")
-                else:
-                    skintext = raw
+            raw = tostring(screen)
 
-                for key in params:
-                    try:
-                        skintext = skintext.replace(
-                            '{%s}' % key, str(params[key]))
-                    except Exception as e:
-                        print("%s@key=%s" % (str(e), key))
+            # Python 2/3 compatibility: decode only if bytes
+            if isinstance(raw, bytes):
+                skintext = raw.decode("utf-8")
+            else:
+                skintext = raw
 
-                break
+            for key in params:
+                try:
+                    skintext = skintext.replace(
+                        '{%s}' % key, str(params[key]))
+                except Exception as e:
+                    print("%s@key=%s" % (str(e), key))
 
-        return skintext
+            templates[screen.get("name")] = skintext
+        self.skinTemplates[skinfile] = (mtime, templates)
+        return templates
 
 
 """
@@ -619,12 +747,9 @@ It is managed automatically through:
 Selecting favorites
 Searching for new locations
 """
-weatherhelper = WeatherHelper()
-weatherhelper.readFavoriteList()
-choiceList = [(item, item[0]) for item in weatherhelper.favoriteList]
+weatherhelper = LazyInstance(WeatherHelper)  # reads the favorites on first use
 config.plugins.OAWeather.weatherlocation = ConfigSelection(
-    default=weatherhelper.locationDefault, choices=[])
-weatherhelper.updateConfigChoices()
+    default=LOCATIONDEFAULT, choices=[])  # choices are set when weatherhelper is built
 
 
 class WeatherSettingsViewNew(ConfigListScreen, Screen):
@@ -649,6 +774,9 @@ class WeatherSettingsViewNew(ConfigListScreen, Screen):
         self.old_weatherlocation = config.plugins.OAWeather.weatherlocation.value
         self.old_weatherservice = config.plugins.OAWeather.weatherservice.value
         self.onChangedEntry = []
+        self.locationSearch = LocationSearch(session, self.returnCityChoice)
+        self.onClose.append(self.locationSearch.cancel)
+        self.onClose.append(weatherhelper.flushFavorites)
         self.list = []
         ConfigListScreen.__init__(
             self,
@@ -694,6 +822,15 @@ class WeatherSettingsViewNew(ConfigListScreen, Screen):
                 getConfigListEntry(
                     _("Weather service :"),
                     config.plugins.OAWeather.weatherservice))
+            self.list.append(
+                getConfigListEntry(
+                    _("Use other services on failure :"),
+                    config.plugins.OAWeather.failover))
+            if config.plugins.OAWeather.failover.value:
+                self.list.append(
+                    getConfigListEntry(
+                        _("Ask a second service when slow :"),
+                        config.plugins.OAWeather.hedging))
             self.list.append(
                 getConfigListEntry(
                     _("Weather city name :"),
@@ -702,6 +839,10 @@ class WeatherSettingsViewNew(ConfigListScreen, Screen):
                 getConfigListEntry(
                     _("Weather API key :"),
                     config.plugins.OAWeather.apikey))
+            self.list.append(
+                getConfigListEntry(
+                    _("Weather gateway (host:port) :"),
+                    config.plugins.OAWeather.gateway))
             self.list.append(
                 getConfigListEntry(
                     _("Temperature unit :"),
@@ -722,10 +863,23 @@ class WeatherSettingsViewNew(ConfigListScreen, Screen):
                 getConfigListEntry(
                     _("Refresh interval :"),
                     config.plugins.OAWeather.refreshInterval))
+            self.list.append(
+                getConfigListEntry(
+                    _("Refresh in standby :"),
+                    config.plugins.OAWeather.standbyRefresh))
             self.list.append(
                 getConfigListEntry(
                     _("Cache data :"),
                     config.plugins.OAWeather.cachedata))
+            if config.plugins.OAWeather.cachedata.value:
+                self.list.append(
+                    getConfigListEntry(
+                        _("Cache write interval :"),
+                        config.plugins.OAWeather.cacheWriteInterval))
+            self.list.append(
+                getConfigListEntry(
+                    _("Keep weather history for trends :"),
+                    config.plugins.OAWeather.history))
             self.list.append(
                 getConfigListEntry(
                     _("Enable Debug :"),
@@ -742,6 +896,11 @@ class WeatherSettingsViewNew(ConfigListScreen, Screen):
                 self.session.openWithCallback(
                     self.VirtualKeyBoardCallBack, VirtualKeyBoard, title=title)
 
+            elif item_text == _("Weather gateway (host:port) :"):
+                self.session.openWithCallback(
+                    self.VirtualKeyBoardCallBack, VirtualKeyBoard, title=_("Please enter the gateway address."),
+                    text=current_item[1].value)
+
             elif item_text == _("Weather API key :"):
                 text = current_item[1].value
 
@@ -764,8 +923,7 @@ class WeatherSettingsViewNew(ConfigListScreen, Screen):
             return
 
         self.closeonsave = closesave
-        weatherhelper.searchLocation(
-            weathercity, self.returnCityChoice, self.session)
+        self.locationSearch.search(weathercity)
 
     def returnCityChoice(self, selected_location):
         if not selected_location:
@@ -926,6 +1084,15 @@ class WeatherSettingsViewNew(ConfigListScreen, Screen):
                     getConfigListEntry(
                         _("Weather service :"),
                         config.plugins.OAWeather.weatherservice))
+                self.list.append(
+                    getConfigListEntry(
+                        _("Use other services on failure :"),
+                        config.plugins.OAWeather.failover))
+                if config.plugins.OAWeather.failover.value:
+                    self.list.append(
+                        getConfigListEntry(
+                            _("Ask a second service when slow :"),
+                            config.plugins.OAWeather.hedging))
                 self.list.append(
                     getConfigListEntry(
                         _("Weather city name :"),
@@ -934,6 +1101,10 @@ class WeatherSettingsViewNew(ConfigListScreen, Screen):
                     getConfigListEntry(
                         _("Weather API key :"),
                         config.plugins.OAWeather.apikey))
+                self.list.append(
+                    getConfigListEntry(
+                        _("Weather gateway (host:port) :"),
+                        config.plugins.OAWeather.gateway))
                 self.list.append(
                     getConfigListEntry(
                         _("Temperature unit :"),
@@ -950,10 +1121,23 @@ class WeatherSettingsViewNew(ConfigListScreen, Screen):
                     getConfigListEntry(
                         _("Refresh interval :"),
                         config.plugins.OAWeather.refreshInterval))
+                self.list.append(
+                    getConfigListEntry(
+                        _("Refresh in standby :"),
+                        config.plugins.OAWeather.standbyRefresh))
                 self.list.append(
                     getConfigListEntry(
                         _("Cache data :"),
                         config.plugins.OAWeather.cachedata))
+                if config.plugins.OAWeather.cachedata.value:
+                    self.list.append(
+                        getConfigListEntry(
+                            _("Cache write interval :"),
+                            config.plugins.OAWeather.cacheWriteInterval))
+                self.list.append(
+                    getConfigListEntry(
+                        _("Keep weather history for trends :"),
+                        config.plugins.OAWeather.history))
                 self.list.append(
                     getConfigListEntry(
                         _("Enable Debug :"),
@@ -994,14 +1178,67 @@ class WeatherSettingsViewNew(ConfigListScreen, Screen):
             )
 
 
+class WeatherFetch:
+    """One provider request in flight, shared by every caller asking for the same 'key'"""
+
+    def __init__(self, key, generation, location):
+        self.key = key  # (provider, location, units, language)
+        self.generation = generation  # newest refresh request this fetch answers
+        self.location = location
+
+
+class RefreshPolicy:
+    """Decides if and how often the refresh timer may fetch new data"""
+    IDLE_STRETCH = 4  # interval multiplier while no consumer is visible
+    STANDBY_STRETCH = 6  # interval multiplier in standby (mode 'reduced')
+
+    def __init__(self):
+        self.inStandby = False
+        self.consumers = set()
+        self.onResume = []
+
+    def setStandby(self, standby):
+        wasStandby = self.inStandby
+        self.inStandby = standby
+        logger.debug("RefreshPolicy standby=%s" % standby)
+        if wasStandby and not standby:
+            self.resume()
+
+    def setConsumer(self, consumer, active):
+        wasIdle = self.isIdle()
+        if active:
+            self.consumers.add(consumer)
+        else:
+            self.consumers.discard(consumer)
+        if wasIdle and not self.isIdle() and not self.inStandby:
+            self.resume()
+
+    def resume(self):
+        for callback in self.onResume:
+            callback()
+
+    def isIdle(self):
+        return not self.consumers
+
+    def getInterval(self, seconds):
+        """Return the stretched refresh interval or None if refreshes are paused"""
+        if self.inStandby:
+            mode = config.plugins.OAWeather.standbyRefresh.value
+            if mode == "pause":
+                return None
+            if mode == "reduced":
+                return seconds * self.STANDBY_STRETCH
+        if self.isIdle():
+            return seconds * self.IDLE_STRETCH
+        return seconds
+
+
 class WeatherHandler():
     logger.info("Using WeatherHandler")
 
     def __init__(self):
         self.session = None
-        modes = {"MSN": "msn", "openweather": "owm", "OpenMeteo": "omw"}
-        mode = modes.get(config.plugins.OAWeather.weatherservice.value, "msn")
-        self.WI = Weatherinfo(mode, config.plugins.OAWeather.apikey.value)
+        self.weatherinfo = None  # created on first use, see WI
         # apy_key = config.plugins.OAWeather.apikey.value
         # self.geocode = config.plugins.OAWeather.owm_geocode.value.split(",")
         self.geocode = self.getValidGeocode()
@@ -1017,7 +1254,25 @@ class WeatherHandler():
         self.weatherDict = {}
         self.fullWeatherDict = {}
         self.onUpdate = []
+        self.listeners = []
+        self.futures = []
         self.refreshCallback = None
+        self.fetchLocation = None
+        self.dataLocation = None
+        self.fetches = {}  # WeatherFetch by key, see refreshWeatherData()
+        self.gatewayClient = None
+        self.gatewayAddress = None
+        self.providers = ProviderChain()
+        self.hedger = None  # created when hedged fetches are first used
+        self.dataProvider = None  # Weatherinfo mode of the current data, None means the configured one
+        self.generation = 0
+        self.lastUpdate = 0
+        self.refreshPending = False
+        self.policy = RefreshPolicy()
+        self.policy.onResume.append(self.resumeRefresh)
+        self.cacheWriter = CacheWriter(CACHEFILE)
+        config.plugins.OAWeather.cacheWriteInterval.addNotifier(self.cacheWriter.setInterval)
+        self.history = HistoryStore(storage.getPath)
         self.skydirs = {
             "N": _("North"),
             "NE": _("Northeast"),
@@ -1028,6 +1283,15 @@ class WeatherHandler():
             "W": _("West"),
             "NW": _("Northwest")}
 
+    @property
+    def WI(self):
+        if self.weatherinfo is None:
+            from Tools.Weatherinfo import Weatherinfo
+            modes = {"MSN": "msn", "openweather": "owm", "OpenMeteo": "omw"}
+            mode = modes.get(config.plugins.OAWeather.weatherservice.value, "msn")
+            self.weatherinfo = Weatherinfo(mode, config.plugins.OAWeather.apikey.value)
+        return self.weatherinfo
+
     def getValidGeocode(self):
         """Get valid coordinates or use default ones"""
         try:
@@ -1046,20 +1310,120 @@ class WeatherHandler():
                 return location
         except BaseException:
             pass
-        return weatherhelper.locationDefault
+        return LOCATIONDEFAULT
 
     def sessionStart(self, session):
         self.session = session
         weatherhelper.updateConfigChoices()
-        self.getCacheData()
+        config.misc.standbyCounter.addNotifier(
+            self.standbyCountChanged, initial_call=False)
+        cache_data = self.getCacheData()
+        if cache_data:
+            self.writeData(cache_data)
+        else:
+            self.refreshTimer.start(3000, True)
+
+    def standbyCountChanged(self, configElement):
+        from Screens.Standby import inStandby
+        weatherhelper.flushFavorites()  # standby often precedes a power cut
+        self.cacheWriter.flush(wait=False)
+        if inStandby:
+            inStandby.onClose.append(self.leaveStandby)
+        self.policy.setStandby(True)
+
+    def leaveStandby(self):
+        self.policy.setStandby(False)
+
+    def addConsumer(self, consumer):
+        self.policy.setConsumer(consumer, True)
+
+    def removeConsumer(self, consumer):
+        self.policy.setConsumer(consumer, False)
+
+    def subscribe(self, callback, location=None):
+        """Call 'callback(data, error)' on the main thread on every update, optionally only for 'location'"""
+        self.listeners.append((callback, tuple(location) if location else None))
+
+    def unsubscribe(self, callback):
+        self.listeners = [
+            listener for listener in self.listeners if listener[0] != callback]
+
+    def whenValid(self, location=None):
+        """Return a one-shot Deferred fired with the next valid data, at once if it is already there
+
+        While the handler waits out an error, the last data of the location is
+        served if there is any, otherwise the Deferred fails at once."""
+        location = tuple(location) if location else None
+        if self.currentWeatherDataValid in (0, 2) and self.weatherDict and self.isDataLocation(
+                location, self.dataLocation):
+            return succeed(self.weatherDict)
+        if self.currentWeatherDataValid == 2:
+            return fail(Exception(_("Weather data unavailable")))
+        future = Deferred()
+        self.futures.append((future, location))
+        return future
+
+    def dropFuture(self, future):
+        """Forget a pending future from whenValid(), it will never fire"""
+        self.futures = [item for item in self.futures if item[0] is not future]
+
+    def isDataLocation(self, wanted, location):
+        return wanted is None or location is None or tuple(wanted) == tuple(location)
+
+    def notifyListeners(self, data, error, location):
+        for callback, wanted in self.listeners[:]:
+            if self.isDataLocation(wanted, location):
+                try:
+                    callback(data, error)
+                except Exception as e:
+                    logger.error("Listener error: " + str(e))
+        futures, self.futures = self.futures, []
+        for future, wanted in futures:
+            if not self.isDataLocation(wanted, location):
+                self.futures.append((future, wanted))
+            elif error:
+                future.errback(Exception(error))
+            else:
+                future.callback(data)
 
-    def writeData(self, data):
+    def writeData(self, data, location=None):
         self.currentWeatherDataValid = 0
         self.weatherDict = data
+        self.dataLocation = location or self.currLocation
+        self.lastUpdate = time()
         for callback in self.onUpdate:
             callback(data)
+        self.notifyListeners(data, None, self.dataLocation)
+        self.startRefreshTimer()
+
+    def startRefreshTimer(self):
+        seconds = int(config.plugins.OAWeather.refreshInterval.value) * 60
+        seconds = self.policy.getInterval(seconds)
+        if seconds is None:  # paused: catch up when resumed
+            self.refreshPending = True
+        else:
+            self.refreshTimer.start(seconds * 1000, True)
+
+    def resumeRefresh(self):
+        """Serve the last known data at once and catch up with one fetch if due"""
+        if not self.weatherDict:
+            cache_data = self.getCacheData(anyAge=True)  # stale data is better than none
+            if cache_data:
+                self.currentWeatherDataValid = 0
+                self.weatherDict = cache_data
+                for callback in self.onUpdate:
+                    callback(cache_data)
         seconds = int(config.plugins.OAWeather.refreshInterval.value) * 60
-        self.refreshTimer.start(seconds * 1000, True)
+        if not seconds:  # no periodic refresh, nothing to catch up with
+            self.refreshPending = False
+            return
+        age = time() - self.lastUpdate
+        if self.refreshPending or age >= seconds:
+            self.refreshPending = False
+            logger.info("Catch-up refresh after suspension")
+            self.refreshTimer.start(1000, True)
+        else:
+            self.refreshTimer.start(int(seconds - age) * 1000, True)
 
     def getData(self):
         return self.weatherDict
@@ -1067,6 +1431,46 @@ class WeatherHandler():
     def getFulldata(self):
         return self.fullWeatherDict
 
+    def getProviderService(self):
+        """Weather service (config value) which produced the current data"""
+        if self.dataProvider:
+            return getService(self.dataProvider)
+        return config.plugins.OAWeather.weatherservice.value
+
+    def getProviderStats(self):
+        return self.providers.getStats()
+
+    def getTrend(self, field, hours):
+        """Change of a history field (temp, pressure, humidity, windSpeed) at the shown location over 'hours'"""
+        location = self.dataLocation or self.currLocation
+        if not location or not self.weatherDict:
+            return None
+        return self.history.getTrend(location, field, hours, self.isImperial(), self.weatherDict.get("pressunit", "hPa"))
+
+    def getMinMax(self, field, hours):
+        """(lowest, highest) value of a history field at the shown location over 'hours'"""
+        location = self.dataLocation or self.currLocation
+        if not location or not self.weatherDict:
+            return None
+        return self.history.getMinMax(location, field, hours, self.isImperial(), self.weatherDict.get("pressunit", "hPa"))
+
+    def removeHistory(self, location):
+        """Delete the observation history of a removed favorite unless another favorite shares its file"""
+        filename = self.history.getFilename(location)
+        if any(self.history.getFilename(favorite) == filename for favorite in weatherhelper.favoriteList):
+            return
+        try:
+            self.history.remove(location)
+        except (IOError, OSError) as err:
+            logger.warning("History of %s not removed: %s" % (location[0], err))
+
+    def isImperial(self):
+        return self.weatherDict.get("tempunit", "").endswith("F")
+
+    def getHedgeStats(self):
+        """Counters of the hedged fetches: requests, fired, hedgeWon, primaryWon, failover, failed"""
+        return self.hedger.getStats() if self.hedger else {}
+
     if sys.version_info[0] >= 3:
         logger.info("Python 3 getValid")
 
@@ -1088,16 +1492,15 @@ class WeatherHandler():
         def getSkydirs(self):
             return self.skydirs
 
-    def getCacheData(self):
+    def getCacheData(self, anyAge=False):
+        """Cached weather data, None if there is none or it is older than the cache time unless 'anyAge'"""
         cacheminutes = int(config.plugins.OAWeather.cachedata.value)
-        if cacheminutes and isfile(CACHEFILE):
-            timedelta = (time() - getmtime(CACHEFILE)) // 60
-            if cacheminutes > timedelta:
-                with open(CACHEFILE, "rb") as fd:
-                    cache_data = pickle.load(fd)
-                self.writeData(cache_data)
-                return
-        self.refreshTimer.start(3000, True)
+        if cacheminutes and isfile(CACHEFILE) and (anyAge or cacheminutes > (time() - getmtime(CACHEFILE)) // 60):
+            try:
+                return self.cacheWriter.load()
+            except Exception as e:
+                logger.warning("Cache load error: " + str(e))
+        return None
 
     def getCurrLocation(self):
         return self.currLocation
@@ -1110,6 +1513,9 @@ class WeatherHandler():
         if config.misc.firstrun.value:  # don't refresh on firstrun try again after 10 seconds
             self.refreshTimer.start(600000, True)
             return
+        if self.policy.getInterval(1) is None:  # paused in standby, catch up on wake-up
+            self.refreshPending = True
+            return
         if config.plugins.OAWeather.enabled.value:
             # Get the geocode from the configuration
             location = config.plugins.OAWeather.weatherlocation.value
@@ -1125,17 +1531,97 @@ class WeatherHandler():
             language = config.osd.language.value.lower().replace('_', '-')
             unit = "imperial" if config.plugins.OAWeather.tempUnit.value == "Fahrenheit" else "metric"
 
-            # Start the weather info retrieval
-            self.WI.start(
-                geodata=geodata,
-                cityID=None,
-                units=unit,
-                scheme=language,
-                reduced=True,
-                callback=self.refreshWeatherDataCallback
-            )
-
-    def refreshWeatherDataCallback(self, data, error):
+            self.startFetch(geodata, unit, language)
+
+    def startFetch(self, geodata, unit, language):
+        """Fetch the weather for 'geodata', joining an identical fetch that is still running
+
+        Every request gets a new generation, only the result of a fetch that
+        answers the newest generation is used, so an older request which is
+        slower than a newer one can never overwrite its data."""
+        self.generation += 1
+        self.fetchLocation = geodata
+        key = (self.WI.mode, tuple(geodata), unit, language)
+        fetch = self.fetches.get(key)
+        if fetch:
+            fetch.generation = self.generation
+            logger.debug("Joined running fetch for %s" % geodata[0])
+            return
+        fetch = WeatherFetch(key, self.generation, geodata)
+        self.fetches[key] = fetch
+        modes = [self.WI.mode]
+        if config.plugins.OAWeather.failover.value:
+            modes += [mode for mode in CHAIN if mode != self.WI.mode and (mode != "owm" or self.WI.apikey)]
+        callInThread(self.runFetch, fetch, self.getClient(), self.providers.getOrder(self.WI.mode, modes) or [self.WI.mode],
+                     dict(geodata=geodata, units=unit, scheme=language, reduced=True))
+
+    def runFetch(self, fetch, client, order, kwargs):
+        """Ask the providers in 'order' until one answers or the refresh's time budget is used up, runs in a thread"""
+        from Tools.Weatherinfo import REFRESH_BUDGET, Deadline, WeatherResult
+        deadline = kwargs["deadline"] = Deadline(REFRESH_BUDGET)
+        result = None
+        hedged = [mode for mode in order if self.providers.isClosed(mode)][:2]
+        if config.plugins.OAWeather.hedging.value and len(hedged) == 2:
+            result = self.getHedger().fetch(client, hedged, onResult=self.providers.record, **kwargs)
+            order = [] if result.ok else [mode for mode in order if mode not in hedged]
+        for mode in order:
+            if deadline.expired():
+                logger.warning("Time budget of %d s used up for %s, %s not asked" % (REFRESH_BUDGET, fetch.location[0], mode))
+                break
+            if not self.providers.begin(mode):
+                continue
+            result = client.fetch(mode=mode, **kwargs)
+            self.providers.record(result)
+            if result.ok:
+                break
+            logger.warning("Provider %s failed for %s: %s" % (mode, fetch.location[0], result.error))
+        if result is None and not deadline.expired():  # no circuit lets a request through, ask the first provider anyway
+            result = client.fetch(mode=order[0], **kwargs)
+            self.providers.record(result)
+        if result is None:
+            now = time()
+            result = WeatherResult(None, None, "[%s] ERROR: time budget of %d s exhausted" % (MODULE_NAME, REFRESH_BUDGET),
+                                   order[0], kwargs["geodata"], kwargs["units"], kwargs["scheme"], True, now, now)
+        self.refreshWeatherDataCallback(result, fetch)
+
+    def getHedger(self):
+        if self.hedger is None:
+            from Tools.Weatherinfo import Hedger
+            self.hedger = Hedger()
+        return self.hedger
+
+    def getClient(self):
+        """The configured WeatherGateway or, without one, the provider client itself"""
+        address = config.plugins.OAWeather.gateway.value.strip()
+        if not address:
+            return self.WI
+        if self.gatewayClient is None or self.gatewayAddress != address:
+            from Tools.WeatherGateway import GatewayClient
+            self.gatewayClient, self.gatewayAddress = GatewayClient(address), address
+        return self.gatewayClient
+
+    def refreshWeatherDataCallback(self, result, fetch):
+        # runs in the fetch thread: hand the result over to the main thread
+        callFromThread(self.fetchFinished, fetch, result)
+
+    def fetchFinished(self, fetch, result):
+        if self.fetches.get(fetch.key) is fetch:
+            del self.fetches[fetch.key]
+        if fetch.generation != self.generation:
+            logger.debug("Dropped stale result for %s" % fetch.location[0])
+            return
+        logger.debug("Fetch for %s took %.2f s" % (fetch.location[0], result.duration))
+        if result.ok:
+            if result.mode != self.WI.mode:
+                logger.info("Weather data for %s served by fallback provider %s" % (fetch.location[0], result.mode))
+            self.dataProvider = result.mode
+            if config.plugins.OAWeather.cachedata.value and self.currLocation == config.plugins.OAWeather.weatherlocation.value:
+                self.cacheWriter.save(result.data)  # written later by the cache writer thread
+            if config.plugins.OAWeather.history.value:
+                self.history.record(fetch.location, result.data)
+        self.processWeatherData(result.data, result.error, result.info, fetch.location)
+
+    def processWeatherData(self, data, error, info, location):
         if error or data is None:
             self.trialcounter += 1
             if self.trialcounter < 2:
@@ -1156,28 +1642,26 @@ class WeatherHandler():
                     (MODULE_NAME, self.weathercity))
                 self.currentWeatherDataValid = 2
                 self.refreshTimer.start(300000, True)
+            if self.currentWeatherDataValid == 2:
+                self.notifyListeners(
+                    None, error or _("Weather data unavailable"), location)
             return
-        self.writeData(data)
-        self.fullWeatherDict = self.WI.info
-
-        # TODO write cache only on close
-        if config.plugins.OAWeather.cachedata.value and self.currLocation == config.plugins.OAWeather.weatherlocation.value:
-            with open(CACHEFILE, "wb") as fd:
-                pickle.dump(data, fd, -1)
+        self.fullWeatherDict = info
+        self.writeData(data, location)
         if self.refreshCallback:
             self.refreshCallback()
             self.refreshCallback = None
 
     def reset(self, newLocation=None, callback=None):
         self.refreshCallback = callback
+        self.currentWeatherDataValid = 1
         if newLocation:
             self.currLocation = newLocation
             config.plugins.OAWeather.weatherlocation.value = newLocation
             config.plugins.OAWeather.weatherlocation.save()
 
         self.refreshTimer.stop()
-        if isfile(CACHEFILE):
-            remove(CACHEFILE)
+        self.cacheWriter.remove()
 
         modes = {"MSN": "msn", "openweather": "owm", "OpenMeteo": "omw"}
         mode = modes.get(config.plugins.OAWeather.weatherservice.value, "msn")
@@ -1204,6 +1688,8 @@ def setup(session, **kwargs):
 
 
 def sessionstart(session, **kwargs):
+    setup_logging()
+    weatherhelper.updateConfigChoices()  # favorites first, the handler starts with the configured location
     from Components.Sources.OAWeather import OAWeather
     session.screen["OAWeather"] = OAWeather()
     session.screen["OAWeather"].precipitationtext = _("Precipitation")
@@ -1280,12 +1766,13 @@ class OAWeatherPlugin(Screen):
         try:
             weatherLocation = config.plugins.OAWeather.weatherlocation.value
             # Ensure the saved location exists in favorites
-            if weatherLocation in weatherhelper.favoriteList:
-                self.currFavIdx = weatherhelper.favoriteList.index(
-                    weatherLocation)
+            favIdx = weatherhelper.findFavorite(weatherLocation)
+            if favIdx >= 0:
+                self.currFavIdx = favIdx
             else:
-                # If not, use first favorite or default
-                self.currFavIdx = 0 if weatherhelper.favoriteList else 0
+                # If not (renamed or rounded), use the nearest favorite or default
+                nearest = weatherhelper.nearestFavorite(weatherLocation[1], weatherLocation[2])[0]
+                self.currFavIdx = max(weatherhelper.findFavorite(nearest), 0) if nearest else 0
                 config.plugins.OAWeather.weatherlocation.value = weatherhelper.favoriteList[
                     self.currFavIdx] if weatherhelper.favoriteList else weatherhelper.locationDefault
                 config.plugins.OAWeather.weatherlocation.save()
@@ -1328,27 +1815,27 @@ class OAWeatherPlugin(Screen):
         for i in range(1, 6):
             self["weekday%s_temp" % i] = StaticText()
 
+        weatherhandler.addConsumer(self)
+        weatherhandler.subscribe(self.weatherDataUpdated)
+        self.onClose.append(self.detachHandler)
         self.onLayoutFinish.append(self.startRun)
 
     def startRun(self):
-        if not weatherhandler.getData() or weatherhandler.getValid() != 0:
+        valid = weatherhandler.getValid()
+        if valid == 2:
+            self.error(_("Weather data unavailable"))
+        elif valid != 0 or not weatherhandler.getData():
             self["statustext"].text = _("Loading weather data...")
         else:
             self.data = weatherhandler.getData() or {}
             self.getWeatherDataCallback()
 
-        self.checkDataTimer = eTimer()
-        self.checkDataTimer.callback.append(self.checkDataUpdate)
-        self.checkDataTimer.start(1000)
-
-    def checkDataUpdate(self):
-        if weatherhandler.getValid() == 0:
-            self.data = weatherhandler.getData()
-            self.getWeatherDataCallback()
-            self.checkDataTimer.stop()
-        elif weatherhandler.getValid() == 2:
+    def weatherDataUpdated(self, data, error):
+        if error:
             self.error(_("Weather data unavailable"))
-            self.checkDataTimer.stop()
+        else:
+            self.data = data or {}
+            self.getWeatherDataCallback()
 
     def clearFields(self):
         for idx in range(1, 6):
@@ -1386,17 +1873,18 @@ class OAWeatherPlugin(Screen):
         if weatherhelper.favoriteList:
             self.currFavIdx = (self.currFavIdx -
                                1) % len(weatherhelper.favoriteList)
-            callInThread(weatherhandler.reset,
-                         weatherhelper.favoriteList[self.currFavIdx],
-                         self.configFinished)
+            self.changeLocation(weatherhelper.favoriteList[self.currFavIdx])
 
     def favoriteDown(self):
         if weatherhelper.favoriteList:
             self.currFavIdx = (self.currFavIdx +
                                1) % len(weatherhelper.favoriteList)
-            callInThread(weatherhandler.reset,
-                         weatherhelper.favoriteList[self.currFavIdx],
-                         self.configFinished)
+            self.changeLocation(weatherhelper.favoriteList[self.currFavIdx])
+
+    def changeLocation(self, location):
+        self.clearFields()
+        self["statustext"].text = _("Loading weather data...")
+        weatherhandler.reset(location)
 
     def favoriteChoice(self):
         """Opens the complete favorite management screen"""
@@ -1416,10 +1904,10 @@ class OAWeatherPlugin(Screen):
             config.plugins.OAWeather.save()
 
             # Reset weather data
-            callInThread(weatherhandler.reset, result, self.configFinished)
+            self.changeLocation(result)
 
     def returnFavoriteChoice(self, favorite):
-        weatherhelper.handleFavoriteSelection(favorite, self.configFinished)
+        weatherhelper.handleFavoriteSelection(favorite)
 
     def saveConfig(self):
         config.plugins.OAWeather.save()
@@ -1438,6 +1926,10 @@ class OAWeatherPlugin(Screen):
         self.clearFields()
         self["statustext"].text = errortext
 
+    def detachHandler(self):
+        weatherhandler.unsubscribe(self.weatherDataUpdated)
+        weatherhandler.removeConsumer(self)
+
 
 class OAWeatherDetailFrame(Screen):
     def __init__(self, session):
@@ -1533,8 +2025,7 @@ class OAWeatherDetailview(Screen):
         Screen.__init__(self, session)
         self.detailFrame = self.session.instantiateDialog(OAWeatherDetailFrame)
         self.detailFrameActive = False
-        self.currFavIdx = weatherhelper.favoriteList.index(
-            currlocation) if currlocation in weatherhelper.favoriteList else 0
+        self.currFavIdx = max(weatherhelper.findFavorite(currlocation), 0)
         self.old_weatherservice = config.plugins.OAWeather.weatherservice.value
 
         self.detailLevels = config.plugins.OAWeather.detailLevel.choices
@@ -1545,6 +2036,9 @@ class OAWeatherDetailview(Screen):
         self.currdaydelta = 0
         self.skinList = []
         self.dayList = [[]]
+        self.pageKey = None
+        self.pages = {}
+        self.prefetching = False
         self.sunList = []
         self.moonList = []
         self.na = _("n/a")
@@ -1604,6 +2098,10 @@ class OAWeatherDetailview(Screen):
         self.WindGustPix = self.getPixmap("windgust.png")
         self.uvIndexPix = self.getPixmap("uv_index.png")
         self.visiblePix = self.getPixmap("binoculars.png")
+        self.dataFuture = None
+        weatherhandler.addConsumer(self)
+        weatherhandler.subscribe(self.weatherDataUpdated)
+        self.onClose.append(self.detachHandler)
         self.onLayoutFinish.append(self.firstRun)
 
     def firstRun(self):
@@ -1624,8 +2122,26 @@ class OAWeatherDetailview(Screen):
         self.startRun()
 
     def startRun(self):
+        self.waitForData()
+
+    def waitForData(self, location=None):
+        if self.dataFuture:
+            weatherhandler.dropFuture(self.dataFuture)
+        self.dataFuture = weatherhandler.whenValid(location)
+        self.dataFuture.addCallbacks(self.dataReady, self.dataFailed)
+
+    def dataReady(self, data):
+        self.dataFuture = None
         callInThread(self.parseData)
 
+    def dataFailed(self, failure):
+        self.dataFuture = None
+        self["statustext"].setText(_("Weather data unavailable"))
+
+    def weatherDataUpdated(self, data, error):
+        if not error and self.dataFuture is None:  # a pending waitForData() parses by itself
+            callInThread(self.parseData)
+
     def updateSkinList(self):
         try:
             weekday = _('Today') if self.currdatehour.weekday(
@@ -1633,23 +2149,13 @@ class OAWeatherDetailview(Screen):
             self["currdatetime"].setText(
                 weekday + " " + self.currdatehour.strftime("%d %b"))
 
-            iconpix = [
-                self.pressPix,
-                self.tempPix,
-                self.feelPix,
-                self.humidPix,
-                self.precipPix,
-                self.WindSpdPpix,
-                self.WindDirPix,
-                self.WindGustPix,
-                self.uvIndexPix if config.plugins.OAWeather.weatherservice.value != "openweather" else None,
-                self.visiblePix]
-
             if self.dayList:
-                hourData = self.dayList[self.currdaydelta]
-                skinList = []
-                for hour in hourData:
-                    skinList.append(tuple(hour + iconpix))
+                skinList = self.getPage(self.currdaydelta)
+                missing = [nextday % len(self.dayList) for nextday in (self.currdaydelta + 1, self.currdaydelta - 1)
+                           if (self.pageKey, nextday % len(self.dayList)) not in self.pages]
+                if missing and not self.prefetching:  # at most one prefetch in flight
+                    self.prefetching = True
+                    callInThread(self.prefetchPages, missing)
             else:
                 # Create default "No data" entry
                 no_data = [
@@ -1659,7 +2165,7 @@ class OAWeatherDetailview(Screen):
                     _("Try refreshing or check settings"),
                     None
                 ]
-                skinList = [tuple(no_data + iconpix)]
+                skinList = [tuple(no_data + self.getRowIcons())]
 
             self["detailList"].setList(skinList)
             self.skinList = skinList
@@ -1667,6 +2173,40 @@ class OAWeatherDetailview(Screen):
         except Exception as e:
             logger.error("Error updating skin list: " + str(e))
 
+    def getRowIcons(self):
+        return [
+            self.pressPix,
+            self.tempPix,
+            self.feelPix,
+            self.humidPix,
+            self.precipPix,
+            self.WindSpdPpix,
+            self.WindDirPix,
+            self.WindGustPix,
+            self.uvIndexPix if weatherhandler.getProviderService() != "openweather" else None,
+            self.visiblePix]
+
+    def getPage(self, day):
+        """Return the skin rows of 'day', built on first use and cached for the current data set"""
+        key = (self.pageKey, day)
+        page = self.pages.get(key)
+        if page is None:
+            iconpix = self.getRowIcons()
+            page = [tuple(record[0](*record[1:]) + iconpix)
+                    for record in self.dayList[day]]
+            if key[0] == self.pageKey:  # data set may have changed while building
+                self.pages[key] = page
+        return page
+
+    def prefetchPages(self, days):
+        try:
+            for day in days:
+                self.getPage(day)
+        except Exception as e:
+            logger.error("Page prefetch error: " + str(e))
+        finally:
+            self.prefetching = False
+
     def updateDetailFrame(self):
         if self.detailFrameActive:
             current = self["detailList"].getCurrent()
@@ -1715,14 +2255,25 @@ class OAWeatherDetailview(Screen):
             self["sunset"].setText("")
 
     def getPixmap(self, filename):
-        iconfile = join(PLUGINPATH, "Images/" + filename)
-        return LoadPixmap(
-            cached=True,
-            path=iconfile) if exists(iconfile) else None
+        return iconcache.getPixmap(join(PLUGINPATH, "Images", filename))
+
+    def setPageKey(self):
+        location = weatherhandler.dataLocation
+        pageKey = (
+            tuple(location) if location else None,
+            weatherhandler.lastUpdate,
+            weatherhandler.dataProvider,
+            config.plugins.OAWeather.tempUnit.value,
+            config.plugins.OAWeather.windspeedMetricUnit.value,
+            config.plugins.OAWeather.nighticons.value,
+            config.plugins.OAWeather.iconset.value)
+        if pageKey != self.pageKey:
+            self.pageKey = pageKey
+            self.pages = {}
 
     def parseData(self):
         try:
-            weatherservice = config.plugins.OAWeather.weatherservice.value
+            weatherservice = weatherhandler.getProviderService()  # may be a fallback provider
             if weatherservice in ["MSN", "OpenMeteo", "openweather"]:
                 parser = {
                     "MSN": self.msnparser,
@@ -1733,6 +2284,7 @@ class OAWeatherDetailview(Screen):
             else:
                 logger.warning("Unsupported service: " + str(weatherservice))
                 self.dayList = []
+            self.setPageKey()
 
             # Initialize dayList if empty
             if not hasattr(self, "dayList") or not self.dayList:
@@ -1746,16 +2298,31 @@ class OAWeatherDetailview(Screen):
         except Exception as e:
             logger.error("Data parsing error: " + str(e))
             self.dayList = [[]]
+            self.pageKey = None
         finally:
             self.updateDisplay()
 
-    def msnparser(self):
+    def getIconPath(self):
         iconpath = config.plugins.OAWeather.iconset.value
-        iconpath = join(
+        return join(
             ICONSETROOT,
             iconpath) if iconpath else join(
             PLUGINPATH,
             "Icons")
+
+    def getIcon(self, yahoocode):
+        return iconcache.getPixmap(join(self.iconpath, yahoocode + ".png"))
+
+    def getUnits(self):
+        tempunit = "°C" if config.plugins.OAWeather.tempUnit.value == "Celsius" else "°F"
+        windunit = " km/h" if config.plugins.OAWeather.windspeedMetricUnit.value == 'km/h' else " m/s"
+        return tempunit, windunit
+
+    # The parsers below only split the data into days of row records
+    # (builder, args...); the rows themselves are built page by page in getPage()
+
+    def msnparser(self):
+        self.iconpath = self.getIconPath()
         dayList = []
         responses = weatherhandler.getFulldata().get("responses")
         if responses:  # collect latest available data
@@ -1769,58 +2336,18 @@ class OAWeatherDetailview(Screen):
             sunsetstr = today["almanac"].get("sunset", "")
             sunsetstr = datetime.fromisoformat(sunsetstr).replace(
                 tzinfo=None).isoformat() if sunsetstr else ""
-            created = current.get("created")
-            currtime = datetime.fromisoformat(created).replace(
-                tzinfo=None) if created else ""
-            timestr = currtime.strftime("%H:%M h") if currtime else ""
-            tempunit = "°C" if config.plugins.OAWeather.tempUnit.value == "Celsius" else "°F"
-            press = str(round(current.get('baro', 0))) + " mbar"
-            temp = str(round(current.get('temp', 0))) + " " + tempunit
-            feels = str(round(current.get('feels', 0))) + " " + tempunit
-            humid = str(round(current.get('rh', 0))) + " %"
             hourly = today["hourly"]
             # workaround: use value from next hour if available
             precip = str(round(hourly[0]['precip'])) + \
                 " %" if len(hourly) else self.na
-            windSpd = str(round(current.get('windSpd', 0))) + (
-                " km/h" if config.plugins.OAWeather.windspeedMetricUnit.value == 'km/h' else " m/s")
-            windDir = _(
-                weatherhandler.WI.directionsign(
-                    round(
-                        current.get(
-                            'windDir',
-                            0))))
-            windGusts = str(round(current.get('windGust', 0))) + (
-                " km/h" if config.plugins.OAWeather.windspeedMetricUnit.value == 'km/h' else " m/s")
-            uvIndex = str(round(current.get('uv', 0)))
-            visibility = str(round(current.get('vis', 0))) + " km"
-            shortDesc = current.get("pvdrCap", "")  # e.g. 'bewölkt'
-            # e.g. "Der Himmel wird bewölkt."
-            longDesc = nowcasting.get("summary", "")
-            yahoocode = weatherhandler.WI.convert2icon(
-                "MSN", current.get("symbol", "")).get("yahooCode")
-            yahoocode = self.nightSwitch(
-                yahoocode, self.getIsNight(
-                    currtime, sunrisestr, sunsetstr))
-            iconfile = join(iconpath, yahoocode + ".png")
-            iconpix = LoadPixmap(
-                cached=True,
-                path=iconfile) if iconfile and exists(iconfile) else None
-            hourData = []
-            hourData.append([timestr,
-                             press,
-                             temp,
-                             feels,
-                             humid,
-                             precip,
-                             windSpd,
-                             windDir,
-                             windGusts,
-                             uvIndex,
-                             visibility,
-                             shortDesc,
-                             longDesc,
-                             iconpix])
+            hourData = [(self.msnRow,
+                         current,
+                         current.get("created"),
+                         "%H:%M h",
+                         sunrisestr,
+                         sunsetstr,
+                         precip,
+                         nowcasting.get("summary", ""))]
             days = weather["forecast"]["days"]
             if days:
                 self.sunList = []
@@ -1843,67 +2370,59 @@ class OAWeatherDetailview(Screen):
                     moonsetstr = datetime.fromisoformat(moonsetstr).replace(
                         tzinfo=None).isoformat() if moonsetstr else ""
                     for hour in day.get("hourly", []):
-                        valid = hour.get("valid")
-                        currtime = datetime.fromisoformat(
-                            valid).replace(tzinfo=None) if valid else ""
-                        timestr = currtime.strftime(
-                            "%H:%M h") if currtime else ""
-                        press = str(round(hour.get('baro', 0))) + " mbar"
-                        tempunit = "°C" if config.plugins.OAWeather.tempUnit.value == "Celsius" else "°F"
-                        temp = str(round(hour.get('temp', 0))) + " " + tempunit
-                        feels = str(round(hour.get('feels', 0))) + \
-                            " " + tempunit
-                        humid = str(round(hour.get('rh', 0))) + " %"
-                        precip = str(round(hour.get('precip', 0))) + " %"
-                        windSpd = str(round(hour.get('windSpd', 0))) + (
-                            " km/h" if config.plugins.OAWeather.windspeedMetricUnit.value == 'km/h' else " m/s")
-                        windDir = _(
-                            weatherhandler.WI.directionsign(
-                                round(
-                                    hour.get(
-                                        'windDir',
-                                        0))))
-                        windGusts = str(round(hour.get('windGust', 0))) + (
-                            " km/h" if config.plugins.OAWeather.windspeedMetricUnit.value == 'km/h' else " m/s")
-                        uvIndex = str(round(hour.get('uv', 0)))
-                        visibility = str(round(hour.get('vis', 0))) + " km"
-                        shortDesc = hour.get("pvdrCap", "")  # e.g. 'bewölkt'
-                        # e.g. "Der Himmel wird bewölkt."
-                        longDesc = hour.get("summary", "")
-                        yahoocode = weatherhandler.WI.convert2icon("MSN", hour.get("symbol", "")).get(
-                            "yahooCode")  # e.g. 'n4000' -> {'yahooCode': '26', 'meteoCode': 'Y'}
-                        yahoocode = self.nightSwitch(
-                            yahoocode, self.getIsNight(
-                                currtime, sunrisestr, sunsetstr))
-                        iconfile = join(iconpath, yahoocode + ".png")
-                        iconpix = LoadPixmap(
-                            cached=True, path=iconfile) if iconfile and exists(iconfile) else None
-                        hourData.append([timestr,
-                                         press,
-                                         temp,
-                                         feels,
-                                         humid,
-                                         precip,
-                                         windSpd,
-                                         windDir,
-                                         windGusts,
-                                         uvIndex,
-                                         visibility,
-                                         shortDesc,
-                                         longDesc,
-                                         iconpix])
+                        hourData.append((self.msnRow,
+                                         hour,
+                                         hour.get("valid"),
+                                         "%H:%M h",
+                                         sunrisestr,
+                                         sunsetstr,
+                                         None,
+                                         hour.get("summary", "")))
                     dayList.append(hourData)
                     self.sunList.append((sunrisestr, sunsetstr))
                     self.moonList.append((moonrisestr, moonsetstr))
         self.dayList = dayList
 
+    def msnRow(self, item, isotime, timeformat, sunrisestr, sunsetstr, precip, longDesc):
+        tempunit, windunit = self.getUnits()
+        currtime = datetime.fromisoformat(
+            isotime).replace(tzinfo=None) if isotime else ""
+        timestr = currtime.strftime(timeformat) if currtime else ""
+        press = str(round(item.get('baro', 0))) + " mbar"
+        temp = str(round(item.get('temp', 0))) + " " + tempunit
+        feels = str(round(item.get('feels', 0))) + " " + tempunit
+        humid = str(round(item.get('rh', 0))) + " %"
+        if precip is None:
+            precip = str(round(item.get('precip', 0))) + " %"
+        windSpd = str(round(item.get('windSpd', 0))) + windunit
+        windDir = _(weatherhandler.WI.directionsign(
+            round(item.get('windDir', 0))))
+        windGusts = str(round(item.get('windGust', 0))) + windunit
+        uvIndex = str(round(item.get('uv', 0)))
+        visibility = str(round(item.get('vis', 0))) + " km"
+        shortDesc = item.get("pvdrCap", "")  # e.g. 'bewölkt'
+        yahoocode = weatherhandler.WI.convert2icon("MSN", item.get("symbol", "")).get(
+            "yahooCode")  # e.g. 'n4000' -> {'yahooCode': '26', 'meteoCode': 'Y'}
+        yahoocode = self.nightSwitch(
+            yahoocode, self.getIsNight(
+                currtime, sunrisestr, sunsetstr))
+        return [timestr,
+                press,
+                temp,
+                feels,
+                humid,
+                precip,
+                windSpd,
+                windDir,
+                windGusts,
+                uvIndex,
+                visibility,
+                shortDesc,
+                longDesc,  # e.g. "Der Himmel wird bewölkt."
+                self.getIcon(yahoocode)]
+
     def omwparser(self):
-        iconpath = config.plugins.OAWeather.iconset.value
-        iconpath = join(
-            ICONSETROOT,
-            iconpath) if iconpath else join(
-            PLUGINPATH,
-            "Icons")
+        self.iconpath = self.getIconPath()
         fulldata = weatherhandler.getFulldata()
         if fulldata:
             daily = fulldata.get("daily", {})
@@ -1920,71 +2439,16 @@ class OAWeatherDetailview(Screen):
             dayList = []
             if hourly:
                 timeList = hourly.get("time", [])
-                pressList = hourly.get("pressure_msl")
-                tempList = hourly.get("temperature_2m", [])
-                feelsList = hourly.get("apparent_temperature", [])
-                humidList = hourly.get("relativehumidity_2m", [])
-                precipList = hourly.get("precipitation_probability", [])
-                wSpeedList = hourly.get("windspeed_10m", [])
-                wGustList = hourly.get("wind_gusts_10m", [])
-                wDirList = hourly.get("winddirection_10m", [])
-                uvList = hourly.get("uv_index", [])
-                visList = hourly.get("visibility", [])
-                wCodeList = hourly.get("weathercode", [])
-                currday = datetime.fromisoformat(
-                    timeList[0]).replace(
-                    hour=0, minute=0, second=0, microsecond=0)
+                currday = timeList[0][:10]
                 daycount = 0
                 hourData = []
                 for idx, isotime in enumerate(timeList):
-                    currtime = datetime.fromisoformat(isotime)
-                    timestr = currtime.strftime("%H:%M h")
-                    press = str(round(pressList[idx])) + " mbar"
-                    tempunit = "°C" if config.plugins.OAWeather.tempUnit.value == "Celsius" else "°F"
-                    temp = str(round(tempList[idx])) + " " + tempunit
-                    feels = str(round(feelsList[idx])) + " " + tempunit
-                    humid = str(round(humidList[idx])) + " %"
-                    precip = str(round(precipList[idx])) + " %"
-                    windSpd = str(
-                        round(
-                            wSpeedList[idx])) + (
-                        " km/h" if config.plugins.OAWeather.windspeedMetricUnit.value == 'km/h' else " m/s")
-                    windDir = _(
-                        weatherhandler.WI.directionsign(
-                            round(
-                                round(
-                                    wDirList[idx]))))
-                    windGusts = str(round(wGustList[idx])) + (
-                        " km/h" if config.plugins.OAWeather.windspeedMetricUnit.value == 'km/h' else " m/s")
-                    uvIndex = str(round(uvList[idx]))
-                    visibility = str(round(visList[idx] / 1000)) + " km"
-                    shortDesc, longDesc = "", ""  # OMW does not support description texts at all
-                    isNight = self.getIsNight(
-                        currtime, sunriseList[daycount], sunsetList[daycount])
-                    yahoocode = self.nightSwitch(
-                        weatherhandler.WI.convert2icon(
-                            "OMW",
-                            wCodeList[idx]).get("yahooCode"),
-                        isNight)  # e.g. '1' -> {'yahooCode': '34', 'meteoCode': 'B'}
-                    iconfile = join(iconpath, yahoocode + ".png")
-                    iconpix = LoadPixmap(
-                        cached=True, path=iconfile) if iconfile and exists(iconfile) else None
-                    hourData.append([timestr,
-                                     press,
-                                     temp,
-                                     feels,
-                                     humid,
-                                     precip,
-                                     windSpd,
-                                     windDir,
-                                     windGusts,
-                                     uvIndex,
-                                     visibility,
-                                     shortDesc,
-                                     longDesc,
-                                     iconpix])
-                    timeday = currtime.replace(
-                        hour=0, minute=0, second=0, microsecond=0)
+                    hourData.append((self.omwRow,
+                                     hourly,
+                                     idx,
+                                     sunriseList[daycount],
+                                     sunsetList[daycount]))
+                    timeday = isotime[:10]  # ISO dates compare like the dates themselves
                     if timeday > currday:  # is a new day?
                         currday = timeday
                         daycount += 1
@@ -1992,13 +2456,45 @@ class OAWeatherDetailview(Screen):
                         hourData = []
             self.dayList = dayList
 
+    def omwRow(self, hourly, idx, sunrisestr, sunsetstr):
+        tempunit, windunit = self.getUnits()
+        currtime = datetime.fromisoformat(hourly["time"][idx])
+        timestr = currtime.strftime("%H:%M h")
+        press = str(round(hourly.get("pressure_msl")[idx])) + " mbar"
+        temp = str(round(hourly.get("temperature_2m", [])[idx])) + " " + tempunit
+        feels = str(round(hourly.get("apparent_temperature", [])[idx])) + " " + tempunit
+        humid = str(round(hourly.get("relativehumidity_2m", [])[idx])) + " %"
+        precip = str(round(hourly.get("precipitation_probability", [])[idx])) + " %"
+        windSpd = str(round(hourly.get("windspeed_10m", [])[idx])) + windunit
+        windDir = _(weatherhandler.WI.directionsign(
+            round(hourly.get("winddirection_10m", [])[idx])))
+        windGusts = str(round(hourly.get("wind_gusts_10m", [])[idx])) + windunit
+        uvIndex = str(round(hourly.get("uv_index", [])[idx]))
+        visibility = str(round(hourly.get("visibility", [])[idx] / 1000)) + " km"
+        shortDesc, longDesc = "", ""  # OMW does not support description texts at all
+        isNight = self.getIsNight(currtime, sunrisestr, sunsetstr)
+        yahoocode = self.nightSwitch(
+            weatherhandler.WI.convert2icon(
+                "OMW",
+                hourly.get("weathercode", [])[idx]).get("yahooCode"),
+            isNight)  # e.g. '1' -> {'yahooCode': '34', 'meteoCode': 'B'}
+        return [timestr,
+                press,
+                temp,
+                feels,
+                humid,
+                precip,
+                windSpd,
+                windDir,
+                windGusts,
+                uvIndex,
+                visibility,
+                shortDesc,
+                longDesc,
+                self.getIcon(yahoocode)]
+
     def owmparser(self):
-        iconpath = config.plugins.OAWeather.iconset.value
-        iconpath = join(
-            ICONSETROOT,
-            iconpath) if iconpath else join(
-            PLUGINPATH,
-            "Icons")
+        self.iconpath = self.getIconPath()
         fulldata = weatherhandler.getFulldata()
         if fulldata:
             city = fulldata.get("city", {})
@@ -2010,127 +2506,14 @@ class OAWeatherDetailview(Screen):
                 sunsetTs).isoformat() if sunsetTs else ""
             # OMW does not support moonrise / moonset at all
             self.sunList, self.moonList = [], []
-            hourData = []
-            tempunit = "°C" if config.plugins.OAWeather.tempUnit.value == "Celsius" else "°F"
-            timeTs = fulldata.get("dt", 0)  # collect latest available data
-            timestr = datetime.fromtimestamp(
-                timeTs).strftime("%H:%M") if timeTs else ""
-            main = fulldata.get("main", {})
             hourly = fulldata.get("list", {})
-            press = str(round(main.get('pressure', 0))) + " mbar"
-            temp = str(round(main.get('temp', 0))) + " " + tempunit
-            feels = str(round(main.get('feels_like', 0))) + " " + tempunit
-            humid = str(round(main.get('humidity', 0))) + " %"
-            precip = str(round(hourly[0].get('pop', 0) * 100)) + " %"
-            wind = fulldata.get('wind', {})
-            windSpd = str(round(wind.get('speed', 0))) + (
-                " km/h" if config.plugins.OAWeather.windspeedMetricUnit.value == 'km/h' else " m/s")
-            windDir = _(
-                weatherhandler.WI.directionsign(
-                    round(
-                        wind.get(
-                            'deg',
-                            0))))
-            windGusts = str(round(hourly[0].get('wind', {}).get('gust', 0))) + (
-                " km/h" if config.plugins.OAWeather.windspeedMetricUnit.value == 'km/h' else " m/s")
-            uvIndex = ""  # OWM does not support UV-index at all
-            visibility = str(
-                round(
-                    fulldata.get(
-                        'visibility',
-                        0) / 1000)) + " km"
-            weather = fulldata.get("weather", [""])[0]
-            shortDesc = weather.get("description", "")
-            longDesc = ""  # OWM does not support long descriptions at all
-            currtime = datetime.fromtimestamp(timeTs)
-            isNight = self.getIsNight(currtime, sunrisestr, sunsetstr)
-            yahoocode = self.nightSwitch(
-                weatherhandler.WI.convert2icon(
-                    "OWM",
-                    weather.get(
-                        "id",
-                        "n/a")).get("yahooCode"),
-                isNight)  # e.g. '801' -> {'yahooCode': '34', 'meteoCode': 'B'}
-            iconfile = join(iconpath, yahoocode + ".png")
-            iconpix = LoadPixmap(
-                cached=True,
-                path=iconfile) if iconfile and exists(iconfile) else None
-            hourData.append([timestr,
-                             press,
-                             temp,
-                             feels,
-                             humid,
-                             precip,
-                             windSpd,
-                             windDir,
-                             windGusts,
-                             uvIndex,
-                             visibility,
-                             shortDesc,
-                             longDesc,
-                             iconpix])
+            hourData = [(self.owmCurrentRow, fulldata, sunrisestr, sunsetstr)]
             dayList = []
             if hourly:
-                currday = datetime.fromisoformat(hourly[0].get(
-                    "dt_txt", "1900-01-01 00:00:00")).replace(hour=0, minute=0, second=0, microsecond=0)
+                currday = hourly[0].get("dt_txt", "1900-01-01 00:00:00")[:10]
                 for hour in hourly:  # collect data on future hours of current day
-                    isotime = hour.get("dt_txt", "1900-01-01 00:00:00")
-                    timestr = isotime[11:16]
-                    main = hour.get("main", {})
-                    press = str(round(main.get('pressure', 0))) + " mbar"
-                    temp = str(round(main.get('temp', 0))) + " " + tempunit
-                    feels = str(
-                        round(
-                            main.get(
-                                'feels_like',
-                                0))) + " " + tempunit
-                    humid = str(round(main.get('humidity', 0))) + " %"
-                    precip = str(round(hour.get('pop', 0) * 100)) + " %"
-                    wind = hour.get("wind", {})
-                    windSpd = str(round(wind.get('speed', 0))) + (
-                        " km/h" if config.plugins.OAWeather.windspeedMetricUnit.value == 'km/h' else " m/s")
-                    windDir = _(
-                        weatherhandler.WI.directionsign(
-                            round(
-                                wind.get(
-                                    'deg',
-                                    0))))
-                    windGusts = str(round(wind.get('gust', 0))) + (
-                        " km/h" if config.plugins.OAWeather.windspeedMetricUnit.value == 'km/h' else " m/s")
-                    uvIndex = ""  # OWM does not support UV-index at all
-                    visibility = str(
-                        round(
-                            hour.get(
-                                'visibility',
-                                0) / 1000)) + " km"
-                    weather = hour.get("weather", [""])[0]
-                    shortDesc = weather.get("description", "")
-                    longDesc = ""  # OWM does not support long descriptions at all
-                    currtime = datetime.fromisoformat(isotime)
-                    isNight = self.getIsNight(currtime, sunrisestr, sunsetstr)
-                    yahoocode = self.nightSwitch(
-                        weatherhandler.WI.convert2icon(
-                            "OWM", weather.get(
-                                "id", "n/a")).get("yahooCode"), isNight)
-                    iconfile = join(iconpath, yahoocode + ".png")
-                    iconpix = LoadPixmap(
-                        cached=True, path=iconfile) if iconfile and exists(iconfile) else None
-                    hourData.append([timestr,
-                                     press,
-                                     temp,
-                                     feels,
-                                     humid,
-                                     precip,
-                                     windSpd,
-                                     windDir,
-                                     windGusts,
-                                     uvIndex,
-                                     visibility,
-                                     shortDesc,
-                                     longDesc,
-                                     iconpix])
-                    timeday = currtime.replace(
-                        hour=0, minute=0, second=0, microsecond=0)
+                    hourData.append((self.owmRow, hour, sunrisestr, sunsetstr))
+                    timeday = hour.get("dt_txt", "1900-01-01 00:00:00")[:10]
                     if timeday > currday:  # is a new day?
                         currday = timeday
                         dayList.append(hourData)
@@ -2138,6 +2521,91 @@ class OAWeatherDetailview(Screen):
                         self.sunList.append((sunrisestr, sunsetstr))
             self.dayList = dayList
 
+    def owmCurrentRow(self, fulldata, sunrisestr, sunsetstr):
+        tempunit, windunit = self.getUnits()
+        timeTs = fulldata.get("dt", 0)  # collect latest available data
+        timestr = datetime.fromtimestamp(
+            timeTs).strftime("%H:%M") if timeTs else ""
+        main = fulldata.get("main", {})
+        hourly = fulldata.get("list", {})
+        press = str(round(main.get('pressure', 0))) + " mbar"
+        temp = str(round(main.get('temp', 0))) + " " + tempunit
+        feels = str(round(main.get('feels_like', 0))) + " " + tempunit
+        humid = str(round(main.get('humidity', 0))) + " %"
+        precip = str(round(hourly[0].get('pop', 0) * 100)) + " %"
+        wind = fulldata.get('wind', {})
+        windSpd = str(round(wind.get('speed', 0))) + windunit
+        windDir = _(weatherhandler.WI.directionsign(round(wind.get('deg', 0))))
+        windGusts = str(round(hourly[0].get('wind', {}).get('gust', 0))) + windunit
+        uvIndex = ""  # OWM does not support UV-index at all
+        visibility = str(round(fulldata.get('visibility', 0) / 1000)) + " km"
+        weather = fulldata.get("weather", [""])[0]
+        shortDesc = weather.get("description", "")
+        longDesc = ""  # OWM does not support long descriptions at all
+        currtime = datetime.fromtimestamp(timeTs)
+        isNight = self.getIsNight(currtime, sunrisestr, sunsetstr)
+        yahoocode = self.nightSwitch(
+            weatherhandler.WI.convert2icon(
+                "OWM",
+                weather.get(
+                    "id",
+                    "n/a")).get("yahooCode"),
+            isNight)  # e.g. '801' -> {'yahooCode': '34', 'meteoCode': 'B'}
+        return [timestr,
+                press,
+                temp,
+                feels,
+                humid,
+                precip,
+                windSpd,
+                windDir,
+                windGusts,
+                uvIndex,
+                visibility,
+                shortDesc,
+                longDesc,
+                self.getIcon(yahoocode)]
+
+    def owmRow(self, hour, sunrisestr, sunsetstr):
+        tempunit, windunit = self.getUnits()
+        isotime = hour.get("dt_txt", "1900-01-01 00:00:00")
+        timestr = isotime[11:16]
+        main = hour.get("main", {})
+        press = str(round(main.get('pressure', 0))) + " mbar"
+        temp = str(round(main.get('temp', 0))) + " " + tempunit
+        feels = str(round(main.get('feels_like', 0))) + " " + tempunit
+        humid = str(round(main.get('humidity', 0))) + " %"
+        precip = str(round(hour.get('pop', 0) * 100)) + " %"
+        wind = hour.get("wind", {})
+        windSpd = str(round(wind.get('speed', 0))) + windunit
+        windDir = _(weatherhandler.WI.directionsign(round(wind.get('deg', 0))))
+        windGusts = str(round(wind.get('gust', 0))) + windunit
+        uvIndex = ""  # OWM does not support UV-index at all
+        visibility = str(round(hour.get('visibility', 0) / 1000)) + " km"
+        weather = hour.get("weather", [""])[0]
+        shortDesc = weather.get("description", "")
+        longDesc = ""  # OWM does not support long descriptions at all
+        currtime = datetime.fromisoformat(isotime)
+        isNight = self.getIsNight(currtime, sunrisestr, sunsetstr)
+        yahoocode = self.nightSwitch(
+            weatherhandler.WI.convert2icon(
+                "OWM", weather.get(
+                    "id", "n/a")).get("yahooCode"), isNight)
+        return [timestr,
+                press,
+                temp,
+                feels,
+                humid,
+                precip,
+                windSpd,
+                windDir,
+                windGusts,
+                uvIndex,
+                visibility,
+                shortDesc,
+                longDesc,
+                self.getIcon(yahoocode)]
+
     def getIsNight(self, currtime, sunrisestr, sunsetstr):
         if sunrisestr and sunsetstr:
             sunrise = datetime.fromisoformat(sunrisestr)
@@ -2158,17 +2626,17 @@ class OAWeatherDetailview(Screen):
         if weatherhelper.favoriteList:
             self.currFavIdx = (self.currFavIdx -
                                1) % len(weatherhelper.favoriteList)
-            callInThread(weatherhandler.reset,
-                         weatherhelper.favoriteList[self.currFavIdx],
-                         callback=self.parseData)
+            location = weatherhelper.favoriteList[self.currFavIdx]
+            weatherhandler.reset(location)
+            self.waitForData(location)
 
     def favoriteDown(self):
         if weatherhelper.favoriteList:
             self.currFavIdx = (self.currFavIdx +
                                1) % len(weatherhelper.favoriteList)
-            callInThread(weatherhandler.reset,
-                         weatherhelper.favoriteList[self.currFavIdx],
-                         callback=self.parseData)
+            location = weatherhelper.favoriteList[self.currFavIdx]
+            weatherhandler.reset(location)
+            self.waitForData(location)
 
     # def favoriteChoice(self):
         # choiceList = [(item[0], item) for item in weatherhelper.favoriteList]
@@ -2179,10 +2647,10 @@ class OAWeatherDetailview(Screen):
             # callInThread(weatherhandler.reset, favorite[1], callback=self.parseData)
 
     def favoriteChoice(self):
-        weatherhelper.showFavoriteSelection(self.session, self.parseData)
+        weatherhelper.showFavoriteSelection(self.session, None)
 
     def returnFavoriteChoice(self, favorite):
-        weatherhelper.handleFavoriteSelection(favorite, self.parseData)
+        weatherhelper.handleFavoriteSelection(favorite)
 
     def prevEntry(self):
         self["detailList"].up()
@@ -2265,9 +2733,15 @@ class OAWeatherDetailview(Screen):
         if self.detailFrameActive:
             self.detailFrame.showFrame()
         if self.old_weatherservice != config.plugins.OAWeather.weatherservice.value:
-            callInThread(weatherhandler.reset, callback=self.parseData)
-        else:
-            self.startRun()
+            weatherhandler.reset()
+        self.startRun()
+
+    def detachHandler(self):
+        if self.dataFuture:
+            weatherhandler.dropFuture(self.dataFuture)
+            self.dataFuture = None
+        weatherhandler.unsubscribe(self.weatherDataUpdated)
+        weatherhandler.removeConsumer(self)
 
     def exit(self):
         if self.detailFrameActive:
@@ -2310,6 +2784,9 @@ class OAWeatherFavorites(Screen):
             },
             -1
         )
+        self.locationSearch = LocationSearch(session, self._handleSearchResult)
+        self.onClose.append(self.locationSearch.cancel)
+        self.onClose.append(weatherhelper.flushFavorites)
         self.onShown.append(self.initScreen)
 
     def _initFile(self):
@@ -2365,11 +2842,7 @@ class OAWeatherFavorites(Screen):
     def _startCitySearch(self, city_name):
         """Start city search after name is entered"""
         if city_name and len(city_name) >= 3:
-            weatherhelper.searchLocation(
-                city_name,
-                self._handleSearchResult,
-                self.session
-            )
+            self.locationSearch.search(city_name)
         else:
             self._showMessage(
                 _("Please enter at least 3 characters"),
@@ -2543,7 +3016,7 @@ class OAWeatherFavorites(Screen):
             logger.info("Config updated to: " + str(location_data[0]))
 
             # Reset weather data with new location
-            callInThread(weatherhandler.reset, location_data)
+            weatherhandler.reset(location_data)
 
             # Close and return selected location
             self.close(location_data)
@@ -2593,13 +3066,13 @@ class OAWeatherFavorites(Screen):
                     self.newFavList.remove(favorite)
                 if favorite in weatherhelper.favoriteList:
                     weatherhelper.favoriteList.remove(favorite)
+                weatherhandler.removeHistory(favorite)
 
                 # 2. Atomic save
                 weatherhelper.saveFavorites()  # Uses helper's method
 
                 # 3. Clear cache
-                if exists(CACHEFILE):
-                    remove(CACHEFILE)
+                weatherhandler.cacheWriter.remove()
 
                 # 4. Check if deleted was active location
                 current_loc = config.plugins.OAWeather.weatherlocation.value
@@ -2631,8 +3104,7 @@ class OAWeatherFavorites(Screen):
 
             weatherhelper.saveFavorites()
 
-            if exists(CACHEFILE):
-                remove(CACHEFILE)
+            weatherhandler.cacheWriter.remove()
 
             self.pending_changes = False
             self._showMessage(_("Favorites saved successfully"), "info")
@@ -2734,4 +3206,4 @@ class TestScreen(Screen):
             self.close()
 
 
-weatherhandler = WeatherHandler()
+weatherhandler = LazyInstance(WeatherHandler)  # built in sessionstart() at the latest
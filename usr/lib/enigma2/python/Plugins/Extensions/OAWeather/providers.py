@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2023 jbleyel, Mr.Servo
+#
+# OAWeather is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# OAWeather is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with OAWeather.  If not, see <https://www.gnu.org/licenses/>.
+
+from collections import deque
+from logging import getLogger
+from threading import Lock
+from time import time
+
+logger = getLogger("OAWeather")
+
+SERVICES = {"MSN": "msn", "OpenMeteo": "omw", "openweather": "owm"}  # config value: Weatherinfo mode
+CHAIN = ("msn", "omw", "owm")  # failover order after the configured provider
+
+
+def getService(mode):
+    """Config value of the weather service for a Weatherinfo mode"""
+    for service, serviceMode in SERVICES.items():
+        if serviceMode == mode:
+            return service
+    return "MSN"
+
+
+class ProviderHealth(object):
+    """Recent outcomes of one provider and its circuit breaker
+
+    After OPENAFTER failures in a row the circuit opens and the provider is
+    skipped for 'cooldown' seconds, which doubles with every failed trial up
+    to MAXCOOLDOWN. When it has passed one trial request is let through
+    (half-open), a success closes the circuit again."""
+    OPENAFTER = 3
+    COOLDOWN = 300  # seconds
+    MAXCOOLDOWN = 3600
+    WINDOW = 20  # outcomes used for the error rate
+    SMOOTHING = 0.3  # weight of the newest latency in the moving average
+
+    def __init__(self, mode):
+        self.mode = mode
+        self.outcomes = deque(maxlen=self.WINDOW)
+        self.latency = None
+        self.failures = 0
+        self.cooldown = self.COOLDOWN
+        self.openUntil = 0
+        self.trial = False
+
+    def record(self, success, duration):
+        self.outcomes.append(success)
+        if success:
+            self.latency = duration if self.latency is None else self.latency + self.SMOOTHING * (duration - self.latency)
+            if self.openUntil:
+                logger.info("Provider %s healthy again, circuit closed" % self.mode)
+            self.failures = 0
+            self.cooldown = self.COOLDOWN
+            self.openUntil = 0
+        else:
+            self.failures += 1
+            if self.trial or self.failures >= self.OPENAFTER:
+                if self.trial:
+                    self.cooldown = min(self.cooldown * 2, self.MAXCOOLDOWN)
+                self.openUntil = time() + self.cooldown
+                logger.warning("Provider %s failed %d times, circuit open for %d s" % (self.mode, self.failures, self.cooldown))
+        self.trial = False
+
+    def isAvailable(self, now=None):
+        """True if requests may go to this provider"""
+        return not self.openUntil or (not self.trial and (now or time()) >= self.openUntil)
+
+    def begin(self):
+        """A request is sent now, after the cooldown it is the one trial request"""
+        if self.openUntil:
+            self.trial = True
+
+    def getErrorRate(self):
+        return 1.0 - float(sum(self.outcomes)) / len(self.outcomes) if self.outcomes else 0.0
+
+    def getScore(self):
+        """Higher is better: success rate minus a penalty for slow answers"""
+        return (1.0 - self.getErrorRate()) * 100 - min(self.latency or 0.0, 10.0) * 5
+
+    def getState(self):
+        return "open" if self.openUntil and time() < self.openUntil else "half-open" if self.openUntil else "closed"
+
+
+class ProviderChain(object):
+    """Order in which the providers are asked, healthiest after the configured one"""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.health = dict((mode, ProviderHealth(mode)) for mode in CHAIN)
+
+    def getOrder(self, preferred, modes):
+        """Providers from 'modes' to try for one fetch, the configured 'preferred' first while it is available"""
+        with self.lock:
+            now = time()
+            available = [mode for mode in modes if self.health[mode].isAvailable(now)]
+            others = sorted((mode for mode in available if mode != preferred),
+                            key=lambda mode: (-self.health[mode].getScore(), CHAIN.index(mode)))
+            return ([preferred] if preferred in available else []) + others
+
+    def isClosed(self, mode):
+        """True if 'mode' has no open or half-open circuit"""
+        with self.lock:
+            health = self.health.get(mode)
+            return not health or not health.openUntil
+
+    def begin(self, mode):
+        """Claim a request to 'mode', False if its circuit does not allow one right now"""
+        with self.lock:
+            health = self.health.get(mode)
+            if health and not health.isAvailable():
+                return False
+            if health:
+                health.begin()
+            return True
+
+    def record(self, result):
+        with self.lock:
+            health = self.health.get(result.mode)
+            if health:
+                health.record(result.ok, result.duration)
+
+    def getStats(self):
+        with self.lock:
+            return dict((mode, {
+                "state": health.getState(),
+                "errorRate": round(health.getErrorRate(), 2),
+                "latency": round(health.latency, 2) if health.latency is not None else None,
+                "score": round(health.getScore(), 1)}) for mode, health in self.health.items())
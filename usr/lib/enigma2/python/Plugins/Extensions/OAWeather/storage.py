@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2023 jbleyel, Mr.Servo
+#
+# OAWeather is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# OAWeather is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with OAWeather.  If not, see <https://www.gnu.org/licenses/>.
+
+from logging import getLogger
+from os import W_OK, X_OK, access, statvfs
+from os.path import isdir, join
+
+logger = getLogger("OAWeather")
+
+ST_RDONLY = 1  # os.ST_RDONLY, missing in Python 2
+
+
+class StorageDirectory(object):
+    """Writable directory for the plugin's data files, found without writing
+
+    Directories are checked with access() and statvfs() only, in the order of
+    'candidates', so a higher-priority directory that works again is used
+    again. The chosen directory is remembered in 'setting' (a ConfigText)
+    to report when the data moves. The RAM-backed fallback FALLBACK is used
+    only while no candidate works and is never remembered."""
+    MINFREE = 64 * 1024  # bytes
+    FALLBACK = "/tmp/"
+
+    def __init__(self, candidates, setting=None):
+        self.candidates = candidates
+        self.setting = setting
+        self.directory = None
+
+    def isUsable(self, directory):
+        try:
+            if not (directory and isdir(directory) and access(directory, W_OK | X_OK)):
+                return False
+            stat = statvfs(directory)
+            return not stat.f_flag & ST_RDONLY and stat.f_bavail * stat.f_frsize >= self.MINFREE
+        except (OSError, AttributeError):
+            return False
+
+    def getDirectory(self):
+        if self.directory and self.directory != self.FALLBACK and self.isUsable(self.directory):
+            return self.directory
+        for directory in self.candidates:
+            if self.isUsable(directory):
+                break
+            logger.warning("Path not writable: %s" % directory)
+        else:
+            if self.directory != self.FALLBACK:
+                logger.warning("Using fallback path: %s" % self.FALLBACK)
+            self.directory = self.FALLBACK
+            return self.directory
+        logger.info("Writable path found: %s" % directory)
+        self.directory = directory
+        if self.setting and self.setting.value != directory:
+            if self.setting.value:
+                logger.warning("Storage moved from %s to %s" % (self.setting.value, directory))
+            self.setting.value = directory
+            self.setting.save()
+        return directory
+
+    def getPath(self, filename):
+        """Full path of 'filename' in the current storage directory"""
+        return join(self.getDirectory(), filename)
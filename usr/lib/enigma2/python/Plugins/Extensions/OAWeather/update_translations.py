@@ -3,6 +3,7 @@
 import os
 import re
 import subprocess
+import sys
 from xml.etree import ElementTree as ET
 """
 ###########################################################
@@ -18,6 +19,17 @@ Homepage: www.corvoboys.org
 
 PLUGIN_DIR = os.path.dirname(os.path.abspath(__file__))
 PLUGIN_NAME = os.path.basename(PLUGIN_DIR)
+
+# po_compiler.py (in-process msgfmt) lives at the root of the repository
+REPO_DIR = PLUGIN_DIR
+while os.path.dirname(REPO_DIR) != REPO_DIR and not os.path.exists(
+        os.path.join(REPO_DIR, "po_compiler.py")):
+    REPO_DIR = os.path.dirname(REPO_DIR)
+sys.path.append(REPO_DIR)
+try:
+    from po_compiler import check_file, compile_file
+except ImportError:  # not run from the repository: msgfmt and fix_po_file
+    check_file = compile_file = None
 LOCALE_DIR = os.path.join(PLUGIN_DIR, "res", "locale")
 
 
@@ -465,6 +477,16 @@ def fix_po_file(po_file):
         return False
 
 
+def needs_fix(po_file):
+    """True if po_file has syntax errors, always without po_compiler"""
+    if check_file is None:
+        return True
+    errors = check_file(po_file)
+    for error in errors[:5]:
+        print("  {}".format(error))
+    return bool(errors)
+
+
 def update_po_files():
     """Update all .po files with new strings"""
     if not os.path.exists(POT_FILE):
@@ -502,8 +524,8 @@ def update_po_files():
         if os.path.exists(po_file):
             print("Updating: {}".format(lang_code))
 
-            # First fix the existing .po file
-            if fix_po_file(po_file):
+            # First fix the existing .po file if it does not parse
+            if needs_fix(po_file) and fix_po_file(po_file):
                 print("  Fixed syntax issues in {}".format(lang_code))
 
             # Use msgmerge WITHOUT --sort-output (-s)
@@ -522,7 +544,8 @@ def update_po_files():
                 stdout, stderr = process.communicate()
                 if process.returncode == 0:
                     # Fix again after merging
-                    fix_po_file(po_file)
+                    if needs_fix(po_file):
+                        fix_po_file(po_file)
                     print(" ✓ {} updated".format(lang_code))
                 else:
                     # Try to fix and retry
@@ -625,11 +648,37 @@ def create_template_po_file(po_file, lang_code):
 
 
 def compile_mo_files():
-    """Compile all .po files into .mo"""
+    """Compile all .po files into .mo, in this process with po_compiler"""
     if not os.path.exists(LOCALE_DIR):
         print("No locale directory found")
         return
 
+    if compile_file is None:
+        return compile_mo_files_msgfmt()
+
+    for lang_code in sorted(os.listdir(LOCALE_DIR)):
+        lc_messages_dir = os.path.join(LOCALE_DIR, lang_code, "LC_MESSAGES")
+        po_file = os.path.join(lc_messages_dir, "{}.po".format(PLUGIN_NAME))
+        if not os.path.exists(po_file):
+            continue
+
+        messages, errors = compile_file(po_file)
+        if errors:
+            # Syntax errors are known from the same pass, fix and retry once
+            print("  Compile failed for {}, trying to fix...".format(lang_code))
+            for error in errors[:5]:
+                print("  {}".format(error))
+            if fix_po_file(po_file):
+                messages, errors = compile_file(po_file)
+        if errors:
+            print("✗ ERROR compiling {}: {}".format(lang_code, errors[0]))
+        else:
+            print("✓ Compiled: {}/LC_MESSAGES/{}.mo ({} messages)".format(
+                lang_code, PLUGIN_NAME, messages))
+
+
+def compile_mo_files_msgfmt():
+    """Compile all .po files into .mo with one msgfmt per language"""
     for lang_code in os.listdir(LOCALE_DIR):
         lc_messages_dir = os.path.join(LOCALE_DIR, lang_code, "LC_MESSAGES")
         po_file = os.path.join(lc_messages_dir, "{}.po".format(PLUGIN_NAME))
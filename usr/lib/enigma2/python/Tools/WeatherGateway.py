@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+
+##########################################################################
+#                                                                                                       #
+#  WeatherGateway: local HTTP service which fetches the weather of each distinct location once and      #
+#  serves it to many receivers. Built on Weatherinfo, runs on Enigma2 or any other Python host.         #
+#  Start it in the shell: "python WeatherGateway.py -h"                                                 #
+#  -----------------------------------------------------------------------------------------------------#
+#  This plugin is licensed under the GNU version 3.0 <https://www.gnu.org/licenses/gpl-3.0.en.html>.    #
+#                                                                                                       #
+##########################################################################
+
+from __future__ import print_function
+import sys
+import threading
+from collections import OrderedDict
+from json import dumps, loads
+from time import time
+
+try:
+    from Tools.Weatherinfo import MODULE_NAME, SOURCES, Deadline, WeatherResult, Weatherinfo, openUrl
+except ImportError:  # started as a script from the Tools directory
+    from Weatherinfo import MODULE_NAME, SOURCES, Deadline, WeatherResult, Weatherinfo, openUrl
+
+PY3 = sys.version_info[0] >= 3
+
+if PY3:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qs, urlencode, urlparse
+    from urllib.request import urlopen
+else:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urllib import urlencode
+    from urllib2 import urlopen
+    from urlparse import parse_qs, urlparse
+
+DEFAULT_PORT = 8765
+
+
+def restoreIntKeys(value):
+    """JSON turns the int keys of the reduced forecast into strings, turn them back"""
+    if isinstance(value, dict):
+        if value and all(key.isdigit() for key in value):
+            return dict((int(key), restoreIntKeys(item)) for key, item in value.items())
+        return dict((key, restoreIntKeys(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return [restoreIntKeys(item) for item in value]
+    return value
+
+
+class GatewayCache:
+    """Results of the upstream fetches with request coalescing
+
+    One entry per (mode, lon, lat, units, scheme) holds the reduced and the
+    full payload. Concurrent requests for a key that is being fetched wait
+    for that fetch instead of starting their own."""
+
+    def __init__(self, clients, ttl=900, errorttl=60, maxentries=500):
+        self.clients = clients  # Weatherinfo per mode, fetch() is reentrant
+        self.ttl = ttl
+        self.errorttl = errorttl
+        self.maxentries = maxentries
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key: (result, expires), least recently used first
+        self.inflight = {}  # key: threading.Event
+        self.started = time()
+        self.stats = {"requests": 0, "hits": 0, "misses": 0, "coalesced": 0, "fetches": 0, "errors": 0}
+
+    def getKey(self, mode, lon, lat, units, scheme):
+        return (mode, round(float(lon), 4), round(float(lat), 4), units, scheme)
+
+    def count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    def get(self, mode, name, lon, lat, units="metric", scheme="de-de"):
+        """Return (WeatherResult, cached) for the location, fetching it at most once at a time"""
+        key = self.getKey(mode, lon, lat, units, scheme)
+        self.count("requests")
+        while True:
+            with self.lock:
+                entry = self.entries.get(key)
+                if entry and entry[1] > time():
+                    self.entries.pop(key)
+                    self.entries[key] = entry
+                    self.stats["hits"] += 1
+                    return entry[0], True
+                event = self.inflight.get(key)
+                if event is None:
+                    event = self.inflight[key] = threading.Event()
+                    self.stats["misses"] += 1
+                    break
+                self.stats["coalesced"] += 1
+            event.wait(60)  # somebody else fetches this key, use the result
+            with self.lock:
+                entry = self.entries.get(key)
+            if entry:
+                return entry[0], True
+        try:
+            result = self.fetch(mode, (name or "%s,%s" % (lat, lon), str(lon), str(lat)), units, scheme)
+            with self.lock:
+                self.entries[key] = (result, time() + (self.ttl if result.ok else self.errorttl))
+                while len(self.entries) > self.maxentries:
+                    self.entries.popitem(last=False)
+        finally:
+            with self.lock:
+                del self.inflight[key]
+            event.set()
+        return result, False
+
+    def fetch(self, mode, geodata, units, scheme):
+        self.count("fetches")
+        client = self.clients.get(mode)
+        if client is None:
+            result = WeatherResult(None, None, "[%s] ERROR: mode '%s' is not served here." % (MODULE_NAME, mode),
+                                   mode, geodata, units, scheme, True, time(), time())
+        else:
+            result = client.fetch(geodata=geodata, units=units, scheme=scheme, reduced=True)
+        if not result.ok:
+            self.count("errors")
+        return result
+
+    def getStats(self):
+        with self.lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self.entries)
+            stats["inflight"] = len(self.inflight)
+        stats["uptime"] = round(time() - self.started)
+        stats["modes"] = sorted(self.clients)
+        return stats
+
+
+class GatewayHandler(BaseHTTPRequestHandler):
+    """GET /weather?lon=..&lat=..[&name=..&mode=..&units=..&scheme=..&payload=reduced|full|both] and GET /stats"""
+    cache = None
+    defaultMode = "msn"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = dict((key, values[0]) for key, values in parse_qs(url.query).items())
+        if url.path == "/stats":
+            return self.reply(200, self.cache.getStats())
+        if url.path != "/weather":
+            return self.reply(404, {"error": "unknown path, use /weather or /stats"})
+        try:
+            lon, lat = float(query["lon"]), float(query["lat"])
+        except (KeyError, ValueError):
+            return self.reply(400, {"error": "lon and lat are required"})
+        result, cached = self.cache.get(query.get("mode", self.defaultMode), query.get("name", ""), lon, lat,
+                                        query.get("units", "metric"), query.get("scheme", "de-de"))
+        payload = query.get("payload", "both")
+        answer = {"error": result.error, "mode": result.mode, "cached": cached,
+                  "fetched": result.finished, "seconds": round(result.duration, 3)}
+        if payload in ("reduced", "both"):
+            answer["data"] = result.data
+        if payload in ("full", "both"):
+            answer["info"] = result.info
+        self.reply(200 if result.ok else 502, answer)
+
+    def reply(self, status, answer):
+        body = dumps(answer).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        if not self.server.quiet:
+            BaseHTTPRequestHandler.log_message(self, fmt, *args)
+
+
+class GatewayServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    quiet = False
+
+
+class GatewayClient:
+    """Weatherinfo.fetch() look-alike which asks a WeatherGateway instead of the provider"""
+
+    def __init__(self, address, timeout=10):
+        address = address.strip().rstrip("/")
+        if "://" not in address:
+            address = "http://%s" % address
+        if not urlparse(address).port:
+            address = "%s:%d" % (address, DEFAULT_PORT)
+        self.address = address
+        self.timeout = timeout
+
+    def fetch(self, geodata=None, cityID=None, units="metric", scheme="de-de", reduced=False, mode="msn", apikey=None, deadline=None):
+        started = time()
+        query = urlencode({"name": geodata[0], "lon": geodata[1], "lat": geodata[2], "mode": mode,
+                           "units": units.lower(), "scheme": scheme.lower()})
+        data = info = None
+        try:
+            answer = loads(openUrl("%s/weather?%s" % (self.address, query), deadline or Deadline(self.timeout), self.timeout))
+            error = answer.get("error")
+            data, info = restoreIntKeys(answer.get("data")), answer.get("info")
+        except Exception as err:
+            try:
+                error = loads(err.read()).get("error")  # HTTPError carries the gateway's answer
+            except Exception:
+                error = None
+            error = error or "[%s] ERROR in module 'GatewayClient': %s" % (MODULE_NAME, str(err))
+        return WeatherResult(data if reduced else info, info, error, mode, geodata, units.lower(), scheme.lower(),
+                             reduced, started, time())
+
+    def fetchAsync(self, callback, **kwargs):
+        thread = threading.Thread(target=lambda: callback(self.fetch(**kwargs)))
+        thread.start()
+        return thread
+
+    def getStats(self):
+        return loads(urlopen("%s/stats" % self.address, timeout=self.timeout).read())
+
+
+def main(argv):
+    import argparse
+    parser = argparse.ArgumentParser(description="WeatherGateway: serve the weather of many receivers with one upstream fetch per location")
+    parser.add_argument("--bind", default="0.0.0.0", help="address to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="TCP port")
+    parser.add_argument("--mode", choices=SOURCES, default="msn", help="provider for requests without 'mode'")
+    parser.add_argument("--apikey", help="OpenWeatherMap API key, enables mode 'owm'")
+    parser.add_argument("--ttl", type=int, default=900, help="seconds a result is served from the cache")
+    parser.add_argument("--errorttl", type=int, default=60, help="seconds a failed fetch is remembered")
+    parser.add_argument("--maxentries", type=int, default=500, help="locations kept in the cache")
+    parser.add_argument("--quiet", action="store_true", help="do not log the requests")
+    args = parser.parse_args(argv)
+    clients = dict((mode, Weatherinfo(mode, args.apikey)) for mode in SOURCES if mode != "owm" or args.apikey)
+    GatewayHandler.cache = GatewayCache(clients, args.ttl, args.errorttl, args.maxentries)
+    GatewayHandler.defaultMode = args.mode
+    server = GatewayServer((args.bind, args.port), GatewayHandler)
+    server.quiet = args.quiet
+    print("WeatherGateway serving %s on %s:%d" % (", ".join(sorted(clients)), args.bind, args.port), file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -14,23 +14,27 @@
 ##########################################################################
 
 from __future__ import print_function
+import os
 import re
 import sys
 import threading
-from json import dump, loads
+from collections import OrderedDict, namedtuple
+from copy import copy
+from json import dump, dumps, loads
 from datetime import datetime, timedelta
-from time import gmtime, strftime
-from xml.etree.ElementTree import Element, tostring
-import argparse
+from math import atan2, cos, degrees, radians, sin
+from time import gmtime, sleep, strftime, time
 
 
 PY3 = sys.version_info[0] >= 3
 
 if PY3:
     unicode = str
-    from urllib.request import urlopen
+    from http.client import HTTPConnection, HTTPSConnection
+    from urllib.request import HTTPHandler, HTTPSHandler, build_opener
 else:
-    from urllib2 import urlopen
+    from httplib import HTTPConnection, HTTPSConnection
+    from urllib2 import HTTPHandler, HTTPSHandler, build_opener
 
 
 MODULE_NAME = __name__.split(".")[-1]
@@ -40,6 +44,21 @@ SOURCES = ["msn", "omw", "owm"]
 DESTINATIONS = ["yahoo", "meteo"]
 
 
+class WeatherResult(namedtuple("WeatherResult", "data info error mode geodata units scheme reduced started finished")):
+    """Outcome of one Weatherinfo.fetch(): the returned data (reduced or full), the
+    full provider answer, the error text or None and the request parameters plus
+    start and end time. The data belongs to this result alone."""
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        return self.error is None and self.data is not None
+
+    @property
+    def duration(self):
+        return self.finished - self.started
+
+
 def parser_thread(obj):
     print("parser_thread")
     try:
@@ -387,6 +406,7 @@ class Weatherinfo:
         self.units = None
         self.callback = None
         self.reduced = False
+        self.deadline = None
         self.setmode(newmode, apikey)
 
     def _parse_datetime(self, val):
@@ -494,9 +514,10 @@ class Weatherinfo:
         print("convert2icon9")
         return result
 
-    def getCitylist(self, cityname=None, scheme="de-de"):
+    def getCitylist(self, cityname=None, scheme="de-de", fallback=True, deadline=None):
         print("getcitylist")
         self.error = None
+        deadline = deadline or Deadline(SEARCH_BUDGET)
         if not cityname:
             print("getcitylist for city not")
             self.error = "[%s] ERROR in module 'getCitylist': missing cityname." % MODULE_NAME
@@ -507,18 +528,20 @@ class Weatherinfo:
             print("getcitylist msn own")
             cityname, country = self.separateCityCountry(cityname)
             jsonData = None
-            for city in [cityname, cityname.split(" ")[0]]:
+            for city in [cityname, cityname.split(" ")[0]] if fallback else [cityname]:
                 print("getcitylist for city hier")
                 link = "https://geocoding-api.open-meteo.com/v1/search?language=%s&count=10&name=%s%s" % (
                     scheme[:2], city, "" if country is None else ",%s" % country)
                 print(str(link))
                 print("getcitylist for city hier 1")
-                jsonData = self.apiserver(link)
+                jsonData = self.apiserver(link, deadline)
 
                 if jsonData is not None and "latitude" in jsonData.get("results", [""])[
                         0]:
                     print("getcitylist for city hier 3")
                     break
+                if deadline.expired():  # no time left for the shorter name
+                    break
             if jsonData is None or "results" not in jsonData:
                 print("getcitylist json")
                 self.error = "[%s] ERROR in module 'getCitylist.owm': no city '%s' found on the server. Try another wording." % (
@@ -566,11 +589,11 @@ class Weatherinfo:
                 scheme = special[scheme[:2]]
             cityname, country = self.separateCityCountry(cityname)
             jsonData = None
-            for city in [cityname, cityname.split(" ")[0]]:
+            for city in [cityname, cityname.split(" ")[0]] if fallback else [cityname]:
                 link = "https://api.openweathermap.org/geo/1.0/direct?q=%s%s&lang=%s&limit=15&appid=%s" % (
                     city, "" if country is None else ",%s" % country, scheme[:2], self.apikey)
-                jsonData = self.apiserver(link)
-                if jsonData:
+                jsonData = self.apiserver(link, deadline)
+                if jsonData or deadline.expired():
                     break
             if not jsonData:
                 self.error = "[%s] ERROR in module 'getCitylist.owm': no city '%s' found on the server. Try another wording." % (
@@ -624,9 +647,11 @@ class Weatherinfo:
             units="metric",
             scheme="de-de",
             reduced=False,
-            callback=None):
+            callback=None,
+            deadline=None):
         print("440 def start geodata")
         self.error = None
+        self.deadline = deadline or Deadline(REFRESH_BUDGET)
         self.geodata = ("", 0, 0) if geodata is None else geodata
         self.cityID = cityID
         self.units = units.lower()
@@ -657,18 +682,53 @@ class Weatherinfo:
                 info = self.parser()
                 return None if self.error else info
 
+    def fetch(self, geodata=None, cityID=None, units="metric", scheme="de-de", reduced=False, mode=None, apikey=None, deadline=None):
+        """Run one request and return its WeatherResult
+
+        The request works on a private copy of this client, the client itself
+        is not changed. So one instance can serve many locations in parallel
+        from several threads, unlike start() which keeps the request state.
+        Pass a Deadline to share one time budget between several fetches."""
+        started = time()
+        request = copy(self)
+        request.mode = request.parser = request.callback = request.info = None
+        data = None
+        try:
+            request.setmode(mode or self.mode or "", self.apikey if apikey is None else apikey)
+            if not request.error:
+                data = request.start(geodata=geodata, cityID=cityID, units=units, scheme=scheme, reduced=reduced, deadline=deadline)
+                if data is None and not request.error:
+                    request.error = "[%s] ERROR in module 'fetch': no data received." % MODULE_NAME
+        except Exception as err:
+            data, request.error = None, "[%s] ERROR in module 'fetch': %s" % (MODULE_NAME, str(err))
+        return WeatherResult(data, request.info, request.error, request.mode, geodata,
+                             units.lower(), scheme.lower(), reduced, started, time())
+
+    def fetchAsync(self, callback, **kwargs):
+        """fetch() in a new thread, 'callback' gets the WeatherResult in that thread"""
+        thread = threading.Thread(target=lambda: callback(self.fetch(**kwargs)))
+        thread.start()
+        return thread
+
+    def forResult(self, result):
+        """Private copy of this client holding 'result', for getmsnxml(), writejson() and the like"""
+        view = copy(self)
+        view.mode, view.info, view.error = result.mode, result.info, None
+        view.geodata, view.units, view.scheme = result.geodata, result.units, result.scheme
+        view.parser = view.callback = None
+        return view
+
     def stop(self):
         print("stop")
         self.error = None
         self.callback = None
 
-    def apiserver(self, link):
+    def apiserver(self, link, deadline=None):
         print("apiserver")
         self.error = None
         if link:
             try:
-                response = urlopen(link, timeout=6)
-                json_data = loads(response.read())  # Anpassung dieser Zeile
+                json_data = loads(openUrl(link, deadline or self.deadline or Deadline(CONNECT_TIMEOUT + READ_TIMEOUT)))
             except Exception as err:
                 self.error = "[%s] ERROR in module 'apiserver': '%s" % (
                     MODULE_NAME, str(err))
@@ -753,7 +813,7 @@ class Weatherinfo:
             # locale = currzone
             # unitw = windunit
             # unitt = tempunit
-            link = "https://api.open-meteo.com/v1/forecast?longitude=%s&latitude=%s&hourly=temperature_2m,relativehumidity_2m,apparent_temperature,weathercode,windspeed_10m,winddirection_10m,precipitation_probability&daily=sunrise,sunset,weathercode,precipitation_probability_max,temperature_2m_max,temperature_2m_min&timezone=%s&windspeed_unit=%s&temperature_unit=%s" % (
+            link = "https://api.open-meteo.com/v1/forecast?longitude=%s&latitude=%s&hourly=temperature_2m,relativehumidity_2m,apparent_temperature,weathercode,windspeed_10m,winddirection_10m,precipitation_probability,pressure_msl,wind_gusts_10m,uv_index,visibility&daily=sunrise,sunset,weathercode,precipitation_probability_max,temperature_2m_max,temperature_2m_min&timezone=%s&windspeed_unit=%s&temperature_unit=%s" % (
                 float(self.geodata[1]), float(self.geodata[2]), currzone, windunit, tempunit)
         else:
             self.error = "[%s] ERROR in module 'omwparser': missing geodata." % MODULE_NAME
@@ -812,7 +872,7 @@ class Weatherinfo:
         if self.info and self.error is None:
             return self.getreducedinfo() if self.reduced else self.info
 
-    def getCitybyID(self, cityID=None):  # owm's cityID is DEPRECATED
+    def getCitybyID(self, cityID=None, deadline=None):  # owm's cityID is DEPRECATED
         print("getcityID")
         self.error = None
         if self.mode != "owm":
@@ -827,7 +887,7 @@ class Weatherinfo:
         if self.callback:
             print("[%s] accessing OWM for cityID..." % MODULE_NAME)
         cityname = "N/A"
-        jsonData = self.apiserver(link)
+        jsonData = self.apiserver(link, deadline or Deadline(SEARCH_BUDGET))
         if jsonData:
             if self.callback:
                 print("[%s] accessing OWM successful." % MODULE_NAME)
@@ -845,7 +905,7 @@ class Weatherinfo:
             self.error = "[%s] ERROR in module 'getCitybyID': no city '%s' found on the server. Try another wording." % (
                 MODULE_NAME, cityname)
 
-    def getCitylistbyGeocode(self, geocode=None, scheme="de-de"):
+    def getCitylistbyGeocode(self, geocode=None, scheme="de-de", deadline=None):
         print("getCityListbyGeocode")
         self.error = None
         if geocode:
@@ -865,7 +925,7 @@ class Weatherinfo:
             lon, lat, self.apikey)
         if self.callback:
             print("[%s] accessing OWM for coordinates..." % MODULE_NAME)
-        jsonData = self.apiserver(link)
+        jsonData = self.apiserver(link, deadline or Deadline(SEARCH_BUDGET))
         if jsonData:
             if self.callback:
                 print("[%s] accessing OWM successful." % MODULE_NAME)
@@ -955,7 +1015,7 @@ class Weatherinfo:
                             print("Parsen des Datums fehlgeschlagen.")
                             print(str(currdate))
 
-                        reduced["current"]["observationTime"] = currdate
+                        reduced["current"]["observationTime"] = currdate.isoformat() if isinstance(currdate, datetime) else currdate
                         reduced["current"]["sunrise"] = forecast[0]["almanac"]["sunrise"]
                         reduced["current"]["sunset"] = forecast[0]["almanac"]["sunset"]
                         # now = datetime.now().astimezone()
@@ -1060,6 +1120,9 @@ class Weatherinfo:
                         reduced["current"]["temp"] = "%.0f" % current["temp"]
                         reduced["current"]["feelsLike"] = "%.0f" % current["feels"]
                         reduced["current"]["humidity"] = "%.0f" % current["rh"]
+                        if current.get("baro"):
+                            reduced["current"]["pressure"] = "%.0f" % current["baro"] if self.units == "metric" else "%.2f" % current["baro"]
+                            reduced["pressunit"] = self.info["units"].get("pressure", "hPa" if self.units == "metric" else "inHg")
                         reduced["current"]["windSpeed"] = "%.0f" % current["windSpd"]
                         windDir = current["windDir"]
                         reduced["current"]["windDir"] = str(windDir)
@@ -1125,6 +1188,16 @@ class Weatherinfo:
                                 "longSummary2"] if "longSummary2" in umbrellaIndex else umbrellaIndex["summary"]
                             currdate = currdate + timedelta(1)
                             print("getreducedinfo currdate")
+                        aggregates = DailyAggregates()
+                        for idx in range(6):
+                            for hour in forecast[idx]["hourly"] or []:
+                                aggregates.add(idx, {
+                                    "temp": hour.get("temp"), "feelsLike": hour.get("feels"),
+                                    "windSpeed": hour.get("windSpd"), "windDir": hour.get("windDir"),
+                                    "windGusts": hour.get("windGust"), "uvIndex": hour.get("uv"),
+                                    "visibility": hour.get("vis"), "pressure": hour.get("baro"),
+                                    "precipitation": hour.get("precip")})
+                        aggregates.apply(reduced["forecast"], reduced["current"], self.directionsign)
                     except Exception as err:
                         print("getreducedinfo 4")
                         self.error = "[%s] ERROR in module 'getreducedinfo#msn': general error. %s" % (
@@ -1243,6 +1316,9 @@ class Weatherinfo:
                                 reduced["current"]["temp"] = "%.0f" % current["temperature_2m"][0]
                                 reduced["current"]["feelsLike"] = "%.0f" % current["apparent_temperature"][idx]
                                 reduced["current"]["humidity"] = "%.0f" % current["relativehumidity_2m"][idx]
+                                if current.get("pressure_msl") and current["pressure_msl"][idx] is not None:
+                                    reduced["current"]["pressure"] = "%.0f" % current["pressure_msl"][idx]
+                                    reduced["pressunit"] = self.info["hourly_units"]["pressure_msl"]
                                 reduced["current"]["windSpeed"] = "%.0f" % current["windspeed_10m"][idx]
                                 windDir = current["winddirection_10m"][idx]
                                 reduced["current"]["windDir"] = str(windDir)
@@ -1303,6 +1379,22 @@ class Weatherinfo:
                             reduced["forecast"][idx]["date"] = currdate.strftime(
                                 datefmt)
                             print("getreducedinfo omw11 ")
+                        days = dict((date, idx) for idx, date in enumerate(forecast["time"][:6]))
+                        aggregates = DailyAggregates()
+                        columns = [(field, current.get(name)) for field, name in (
+                            ("temp", "temperature_2m"), ("feelsLike", "apparent_temperature"),
+                            ("windSpeed", "windspeed_10m"), ("windDir", "winddirection_10m"),
+                            ("windGusts", "wind_gusts_10m"), ("uvIndex", "uv_index"), ("pressure", "pressure_msl"),
+                            ("precipitation", "precipitation_probability")) if current.get(name)]
+                        for hour, stamp in enumerate(current["time"]):
+                            day = days.get(stamp[:10])
+                            if day is not None:
+                                sample = dict((field, values[hour]) for field, values in columns)
+                                if current.get("visibility") and current["visibility"][hour] is not None:
+                                    sample["visibility"] = current["visibility"][hour] / 1000.0  # m to km
+                                aggregates.add(day, sample)
+                        aggregates.apply(reduced["forecast"], reduced["current"], self.directionsign)
+                        reduced["visibiliyunit"] = "km"
                     except Exception as err:
                         print("getreducedinfo omw12")
                         self.error = "[%s] ERROR in module 'getreducedinfo#omw': general error. %s" % (
@@ -1397,6 +1489,8 @@ class Weatherinfo:
                         reduced["current"]["temp"] = "%.0f" % current["main"]["temp"]
                         reduced["current"]["feelsLike"] = "%.0f" % current["main"]["feels_like"]
                         reduced["current"]["humidity"] = "%.0f" % current["main"]["humidity"]
+                        reduced["current"]["pressure"] = "%.0f" % current["main"]["pressure"]
+                        reduced["pressunit"] = "hPa"
                         reduced["current"]["windSpeed"] = "%.0f" % (
                             current["wind"]["speed"] * 3.6)
                         windDir = current["wind"]["deg"]
@@ -1411,19 +1505,25 @@ class Weatherinfo:
                             "%a")
                         reduced["current"]["date"] = currdate.strftime(datefmt)
                         reduced["current"]["text"] = current["weather"][0]["description"]
-                        tmin = 88  # inits for today
-                        tmax = -88
+                        aggregates = DailyAggregates("mean")  # daily value: average of the 3-hourly probabilities
+                        windfactor = 1.0 if self.units == "imperial" else 3.6  # m/s to km/h
                         yahoocode = None
                         meteocode = None
                         text = None
                         idx = 0
-                        prec = []
                         # reduced["forecast"] = dict()
                         # collect forecast of today and next 5 days
                         for forecast in self.info["list"]:
-                            tmin = min(tmin, forecast["main"]["temp_min"])
-                            tmax = max(tmax, forecast["main"]["temp_max"])
-                            prec.append(forecast["pop"])
+                            wind = forecast.get("wind", {})
+                            aggregates.add(idx, {
+                                "temp": forecast["main"]["temp"],
+                                "feelsLike": forecast["main"].get("feels_like"),
+                                "pressure": forecast["main"].get("pressure"),
+                                "windSpeed": wind["speed"] * windfactor if "speed" in wind else None,
+                                "windGusts": wind["gust"] * windfactor if "gust" in wind else None,
+                                "windDir": wind.get("deg"),
+                                "visibility": forecast["visibility"] / 1000.0 if "visibility" in forecast else None,
+                                "precipitation": forecast.get("pop", 0) * 100})
                             # get weather icon as a representative icon for
                             # current day
                             if "15:00:00" in forecast["dt_txt"]:
@@ -1454,10 +1554,6 @@ class Weatherinfo:
                                     meteocode = iconCode.get("meteoCode", ")")
                                 reduced["forecast"][idx]["yahooCode"] = yahoocode
                                 reduced["forecast"][idx]["meteoCode"] = meteocode
-                                reduced["forecast"][idx]["minTemp"] = "%.0f" % tmin
-                                reduced["forecast"][idx]["maxTemp"] = "%.0f" % tmax
-                                reduced["forecast"][idx]["precipitation"] = "%.0f" % (
-                                    sum(prec) / len(prec) * 100) if len(prec) > 0 else ""
                                 currdate = datetime.fromtimestamp(
                                     forecast["dt"])
                                 reduced["forecast"][idx]["dayText"] = currdate.strftime(
@@ -1469,10 +1565,7 @@ class Weatherinfo:
                                 reduced["forecast"][idx]["date"] = currdate.strftime(
                                     datefmt)
                                 reduced["forecast"][idx]["text"] = text
-                                tmin = 88  # inits for next day
-                                tmax = -88
-                                prec = []
-                                yahoocode = None
+                                yahoocode = None  # inits for next day
                                 meteocode = None
                                 text = None
                                 idx += 1
@@ -1482,11 +1575,6 @@ class Weatherinfo:
                                 reduced["forecast"][idx] = dict()
                                 reduced["forecast"][idx]["yahooCode"] = yahoocode if yahoocode else reduced["forecast"][idx - 1]["yahooCode"]
                                 reduced["forecast"][idx]["meteoCode"] = meteocode if meteocode else reduced["forecast"][idx - 1]["meteoCode"]
-                                reduced["forecast"][idx]["minTemp"] = "%.0f" % tmin if tmin != 88 else reduced["forecast"][idx - 1]["minTemp"]
-                                reduced["forecast"][idx]["maxTemp"] = "%.0f" % tmax if tmax != - \
-                                    88 else reduced["forecast"][idx - 1]["maxTemp"]
-                                reduced["forecast"][idx]["precipitation"] = "%.0f" % (
-                                    sum(prec) / len(prec) * 100) if len(prec) > 0 else ""
                                 nextdate = datetime.strptime(
                                     reduced["forecast"][idx - 1]["date"], datefmt) + timedelta(1)
                                 reduced["forecast"][idx]["day"] = nextdate.strftime(
@@ -1502,11 +1590,6 @@ class Weatherinfo:
                                     reduced["forecast"][idx]["yahooCode"] = yahoocode
                                 if meteocode:
                                     reduced["forecast"][idx]["meteoCode"] = meteocode
-                                reduced["forecast"][idx]["minTemp"] = "%.0f" % tmin if tmin != 88 else reduced["forecast"][idx - 1]["minTemp"]
-                                reduced["forecast"][idx]["maxTemp"] = "%.0f" % tmax if tmax != - \
-                                    88 else reduced["forecast"][idx - 1]["maxTemp"]
-                                reduced["forecast"][idx]["precipitation"] = "%.0f" % (
-                                    sum(prec) / len(prec) * 100) if len(prec) > 0 else ""
                                 nextdate = datetime.strptime(
                                     reduced["forecast"][idx - 1]["date"], datefmt) + timedelta(1)
                                 reduced["forecast"][idx]["day"] = nextdate.strftime(
@@ -1516,6 +1599,10 @@ class Weatherinfo:
                                 reduced["forecast"][idx]["date"] = nextdate.strftime(
                                     datefmt)
                                 reduced["forecast"][idx]["text"] = text if text else reduced["forecast"][idx - 1]["text"]
+                        aggregates.apply(reduced["forecast"], reduced["current"], self.directionsign, overwrite=True)
+                        if 5 in reduced["forecast"]:  # day #5 is often incomplete, borrow from day 4
+                            for key, value in reduced["forecast"][4].items():
+                                reduced["forecast"][5].setdefault(key, value)
                         # add missing data for today
                         reduced["current"]["minTemp"] = reduced["forecast"][0]["minTemp"]
                         reduced["current"]["maxTemp"] = reduced["forecast"][0]["maxTemp"]
@@ -1542,8 +1629,12 @@ class Weatherinfo:
         if reduced is None:
             self.error = "[%s] ERROR in module 'writereducedjson': no data found." % MODULE_NAME
             return
-        with open(filename, "w") as f:
-            dump(reduced, f)
+        try:
+            writeAtomic(filename, lambda stream: dump(reduced, stream))
+        except (IOError, OSError, TypeError, ValueError) as err:
+            self.error = "[%s] ERROR in module 'writereducedjson': %s" % (
+                MODULE_NAME, str(err))
+            return
         return filename
 
     def writejson(self, filename):
@@ -1551,137 +1642,138 @@ class Weatherinfo:
         self.error = None
         if self.info:
             try:
-                with open(filename, "w") as f:
-                    dump(self.info, f)
+                writeAtomic(filename, lambda stream: dump(self.info, stream))
             except Exception as err:
                 self.error = "[%s] ERROR in module 'writejson': %s" % (
                     MODULE_NAME, str(err))
         else:
             self.error = "[%s] ERROR in module 'writejson': no data found." % MODULE_NAME
 
-    def getmsnxml(self):  # only MSN supported
+    def getutcoffset(self):
+        """Hours east of UTC at the location as the provider reports it, "0" if unknown"""
+        try:
+            if self.mode == "msn":
+                return str(int(self.info["responses"][0]["source"]["location"]["TimezoneOffset"][: 2]))
+            if self.mode == "omw":
+                return str(self.info["utc_offset_seconds"] // 3600)
+            if self.mode == "owm":
+                return str(self.info["city"]["timezone"] // 3600)
+        except (KeyError, IndexError, TypeError, ValueError):
+            pass
+        return "0"
+
+    def getalerts(self):
+        try:
+            return ", ".join(self.info["responses"][0]["weather"][0]["alerts"]) if self.mode == "msn" else ""
+        except (KeyError, IndexError, TypeError):
+            return ""
+
+    def streamxml(self, stream, reduced):
+        """Write 'reduced' as MSNWeather compatible XML into the binary 'stream', element by element"""
+        from xml.sax.saxutils import XMLGenerator
+        generator = XMLGenerator(stream, "utf-8", short_empty_elements=False) if PY3 else XMLGenerator(stream, "utf-8")
+        current = reduced.get("current", {})
+
+        def element(name, attributes, children=None):
+            generator.ignorableWhitespace("\n")
+            generator.startElement(name, OrderedDict((key, str(value)) for key, value in attributes))
+            if children:
+                children()
+            generator.endElement(name)
+
+        def wind(speed, sign):
+            return "%s %s" % (speed, reduced.get("windunit", "")), str(sign or "").split(" ")[-1]
+
+        def weather():
+            windspeed, winddir = wind(current.get("windSpeed", ""), current.get("windDirSign"))
+            observed = current.get("observationTime")
+            observed = observed if isinstance(observed, datetime) else self._parse_datetime(observed)
+            element("current", (
+                ("temperature", current.get("temp", "")),
+                ("yahoocode", current.get("yahooCode", "NA")),
+                ("meteocode", current.get("meteoCode", ")")),
+                ("skytext", current.get("text", "")),
+                ("date", current.get("date", "")),
+                ("observationtime", observed.strftime("%X") if observed else ""),
+                ("observationpoint", current.get("observationPoint", "")),
+                ("feelslike", current.get("feelsLike", "")),
+                ("humidity", current.get("humidity", "")),
+                ("winddisplay", "%s %s" % (windspeed, winddir)),
+                ("day", current.get("day", "")),
+                ("shortday", current.get("shortDay", "")),
+                ("windspeed", windspeed),
+                ("precip", current.get("precipitation", ""))))
+            forecast = reduced.get("forecast", {})
+            for idx in sorted(forecast):  # today and the next days, each with its own date
+                day = forecast[idx]
+                element("forecast", (
+                    ("low", day.get("minTemp", "")),
+                    ("high", day.get("maxTemp", "")),
+                    ("yahoocodeday", day.get("yahooCode", "NA")),
+                    ("meteocodeday", day.get("meteoCode", ")")),
+                    ("skytextday", day.get("text", "")),
+                    ("date", day.get("date", "")),
+                    ("day", day.get("day", "")),
+                    ("shortday", day.get("shortDay", "")),
+                    ("precip", day.get("precipitation", ""))))
+            generator.ignorableWhitespace("\n")
+
+        name = reduced.get("name", self.geodata[0] if self.geodata else "")
+        generator.startDocument()
+        generator.startElement("weatherdata", OrderedDict((
+            ("xmlns:xsd", "http://www.w3.org/2001/XMLSchema"),
+            ("xmlns:xsi", "http://www.w3.org/2001/XMLSchema-instance"))))
+        element("weather", (
+            ("weatherlocationname", name),
+            ("degreetype", "F" if reduced.get("tempunit", "").endswith("F") else "C"),
+            ("long", "%.3f" % float(reduced.get("longitude", 0))),
+            ("lat", "%.3f" % float(reduced.get("latitude", 0))),
+            ("timezone", self.getutcoffset()),
+            ("alert", self.getalerts()),
+            ("encodedlocationname", (name.encode("ascii", "xmlcharrefreplace").decode() if PY3 else name).replace(
+                " ", "%20").replace("\n", "").strip())), weather)
+        generator.ignorableWhitespace("\n")
+        generator.endElement("weatherdata")
+        generator.endDocument()
+
+    def writexml(self, filename):
+        """Write the current data of any provider as MSNWeather compatible XML, atomically"""
+        print("writexml")
+        self.error = None
+        reduced = self.getreducedinfo()
+        if self.error is not None:
+            return
+        if not reduced:
+            self.error = "[%s] ERROR in module 'writexml': missing weather or geodata." % MODULE_NAME
+            return
+        try:
+            writeAtomic(filename, lambda stream: self.streamxml(stream, reduced), binary=True)
+        except Exception as err:
+            self.error = "[%s] ERROR in module 'writexml': %s" % (
+                MODULE_NAME, str(err))
+            return
+        return filename
+
+    def getmsnxml(self):
+        """The XML of writexml() as ElementTree Element, for callers that want a tree"""
         print("getmsnxml")
         self.error = None
-        if self.geodata and self.info:
+        reduced = self.getreducedinfo()
+        if self.error is None and reduced:
             try:
-                datefmt = "%Y-%m-%d"
-                source = self.info["responses"][0]["source"]
-                current = self.info["responses"][0]["weather"][0]["current"]
-                forecast = self.info["responses"][0]["weather"][0]["forecast"]["days"]
-                root = Element("weatherdata")
-                root.set("xmlns:xsd", "http://www.w3.org/2001/XMLSchema")
-                root.set(
-                    "xmlns:xsi",
-                    "http://www.w3.org/2001/XMLSchema-instance")
-                w = Element("weather")
-                location = self.geodata[0].split(",")
-                locationname = "%s, %s" % (location[0], location[1]) if len(
-                    location) > 1 else location[0]
-                w.set("weatherlocationname", locationname)
-                w.set("degreetype", self.info["units"]["temperature"])
-                w.set("long", "%.3f" % source["coordinates"]["lon"])
-                w.set("lat", "%.3f" % source["coordinates"]["lat"])
-                w.set("timezone",
-                      str(int(source["location"]["TimezoneOffset"][: 2])))
-                w.set(
-                    "alert", ", ".join(
-                        self.info["responses"][0]["weather"][0]["alerts"]))
-                w.set(
-                    "encodedlocationname",
-                    locationname.encode(
-                        "ascii",
-                        "xmlcharrefreplace").decode().replace(
-                        " ",
-                        "%20").replace(
-                        "\n",
-                        "").strip())
-                root.append(w)
-                c = Element("current")
-                c.set("temperature", "%.0f" % current["temp"])
-                iconCode = self.convert2icon("MSN", current["symbol"])
-                c.set(
-                    "yahoocode",
-                    iconCode.get(
-                        "yahooCode",
-                        "NA") if iconCode else "NA")
-                c.set(
-                    "meteocode",
-                    iconCode.get(
-                        "meteoCode",
-                        ")") if iconCode else ")")
-                c.set("skytext", forecast[0]["hourly"][0]["pvdrCap"]
-                      if forecast[0]["hourly"] else current["capAbbr"])
-                print("getmsnxml 1")
-                # currdate = datetime.fromisoformat(current["created"])
-                currdate = self._parse_datetime(current["created"])
-                print("getmsnxml 2")
-                c.set("date", currdate.strftime(datefmt))
-                c.set("observationtime", currdate.strftime("%X"))
-                c.set("observationpoint", source["location"]["Name"])
-                c.set("feelslike", "%.0f" % current["feels"])
-                c.set("humidity", "%.0f" % current["rh"])
-                c.set(
-                    "winddisplay",
-                    "%s %s %s" %
-                    ("%.0f" %
-                     current["windSpd"],
-                        self.info["units"]["speed"],
-                        self.directionsign(
-                         current["windDir"])[
-                         2:]))
-                c.set("day", currdate.strftime("%A"))
-                c.set("shortday", currdate.strftime("%a"))
-                c.set(
-                    "windspeed",
-                    "%s %s" %
-                    ("%.0f" %
-                     current["windSpd"],
-                        self.info["units"]["speed"]))
-                c.set("precip", "%.0f" % forecast[0]["daily"]["day"]["precip"])
-                w.append(c)
-                for idx in range(
-                        6):  # collect forecast of today and next 5 days
-                    f = Element("forecast")
-                    f.set("low", "%.0f" % forecast[idx]["daily"]["tempLo"])
-                    f.set("high", "%.0f" % forecast[idx]["daily"]["tempHi"])
-                    iconCodes = self.convert2icon(
-                        "MSN", forecast[idx]["daily"]["symbol"])
-                    f.set(
-                        "yahoocodeday",
-                        iconCodes.get(
-                            "yahooCode",
-                            "NA") if iconCodes else "NA")
-                    f.set(
-                        "meteocodeday",
-                        iconCodes.get(
-                            "meteoCode",
-                            ")") if iconCodes else ")")
-                    f.set("skytextday", forecast[idx]["daily"]["pvdrCap"])
-                    f.set("date", currdate.strftime(datefmt))
-                    f.set("day", currdate.strftime("%A"))
-                    f.set("shortday", currdate.strftime("%a"))
-                    f.set("precip", "%.0f" %
-                          forecast[idx]["daily"]["day"]["precip"])
-                    w.append(f)
-                return root
+                from io import BytesIO
+                from xml.etree.ElementTree import fromstring
+                stream = BytesIO()
+                self.streamxml(stream, reduced)
+                return fromstring(stream.getvalue())
             except Exception as err:
                 self.error = "[%s] ERROR in module 'getmsnxml': general error. %s" % (
                     MODULE_NAME, str(err))
-        else:
+        elif self.error is None:
             self.error = "[%s] ERROR in module 'getmsnxml': missing weather or geodata." % MODULE_NAME
 
-    def writemsnxml(self, filename):  # only MSN supported
-        print("writemsnxml")
-        self.error = None
-        xmlData = self.getmsnxml()
-        if xmlData:
-            xmlString = tostring(xmlData, encoding="utf-8", method="html")
-            try:
-                with open(filename, "wb") as f:
-                    f.write(xmlString)
-            except OSError as err:
-                self.error = "[%s] ERROR in module 'writemsnxml': %s" % (
-                    MODULE_NAME, str(err))
+    def writemsnxml(self, filename):  # kept for older callers, works for all providers
+        return self.writexml(filename)
 
     def getinfo(self):
         print("getinfo")
@@ -1775,8 +1867,416 @@ class Weatherinfo:
             return self.error
 
 
+class DailyAggregates:
+    """Per-day aggregates of the hourly forecast samples of any provider
+
+    add() updates running min, max, sum and count values of every field of
+    a sample, so all aggregates of all days are known after one pass over
+    the samples. The dominant wind direction is the average of the wind
+    vectors weighted by the speed, which handles a mix of 350 and 10 degrees."""
+    REDUCTIONS = (  # reduced forecast key, sample field, reduction
+        ("minTemp", "temp", "min"),
+        ("maxTemp", "temp", "max"),
+        ("minFeelsLike", "feelsLike", "min"),
+        ("maxFeelsLike", "feelsLike", "max"),
+        ("minWindSpeed", "windSpeed", "min"),
+        ("maxWindSpeed", "windSpeed", "max"),
+        ("maxWindGusts", "windGusts", "max"),
+        ("maxUvIndex", "uvIndex", "max"),
+        ("maxVisibility", "visibility", "max"),
+        ("pressure", "pressure", "mean"),
+        ("precipitation", "precipitation", None)  # None: the reduction given to __init__
+    )
+
+    def __init__(self, precipitation="max"):
+        self.precipitation = precipitation  # "max" or "mean" for probabilities, "sum" for amounts
+        self.days = {}  # day: {field: [min, max, sum, count]}
+        self.wind = {}  # day: [east, north] sum of the wind vectors
+
+    def add(self, day, sample):
+        stats = self.days.setdefault(day, {})
+        for field, value in sample.items():
+            if value is None or field == "windDir":
+                continue
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                continue
+            entry = stats.get(field)
+            if entry is None:
+                stats[field] = [value, value, value, 1]
+            else:
+                if value < entry[0]:
+                    entry[0] = value
+                elif value > entry[1]:
+                    entry[1] = value
+                entry[2] += value
+                entry[3] += 1
+        direction = sample.get("windDir")
+        if direction is not None:
+            try:
+                speed = float(sample.get("windSpeed", 1.0) or 0.0)
+                angle = radians(float(direction))
+            except (TypeError, ValueError):
+                return
+            vector = self.wind.setdefault(day, [0.0, 0.0])
+            vector[0] += speed * sin(angle)
+            vector[1] += speed * cos(angle)
+
+    def getDay(self, day, directionsign=None):
+        """Formatted aggregates of 'day', only those its samples had values for"""
+        result = {}
+        stats = self.days.get(day, {})
+        for key, field, reduction in self.REDUCTIONS:
+            entry = stats.get(field)
+            if entry:
+                reduction = reduction or self.precipitation
+                value = entry[0] if reduction == "min" else entry[1] if reduction == "max" else entry[2] if reduction == "sum" else entry[2] / entry[3]
+                result[key] = "%.0f" % value
+        east, north = self.wind.get(day, (0.0, 0.0))
+        if abs(east) > 1e-6 or abs(north) > 1e-6:
+            direction = int(round(degrees(atan2(east, north)))) % 360
+            result["domWindDir"] = str(direction)
+            if directionsign:
+                result["domWindDirSign"] = directionsign(direction)
+        return result
+
+    def apply(self, forecast, current=None, directionsign=None, overwrite=False):
+        """Add the aggregates to the reduced 'forecast' days and today's to 'current'
+
+        Values the provider delivered itself are kept unless 'overwrite' is set."""
+        for day, values in forecast.items():
+            for key, value in self.getDay(day, directionsign).items():
+                if overwrite or key not in values:
+                    values[key] = value
+                if day == 0 and current is not None and key not in current:
+                    current[key] = value
+
+
+CONNECT_TIMEOUT = 3.0  # seconds for DNS, TCP and TLS setup of one request
+READ_TIMEOUT = 6.0  # seconds of silence allowed while waiting for and reading the answer
+REFRESH_BUDGET = 12.0  # total seconds for one weather refresh, failover included
+SEARCH_BUDGET = 10.0  # total seconds for a city search or reverse geocoding
+MIN_REMAINING = 0.25  # don't start a request with less time left than this
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class Deadline:
+    """Time budget of one high-level operation, shared by all its requests"""
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.expires = time() + budget
+
+    def remaining(self):
+        return max(0.0, self.expires - time())
+
+    def expired(self):
+        return self.remaining() < MIN_REMAINING
+
+    def getTimeouts(self, readTimeout=READ_TIMEOUT):
+        """(connect, read) timeouts for the next request, DeadlineExceeded when the budget is used up"""
+        remaining = self.remaining()
+        if remaining < MIN_REMAINING:
+            raise DeadlineExceeded("time budget of %.1f s exhausted" % self.budget)
+        return min(CONNECT_TIMEOUT, remaining), min(readTimeout, remaining)
+
+
+class ReadTimeoutMixin:
+    """Switch the socket from the connect timeout to 'readTimeout' once it is connected"""
+
+    def connect(self):
+        self.baseConnection.connect(self)
+        self.sock.settimeout(self.readTimeout)
+
+
+class DeadlineHTTPConnection(ReadTimeoutMixin, HTTPConnection):
+    baseConnection = HTTPConnection
+
+    def __init__(self, host, readTimeout=READ_TIMEOUT, **kwargs):
+        HTTPConnection.__init__(self, host, **kwargs)
+        self.readTimeout = readTimeout
+
+
+class DeadlineHTTPSConnection(ReadTimeoutMixin, HTTPSConnection):
+    baseConnection = HTTPSConnection
+
+    def __init__(self, host, readTimeout=READ_TIMEOUT, **kwargs):
+        HTTPSConnection.__init__(self, host, **kwargs)
+        self.readTimeout = readTimeout
+
+
+class DeadlineHTTPHandler(HTTPHandler):
+    def __init__(self, readTimeout):
+        HTTPHandler.__init__(self)
+        self.readTimeout = readTimeout
+
+    def http_open(self, req):
+        return self.do_open(lambda host, **kwargs: DeadlineHTTPConnection(host, self.readTimeout, **kwargs), req)
+
+
+class DeadlineHTTPSHandler(HTTPSHandler):
+    def __init__(self, readTimeout):
+        HTTPSHandler.__init__(self)
+        self.readTimeout = readTimeout
+
+    def https_open(self, req):
+        return self.do_open(lambda host, **kwargs: DeadlineHTTPSConnection(host, self.readTimeout, **kwargs), req,
+                            context=getattr(self, "_context", None))
+
+
+def writeAtomic(filename, writer, binary=False):
+    """Let 'writer' fill a temporary file next to 'filename', then rename it into place"""
+    tempfile = "%s.%d.tmp" % (filename, os.getpid())
+    try:
+        with open(tempfile, "wb" if binary else "w") as stream:
+            writer(stream)
+        os.rename(tempfile, filename)
+    except Exception:
+        if os.path.exists(tempfile):
+            os.remove(tempfile)
+        raise
+
+
+def openUrl(link, deadline, readTimeout=READ_TIMEOUT):
+    """Body of 'link' read within the connect/read timeouts and the remaining budget of 'deadline'"""
+    connectTimeout, readTimeout = deadline.getTimeouts(readTimeout)
+    opener = build_opener(DeadlineHTTPHandler(readTimeout), DeadlineHTTPSHandler(readTimeout))
+    response = opener.open(link, timeout=connectTimeout)
+    try:
+        body = response.read()
+    finally:
+        response.close()
+    if deadline.remaining() <= 0:
+        raise DeadlineExceeded("answer arrived after the time budget of %.1f s" % deadline.budget)
+    return body
+
+
+class Hedger:
+    """Hedged fetches: ask a second provider when the first one is late
+
+    The secondary request starts when the primary has not answered within
+    its recent 90th percentile latency (clamped to MINDELAY..MAXDELAY). The
+    first good result wins, the other request is abandoned and its result
+    only reported to 'onResult' (a running urlopen cannot be interrupted)."""
+    MINDELAY = 0.5  # seconds
+    MAXDELAY = 4.0
+    DEFAULTDELAY = 2.0  # until SAMPLES latencies of the primary are known
+    SAMPLES = 5
+    WINDOW = 50
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}  # mode: recent latencies of good results
+        self.stats = {"requests": 0, "fired": 0, "hedgeWon": 0, "primaryWon": 0, "failover": 0, "failed": 0}
+
+    def getDelay(self, mode):
+        with self.lock:
+            samples = sorted(self.latencies.get(mode, ()))
+        if len(samples) < self.SAMPLES:
+            return self.DEFAULTDELAY
+        return min(self.MAXDELAY, max(self.MINDELAY, samples[min(len(samples) - 1, int(len(samples) * 0.9))]))
+
+    def count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    def learn(self, result):
+        if result.ok:
+            with self.lock:
+                samples = self.latencies.setdefault(result.mode, [])
+                samples.append(result.duration)
+                del samples[:-self.WINDOW]
+
+    def fetch(self, client, modes, onResult=None, **kwargs):
+        """Fetch with modes[0], hedged by modes[1], and return the winning WeatherResult"""
+        try:
+            from queue import Empty, Queue
+        except ImportError:  # Python 2
+            from Queue import Empty, Queue
+        results = Queue()
+
+        def run(mode):
+            result = client.fetch(mode=mode, **kwargs)
+            self.learn(result)
+            if onResult:
+                onResult(result)
+            results.put(result)
+
+        def launch(mode):
+            thread = threading.Thread(target=run, args=(mode,))
+            thread.daemon = True  # a stalled loser must not keep the process alive
+            thread.start()
+
+        self.count("requests")
+        launch(modes[0])
+        launched = 1
+        try:
+            result = results.get(timeout=self.getDelay(modes[0]))
+        except Empty:
+            result = None
+        fired = result is None and len(modes) > 1
+        if (result is None or not result.ok) and len(modes) > 1:
+            if fired:
+                self.count("fired")
+            launch(modes[1])
+            launched += 1
+        received = 0 if result is None else 1
+        while result is None or not result.ok:
+            if received == launched:
+                break
+            result = results.get()
+            received += 1
+        if result.ok:
+            self.count("primaryWon" if result.mode == modes[0] else "hedgeWon" if fired else "failover")
+        else:
+            self.count("failed")
+        return result
+
+    def getStats(self):
+        with self.lock:
+            stats = dict(self.stats)
+        stats["delay"] = dict((mode, round(self.getDelay(mode), 2)) for mode in list(self.latencies))
+        return stats
+
+
+HOSTS = {"msn": "api.msn.com", "omw": "api.open-meteo.com", "owm": "api.openweathermap.org"}
+
+
+class RateLimiter:
+    """Spread requests to one host to at most 'rate' per second, shared by all worker threads"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.lock = threading.Lock()
+        self.nextSlot = 0.0
+
+    def acquire(self):
+        with self.lock:
+            now = time()
+            slot = max(now, self.nextSlot)
+            self.nextSlot = slot + self.interval
+        if slot > now:
+            sleep(slot - now)
+
+
+def readLocations(filename, mode):
+    """Read (name, lon, lat, mode) tuples from a CSV (name,lat,lon with optional header) or NDJSON file, '-' is stdin"""
+    import csv
+    import io
+    stream = sys.stdin if filename == "-" else io.open(filename, encoding="utf-8")
+    locations = []
+    try:
+        lines = [line for line in stream if line.strip() and not line.lstrip().startswith("#")]
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    if lines and lines[0].lstrip().startswith("{"):
+        rows = [loads(line) for line in lines]
+    else:
+        rows = list(csv.reader(lines))
+        if rows and [column.strip().lower() for column in rows[0]][:1] == ["name"]:
+            header = [column.strip().lower() for column in rows.pop(0)]
+            rows = [dict(zip(header, row)) for row in rows]
+        else:
+            rows = [dict(zip(("name", "lat", "lon", "mode"), row)) for row in rows]
+    for number, row in enumerate(rows, 1):
+        try:
+            name = (row.get("name") or "").strip()
+            lat, lon = float(row["lat"]), float(row["lon"])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("%s, entry %d: name, lat and lon are required" % (filename, number))
+        locations.append((name or "%s,%s" % (lat, lon), lon, lat, (row.get("mode") or mode).strip().lower()))
+    return locations
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def runBatch(args):
+    """Fetch all locations of args.batch with args.workers threads, stream the results and print a summary"""
+    try:
+        locations = readLocations(args.batch, args.mode)
+    except (IOError, OSError, ValueError) as err:
+        print("ERROR: %s" % err, file=sys.stderr)
+        return 2
+    stdout = output = sys.stdout
+    sys.stdout = sys.stderr  # the parsers print progress, keep it out of the NDJSON stream
+    try:
+        if args.outdir and not os.path.isdir(args.outdir):
+            os.makedirs(args.outdir)
+        if args.output and args.output != "-":
+            output = open(args.output, "w")
+        try:
+            from queue import Queue
+        except ImportError:  # Python 2
+            from Queue import Queue
+        clients = {}
+        limiters = {}
+        for location in locations:
+            if location[3] not in clients:
+                clients[location[3]] = Weatherinfo(location[3], args.apikey)
+            host = HOSTS.get(location[3], location[3])
+            limiters.setdefault(host, RateLimiter(args.rate))
+        todo = Queue()
+        for location in locations:
+            todo.put(location)
+        writeLock = threading.Lock()
+        latencies = []
+        failures = []
+
+        def write(location, result):
+            record = {"name": location[0], "lon": location[1], "lat": location[2], "mode": location[3],
+                      "ok": result.ok, "error": result.error, "seconds": round(result.duration, 3)}
+            if args.outdir and result.ok:
+                filename = os.path.join(args.outdir, "%s.json" % re.sub(r"[^\w.-]+", "_", location[0]).strip("_"))
+                writeAtomic(filename, lambda stream: dump(result.data, stream))
+                record["file"] = filename
+            elif result.ok:
+                record["data"] = result.data
+            line = dumps(record) + "\n"
+            with writeLock:
+                output.write(line)
+                output.flush()
+                latencies.append(result.duration)
+                if not result.ok:
+                    failures.append((location[0], result.error))
+
+        def worker():
+            while True:
+                location = todo.get()
+                if location is None:
+                    break
+                limiters[HOSTS.get(location[3], location[3])].acquire()
+                write(location, clients[location[3]].fetch(geodata=location[:3], units=args.units, scheme=args.scheme, reduced=args.reduced))
+
+        threads = [threading.Thread(target=worker) for idx in range(max(1, args.workers))]
+        for thread in threads:
+            todo.put(None)
+            thread.start()
+        started = time()
+        for thread in threads:
+            thread.join()
+        elapsed = time() - started
+    finally:
+        sys.stdout = stdout
+        if output is not stdout:
+            output.close()
+    summary = "%d locations in %.1f s: %d ok, %d failed | latency p50 %.2f s, p90 %.2f s, p99 %.2f s, max %.2f s" % (
+        len(locations), elapsed, len(locations) - len(failures), len(failures), percentile(latencies, 0.5),
+        percentile(latencies, 0.9), percentile(latencies, 0.99), max(latencies) if latencies else 0.0)
+    print(summary, file=sys.stderr)
+    for name, error in failures:
+        print("  failed: %s: %s" % (name, error), file=sys.stderr)
+    return 1 if failures else 0
+
+
 def main(argv):
-    print("main")
     mainfmt = "[__main__]"
     cityname = ""
     units = "metric"
@@ -1796,6 +2296,7 @@ def main(argv):
     helpstring = "Weatherinfo v2.0: try 'python Weatherinfo.py -h' for more information"
     args = None
 
+    import argparse
     parser = argparse.ArgumentParser(description=helpstring)
     parser.add_argument("cityname", nargs='?', help="Name der Stadt")
     parser.add_argument(
@@ -1814,11 +2315,9 @@ def main(argv):
         help="Sprachschema (de-de oder en-us)")
     parser.add_argument(
         "--mode",
-        choices=[
-            "msn",
-            "other_mode"],
+        choices=SOURCES,
         default="msn",
-        help="Wetterdienst-Modus (msn oder other_mode)")
+        help="Wetterdienst-Modus (msn, omw oder owm)")
     parser.add_argument(
         "--apikey",
         help="API-Schluessel fuer den Wetterdienst")
@@ -1850,7 +2349,32 @@ def main(argv):
             "LAT",
             "LON"),
         help="Geodaten (Name, Breitengrad, Laengengrad) der Stadt")
+    batch = parser.add_argument_group("Stapelbetrieb")
+    batch.add_argument(
+        "--batch",
+        metavar="FILE",
+        help="Orte aus CSV (name,lat,lon[,mode]) oder NDJSON lesen ('-' = stdin) und ohne Rueckfragen abrufen")
+    batch.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Anzahl paralleler Abrufe im Stapelbetrieb")
+    batch.add_argument(
+        "--rate",
+        type=float,
+        default=2.0,
+        help="Maximale Anfragen pro Sekunde und Server im Stapelbetrieb (0 = unbegrenzt)")
+    batch.add_argument(
+        "--output",
+        metavar="FILE",
+        help="NDJSON-Ausgabedatei im Stapelbetrieb (Standard: stdout)")
+    batch.add_argument(
+        "--outdir",
+        metavar="DIR",
+        help="Im Stapelbetrieb eine JSON-Datei pro Ort in DIR schreiben")
     args = parser.parse_args(argv)
+    if args.batch:
+        return runBatch(args)
 
     cityname = args.cityname
     units = args.units
@@ -1945,17 +2469,12 @@ def main(argv):
             if not quiet:
                 print(successtext % reduced)
         if xml:
-            if mode == "msn":
-                WI.writemsnxml(xml)
-                if not quiet and not WI.error:
-                    print(successtext % xml)
-            else:
-                print(
-                    "ERROR: XML is only supported in mode 'msn'.\nFile '%s' was not created..." %
-                    xml)
+            WI.writexml(xml)
+            if not quiet and not WI.error:
+                print(successtext % xml)
     if WI.error:
         print(WI.error.replace(mainfmt, "").strip())
 
 
 if __name__ == "__main__":
-    main(sys.argv[1:])
+    sys.exit(main(sys.argv[1:]))